@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: client overhead of put, take, ack, release, peek and Task.
+
+Runs every benchmark against fake connection (canned responses, measures
+client overhead only) and against in-process stand-in server (end to end),
+or against real Tarantool deque if `--host`/`--port` are given:
+
+    $ python benchmarks/client.py -n 20000 --json results.json
+    $ python benchmarks/client.py --target fake --compare results.json
+    $ python benchmarks/client.py --host 127.0.0.1 --port 33016
+
+Results are stored as JSON, so runs may be compared for regressions:
+`--compare` prints relative change of ops/sec and exits with status 1
+if any benchmark is slower than `--threshold` percent.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from tarantool_deque import Deque
+from tarantool_deque.server import DequeServer
+from tarantool_deque.tarantool_deque import Task, task_row
+
+
+TUBE = 'test_tube'
+
+
+class FakeResponse(list):
+    """
+    Tarantool response stub: list of rows with `rowcount`.
+    """
+    @property
+    def rowcount(self):
+        return len(self)
+
+
+class FakeConnection(object):
+    """
+    Tarantool connection returning canned deque rows without network.
+    """
+    states = {
+        'put': 1, 'take': 2, 'ack': 3, 'release': 1, 'peek': 2, 'delete': 3,
+    }
+
+    def __init__(self, host, port, user=None, password=None):
+        now = int(time.time() * 10000000)
+        self.row = [1, 1, now, 1, 1, 1, 1, now, now + 10000000, now,
+                    'payload']
+
+    def call(self, cmd, args):
+        row = list(self.row)
+        row[1] = self.states[cmd.rpartition(':')[2]]
+        return FakeResponse([row])
+
+
+def _fake(tube):
+    """
+    Returns `True` if tube is connected to fake connection.
+    """
+    return isinstance(tube.deque.tnt, FakeConnection)
+
+
+def _taken(tube, count):
+    """
+    Returns `count` taken tasks (enqueued if needed).
+    """
+    tasks = []
+    if _fake(tube):
+        while len(tasks) < count:
+            tasks.append(tube.take(timeout=0))
+        return tasks
+
+    tube.put_many([('payload', 1, 1)] * count, ids_only=True)
+    while len(tasks) < count:
+        tasks.extend(tube.take_many(count - len(tasks), timeout=1))
+    return tasks
+
+
+def _cleanup(tube, tasks):
+    """
+    Ack taken tasks left after benchmark (not timed).
+    """
+    if _fake(tube):
+        return
+    taken = [task for task in tasks if task.state == 2]
+    if taken:
+        tube.ack_many(taken)
+
+
+def bench_put(tube, count):
+    put = tube.put
+    started = time.time()
+    for _ in range(count):
+        put('payload', 1, 1)
+    elapsed = time.time() - started
+
+    if not _fake(tube):
+        _cleanup(tube, tube.take_many(count, timeout=0))
+    return elapsed
+
+
+def bench_take(tube, count):
+    if not _fake(tube):
+        tube.put_many([('payload', 1, 1)] * count, ids_only=True)
+
+    take = tube.take
+    tasks = []
+    started = time.time()
+    for _ in range(count):
+        tasks.append(take(timeout=0))
+    elapsed = time.time() - started
+
+    _cleanup(tube, tasks)
+    return elapsed
+
+
+def bench_take_raw(tube, count):
+    if not _fake(tube):
+        tube.put_many([('payload', 1, 1)] * count, ids_only=True)
+
+    take = tube.take
+    rows = []
+    started = time.time()
+    for _ in range(count):
+        rows.append(take(timeout=0, raw=True))
+    elapsed = time.time() - started
+
+    if not _fake(tube):
+        tube.ack_many(rows)
+    return elapsed
+
+
+def bench_ack(tube, count):
+    tasks = _taken(tube, count)
+    started = time.time()
+    for task in tasks:
+        task.ack()
+    return time.time() - started
+
+
+def bench_release(tube, count):
+    tasks = _taken(tube, count)
+    started = time.time()
+    for task in tasks:
+        task.release()
+    elapsed = time.time() - started
+
+    if not _fake(tube):
+        _cleanup(tube, tube.take_many(count, timeout=0))
+    return elapsed
+
+
+def bench_peek(tube, count):
+    tasks = _taken(tube, 1)
+    peek = tasks[0].peek
+    started = time.time()
+    for _ in range(count):
+        peek()
+    elapsed = time.time() - started
+
+    _cleanup(tube, tasks)
+    return elapsed
+
+
+def bench_task(tube, count):
+    response = FakeConnection(None, None).call('put', ())
+    create = Task.create_from_tuple
+    started = time.time()
+    for _ in range(count):
+        create(tube, response)
+    return time.time() - started
+
+
+def bench_task_row(tube, count):
+    row = FakeConnection(None, None).call('put', ())[0]
+    started = time.time()
+    for _ in range(count):
+        task = task_row(row)
+        task.to_send_at
+        task.valid_until
+        task.created_at
+    return time.time() - started
+
+
+def bench_task_update(tube, count):
+    response = FakeConnection(None, None).call('put', ())
+    task = Task.create_from_tuple(tube, response)
+    update = task.update_from_tuple
+    started = time.time()
+    for _ in range(count):
+        update(response)
+    return time.time() - started
+
+
+def bench_task_properties(tube, count):
+    response = FakeConnection(None, None).call('put', ())
+    task = Task.create_from_tuple(tube, response)
+    started = time.time()
+    for _ in range(count):
+        task.state_name
+        task.to_send_at
+        task.valid_until
+        task.created_at
+    return time.time() - started
+
+
+def bench_cmd(tube, count):
+    cmd = tube.cmd
+    started = time.time()
+    for _ in range(count):
+        cmd('put')
+    return time.time() - started
+
+
+BENCHMARKS = [
+    ('put', bench_put),
+    ('take', bench_take),
+    ('take_raw', bench_take_raw),
+    ('ack', bench_ack),
+    ('release', bench_release),
+    ('peek', bench_peek),
+    ('task', bench_task),
+    ('task_row', bench_task_row),
+    ('task_update', bench_task_update),
+    ('task_properties', bench_task_properties),
+    ('cmd', bench_cmd),
+]
+# benchmarks which do not use connection at all
+LOCAL = ('task', 'task_row', 'task_update', 'task_properties', 'cmd')
+
+
+def allocations(tube, func, count):
+    """
+    Returns `(allocated, peak)` bytes per operation measured by tracemalloc.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        snapshot = tracemalloc.take_snapshot()
+        func(tube, count)
+        stats = tracemalloc.take_snapshot().compare_to(snapshot, 'filename')
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return allocated / float(count), peak / float(count)
+
+
+def run(target, tube, names, count, alloc_count, repeat):
+    """
+    Run benchmarks, returns list of result dicts.
+
+    Time is the best of `repeat` runs. Memory is measured by tracemalloc
+    in separate run of `alloc_count` operations: `peak_bytes_per_op` is
+    peak traced memory growth during run, `retained_bytes_per_op` is
+    memory still allocated after run (both divided by operations).
+    """
+    results = []
+    for name, func in BENCHMARKS:
+        if names and name not in names:
+            continue
+        if target != 'fake' and name in LOCAL:
+            continue
+
+        func(tube, min(count, 100))  # warm up
+        gc.collect()
+        elapsed = min(func(tube, count) for _ in range(repeat))
+        allocated, peak = allocations(tube, func, alloc_count)
+
+        result = dict(
+            target=target,
+            name=name,
+            count=count,
+            elapsed=elapsed,
+            ops=count / elapsed if elapsed else 0,
+            us_per_op=elapsed * 1000000 / count,
+            retained_bytes_per_op=allocated,
+            peak_bytes_per_op=peak,
+        )
+        results.append(result)
+        print('{target:<8} {name:<16} {ops:>12.0f} ops/s {us_per_op:>8.2f} us'
+              ' {peak_bytes_per_op:>8.0f} B peak/op'
+              ' {retained_bytes_per_op:>8.0f} B retained/op'.format(**result))
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Print change against baseline results, returns `False` on regression.
+    """
+    with open(baseline_path) as f:
+        baseline = dict(
+            ((item['target'], item['name']), item)
+            for item in json.load(f)['results']
+        )
+
+    ok = True
+    print('\nChange against {0}:'.format(baseline_path))
+    for result in results:
+        base = baseline.get((result['target'], result['name']))
+        if base is None or not base['ops']:
+            continue
+        change = (result['ops'] / base['ops'] - 1) * 100
+        regression = change < -threshold
+        ok = ok and not regression
+        print('{0:<8} {1:<16} {2:>+8.1f}%{3}'.format(
+            result['target'], result['name'], change,
+            '  REGRESSION' if regression else ''
+        ))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=10000)
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="report best time of several runs")
+    parser.add_argument('--alloc-count', type=int, default=1000,
+                        help="operations measured by tracemalloc")
+    parser.add_argument('--target', action='append',
+                        choices=['fake', 'stand-in'],
+                        help="default: fake and stand-in")
+    parser.add_argument('--bench', action='append',
+                        choices=[name for name, _ in BENCHMARKS])
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--user', default='test')
+    parser.add_argument('--password', default='test')
+    parser.add_argument('--json', help="store results to file")
+    parser.add_argument('--compare', help="compare with stored results")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="regression threshold, percent")
+    args = parser.parse_args()
+
+    if args.port is not None:
+        targets = ['tarantool']
+    else:
+        targets = args.target or ['fake', 'stand-in']
+
+    results = []
+    for target in targets:
+        server = None
+        host, port = args.host or '127.0.0.1', args.port
+        if target == 'stand-in':
+            server = DequeServer(user=args.user, password=args.password,
+                                 tubes=[TUBE])
+            server.start()
+            host, port = server.address
+
+        deque = Deque(host, port or 33013, user=args.user,
+                      password=args.password)
+        if target == 'fake':
+            deque.tarantool_connection = FakeConnection
+
+        try:
+            results.extend(run(target, deque.tube(TUBE), args.bench,
+                               args.count, args.alloc_count, args.repeat))
+        finally:
+            if server is not None:
+                server.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(
+                python=platform.python_version(),
+                implementation=platform.python_implementation(),
+                platform=platform.platform(),
+                created_at=time.time(),
+                results=results,
+            ), f, indent=2, sort_keys=True)
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: per-task `Tube.put` against chunked `Tube.put_many`.
+
+Runs against in-process stand-in server by default, or against real
+Tarantool deque if `--host`/`--port` are given:
+
+    $ python benchmarks/put_many.py -n 20000
+    $ python benchmarks/put_many.py --host 127.0.0.1 --port 33016
+"""
+import argparse
+import time
+
+from tarantool_deque import Deque
+from tarantool_deque.server import DequeServer
+
+
+def bench(name, count, func):
+    """
+    Run `func` and print tasks per second.
+    """
+    started = time.time()
+    func()
+    elapsed = time.time() - started
+    print('{0:<30} {1:>8} tasks {2:>8.3f} s {3:>12.0f} tasks/s'.format(
+        name, count, elapsed, count / elapsed
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, action='append')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--user', default='test')
+    parser.add_argument('--password', default='test')
+    parser.add_argument('--tube', default='test_tube')
+    args = parser.parse_args()
+
+    server = None
+    if args.port is None:
+        server = DequeServer(user=args.user, password=args.password,
+                             tubes=[args.tube])
+        server.start()
+        args.host, args.port = server.address
+
+    deque = Deque(args.host or '127.0.0.1', args.port,
+                  user=args.user, password=args.password)
+    tube = deque.tube(args.tube)
+    tasks = [('payload {0}'.format(i), 1, 1) for i in range(args.count)]
+
+    def put():
+        for task in tasks:
+            tube.put(*task)
+
+    def put_many(chunk_size, ids_only):
+        def run():
+            result = tube.put_many(tasks, chunk_size=chunk_size,
+                                   ids_only=ids_only)
+            assert result.ok, result.errors
+        return run
+
+    try:
+        bench('put', args.count, put)
+        for chunk_size in args.chunk_size or [100, 1000]:
+            bench('put_many(chunk_size={0})'.format(chunk_size),
+                  args.count, put_many(chunk_size, False))
+            bench('put_many(chunk_size={0}, ids)'.format(chunk_size),
+                  args.count, put_many(chunk_size, True))
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: memory used by `Task` objects against dict-based wrapper.
+
+Creates `-n` tasks from deque tuple rows and prints memory retained
+per task (payload and row included):
+
+    $ python benchmarks/task_memory.py -n 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import msgpack
+
+from tarantool_deque.tarantool_deque import Task
+
+
+class DictTask(object):
+    """
+    Task wrapper with per-instance `__dict__` and fields copied from row.
+    """
+    def __init__(self, tube, row):
+        self.tube = tube
+        self.deque = tube.deque
+        (self.task_id, self.state, self.next_event, self.msg_type,
+         self.obj_type, self.obj_id, self.channel, self._to_send_at,
+         self._valid_until, self._created_at, self.data) = row
+
+
+class FakeTube(object):
+    """
+    Tube stub: tasks only need `deque` reference.
+    """
+    deque = None
+
+
+def make_rows(count):
+    """
+    Returns `count` task rows decoded from msgpack like tarantool
+    connector does.
+    """
+    now = int(time.time() * 10000000)
+    rows = [
+        [i, 1, now, 1, 1, i, 1, now, now + 10000000, now, {'payload': i}]
+        for i in range(count)
+    ]
+    return msgpack.unpackb(msgpack.packb(rows), raw=False)
+
+
+def measure(name, count, factory):
+    """
+    Create `count` tasks with `factory(tube, row)`, print memory usage.
+    """
+    tube = FakeTube()
+    gc.collect()
+    tracemalloc.start()
+    rows = make_rows(count)
+    started = time.time()
+    tasks = [factory(tube, row) for row in rows]
+    elapsed = time.time() - started
+    del rows
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{0:<10} {1:>8} tasks {2:>8.0f} bytes/task {3:>8.3f} s'.format(
+        name, len(tasks), size / count, elapsed
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    measure('dict', args.count, DictTask)
+    measure('slots', args.count, Task.create_from_row)
+
+
+if __name__ == '__main__':
+    main()
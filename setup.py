@@ -40,19 +40,21 @@ setup(
     packages=find_packages('src'),
     package_dir={'': 'src'},
     install_requires=[
+        'msgpack>=0.6.1',
         'tarantool>0.4'
     ],
     tests_require=[
         'tarantool>0.4'
     ],
     test_suite='tests',
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 4 - Beta',
         'Operating System :: OS Independent',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Database :: Front-Ends',
         'Environment :: Console'
     ]
@@ -0,0 +1,830 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio bindings for Tarantool delayed queue script.
+
+Same API as `tarantool_deque.Deque`, but every command is a coroutine.
+All commands are pipelined over one connection: requests are matched
+with responses by iproto sync id, so many of them may be in flight
+at the same time (e.g. long `take` does not block `put`).
+
+Usage:
+
+    >>> from tarantool_deque.aio import AsyncDeque
+    >>> deque = AsyncDeque('127.0.0.1', 33013, user='test', password='test')
+    >>> tube = deque.tube('delayed_queue')
+    >>> await tube.put([1, 2, 3], channel=1, msg_type=1)
+    >>> task = await tube.take(timeout=1)
+    >>> await task.ack()
+        True
+    >>> await deque.close()
+"""
+import asyncio
+import itertools
+
+from . import iproto
+from .tarantool_deque import (BaseTube, BulkResult, Deque, Task, TaskRow,
+                              _chunks, task_row)
+
+
+def _network_error(error):
+    """
+    Returns `NetworkError` wrapping socket or other error.
+    """
+    if getattr(error, 'errno', None) is not None:
+        return Deque.NetworkError(error)
+    return Deque.NetworkError(str(error) or error.__class__.__name__)
+
+
+class Response(list):
+    """
+    Tarantool response data (list of rows) compatible with
+    `tarantool.response.Response` as far as deque bindings need.
+    """
+    return_code = 0
+
+    @property
+    def rowcount(self):
+        """
+        Number of rows in response.
+        """
+        return len(self)
+
+
+class AsyncConnection(object):
+    """
+    Asyncio tarantool connection with requests pipelining.
+    """
+    def __init__(self, host, port, user=None, password=None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.call_16 = False
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._waiters = {}
+        self._sync = itertools.count(1)
+
+    @property
+    def connected(self):
+        """
+        Returns `True` if connection is opened.
+        """
+        return self._writer is not None
+
+    async def connect(self):
+        """
+        Open connection, read greeting and authenticate.
+        """
+        try:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            greeting = await self._reader.readexactly(iproto.GREETING_SIZE)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self._close_transport()
+            raise _network_error(e)
+
+        # deque script for Tarantool 1.6 needs old-style call
+        self.call_16 = iproto.greeting_version(greeting) < (1, 7, 2)
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+        if self.user:
+            salt = iproto.greeting_salt(greeting)
+            try:
+                await self._request(lambda sync: iproto.auth_request(
+                    sync, self.user, salt, self.password or ''
+                ))
+            except Deque.DatabaseError:
+                await self.close()
+                raise
+
+    async def _read_loop(self):
+        """
+        Read responses and pass them to waiting requests.
+        """
+        error = None
+        try:
+            while True:
+                prefix = await self._reader.readexactly(1)
+                rest = iproto.length_size(bytearray(prefix)[0])
+                if rest:
+                    prefix += await self._reader.readexactly(rest)
+                payload = await self._reader.readexactly(
+                    iproto.unpack_length(prefix)
+                )
+                header, body = iproto.unpack(payload)
+
+                sync = header.get(iproto.IPROTO_SYNC)
+                waiter = self._waiters.pop(sync, None)
+                if waiter is None or waiter.done():
+                    continue
+
+                code = header.get(iproto.IPROTO_CODE, 0)
+                if code & iproto.REQUEST_TYPE_ERROR:
+                    waiter.set_exception(Deque.DatabaseError(
+                        code & (iproto.REQUEST_TYPE_ERROR - 1),
+                        body.get(iproto.IPROTO_ERROR, '')
+                    ))
+                else:
+                    waiter.set_result(
+                        Response(body.get(iproto.IPROTO_DATA) or [])
+                    )
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            error = e
+        except asyncio.CancelledError:
+            error = ConnectionAbortedError("Connection closed")
+        finally:
+            self._close_transport()
+            for waiter in self._waiters.values():
+                if not waiter.done():
+                    waiter.set_exception(_network_error(
+                        error or ConnectionAbortedError("Connection closed")
+                    ))
+            self._waiters = {}
+
+    def _close_transport(self):
+        """
+        Close socket.
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _request(self, make_packet):
+        """
+        Send request built by `make_packet(sync)` and wait for response.
+        """
+        if self._writer is None:
+            raise _network_error(ConnectionError("Not connected"))
+
+        sync = next(self._sync)
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters[sync] = waiter
+        try:
+            self._writer.write(make_packet(sync))
+            return await waiter
+        finally:
+            self._waiters.pop(sync, None)
+
+    async def call(self, name, args):
+        """
+        Call stored procedure.
+
+        Returns `Response` object.
+        """
+        return await self._request(lambda sync: iproto.call_request(
+            sync, name, args, self.call_16
+        ))
+
+    async def close(self):
+        """
+        Close connection, fail all pending requests.
+        """
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        self._close_transport()
+
+
+class AsyncTask(Task):
+    """
+    Tarantool deque task wrapper for asyncio.
+    """
+    __slots__ = ()
+
+    def __del__(self):
+        if getattr(self, 'state', None) != 2:
+            return
+        loop = self.deque.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._schedule_release)
+
+    def _schedule_release(self):
+        """
+        Release task in background (on garbage collection).
+        """
+        async def release():
+            try:
+                await self.deque.release(self.tube, self.task_id)
+            except self.deque.DatabaseError:
+                pass
+        asyncio.ensure_future(release())
+
+    async def ack(self):
+        """
+        Report task successful execution.
+
+        Returns `True` is task is acked (task state is 'done' now).
+        """
+        the_tuple = await self.deque.ack(self.tube, self.task_id)
+
+        self.update_from_tuple(the_tuple)
+
+        return bool(self.state == 3)
+
+    async def ack_and_take(self, timeout=None, channel=None, msg_type=None):
+        """
+        Report task successful execution and get the next task from tube
+        in one round trip, see `AsyncTube.ack_and_take`.
+
+        Returns either an `AsyncTask` object or `None`.
+        """
+        return await self.tube.ack_and_take(self, timeout=timeout,
+                                            channel=channel,
+                                            msg_type=msg_type)
+
+    async def release(self, delay=None):
+        """
+        Put the task back into the deque.
+
+        Returns `True` is task is released.
+        """
+        the_tuple = await self.deque.release(self.tube, self.task_id,
+                                             delay=delay)
+
+        self.update_from_tuple(the_tuple)
+
+        if delay is None:
+            return bool(self.state == 1)
+        else:
+            return bool(self.state == 0)
+
+    async def peek(self):
+        """
+        Look at a task without changing its state.
+
+        Always returns `True`.
+        """
+        the_tuple = await self.deque.peek(self.tube, self.task_id)
+
+        self.update_from_tuple(the_tuple)
+
+        return True
+
+    async def delete(self):
+        """
+        Delete task (in any state) permanently.
+
+        Returns `True` is task is deleted.
+        """
+        the_tuple = await self.deque.delete(self.tube, self.task_id)
+
+        self.update_from_tuple(the_tuple)
+
+        return bool(self.state == 3)
+
+    async def retry(self):
+        """
+        Release failed task according to tube retry policy, see
+        `Task.retry`.
+
+        Returns action: 'released', 'deleted' or 'moved'.
+        """
+        return await self.tube.retry(self)
+
+
+class AsyncTube(BaseTube):
+    """
+    Tarantool deque tube wrapper for asyncio.
+
+    Thread based helpers of `Tube` (`iter_tasks`, `consume`, `producer`)
+    are not available.
+    """
+    async def put(self, data, channel, msg_type, obj_type=0, obj_id=0,
+                  to_send_at=None, valid_until=None):
+        """
+        Enqueue a task.
+
+        Returns an `AsyncTask` object.
+        """
+        cmd = self.cmd('put')
+        args = self.encode_args(data, channel, msg_type, obj_type, obj_id,
+                                to_send_at, valid_until)
+
+        the_tuple = await self.deque.call(self, cmd, args)
+
+        return AsyncTask.create_from_tuple(self, the_tuple)
+
+    async def put_many(self, tasks, chunk_size=1000, ids_only=False):
+        """
+        Enqueue many tasks, one request per `chunk_size` tasks.
+
+        All chunks are sent at once. See `Tube.put_many`.
+        """
+        chunks = list(_chunks(tasks, chunk_size))
+        requests = [
+            self.deque.put_many(self, [
+                self.encode_args(**task) if isinstance(task, dict)
+                else self.encode_args(*task)
+                for task in chunk
+            ])
+            for _, chunk in chunks
+        ]
+        responses = await asyncio.gather(*requests, return_exceptions=True)
+
+        result = BulkResult()
+        for (offset, chunk), the_tuple in zip(chunks, responses):
+            if isinstance(the_tuple, Deque.DatabaseError):
+                result.add_error(offset, chunk, the_tuple)
+            elif isinstance(the_tuple, BaseException):
+                raise the_tuple
+            elif any(isinstance(row, Exception) for row in the_tuple):
+                # tasks are put one by one (see `AsyncDeque.put_many`)
+                for index, row in enumerate(the_tuple):
+                    if isinstance(row, Exception):
+                        result.add_error(offset + index, [chunk[index]], row)
+                    elif ids_only:
+                        result.results.append(row[0])
+                    else:
+                        result.results.append(
+                            AsyncTask.create_from_row(self, row)
+                        )
+            elif ids_only:
+                result.results.extend(row[0] for row in the_tuple)
+            else:
+                result.results.extend(
+                    AsyncTask.create_from_row(self, row) for row in the_tuple
+                )
+
+        return result
+
+    async def take(self, timeout=None, channel=None, msg_type=None):
+        """
+        Get a task (matching `channel` and `msg_type`, if set) from deque
+        for execution.
+
+        Returns either an `AsyncTask` object or `None`.
+        """
+        the_tuple = await self.deque.take(self, timeout=timeout,
+                                          channel=channel, msg_type=msg_type)
+
+        if the_tuple.rowcount:
+            return AsyncTask.create_from_tuple(self, the_tuple)
+
+    async def take_many(self, count, timeout=None, channel=None,
+                        msg_type=None):
+        """
+        Get up to `count` tasks (matching `channel` and `msg_type`, if set)
+        from deque for execution in one request.
+
+        Returns list of `AsyncTask` objects (may be empty).
+        """
+        the_tuple = await self.deque.take_many(self, count, timeout=timeout,
+                                               channel=channel,
+                                               msg_type=msg_type)
+
+        return [AsyncTask.create_from_row(self, row) for row in the_tuple]
+
+    async def ack(self, task_id):
+        """
+        Report execution of task by id.
+
+        Returns `True` is task is acked.
+        """
+        the_tuple = await self.deque.ack(self, task_id)
+
+        return bool(the_tuple[0][1] == 3)
+
+    async def ack_and_take(self, task, timeout=None, channel=None,
+                           msg_type=None):
+        """
+        Ack task (`AsyncTask` object, updated in place, or task id) and get
+        the next task for execution: `ack` and `take` without waiting are
+        sent at once. If no READY task is found, waits for it up to
+        `timeout` seconds by a separate `take`.
+
+        If ack fails, taken task is released and ack error is raised.
+
+        Returns either an `AsyncTask` object or `None`.
+        """
+        task_id = task.task_id if isinstance(task, (Task, TaskRow)) else task
+
+        ack, the_tuple = await asyncio.gather(
+            self.deque.ack(self, task_id),
+            self.deque.take(self, timeout=0, channel=channel,
+                            msg_type=msg_type),
+            return_exceptions=True
+        )
+
+        next_task = None
+        if not isinstance(the_tuple, BaseException) and the_tuple.rowcount:
+            next_task = AsyncTask.create_from_tuple(self, the_tuple)
+
+        if isinstance(ack, BaseException):
+            if next_task is not None:
+                await next_task.release()
+            raise ack
+        if isinstance(task, Task):
+            task.update_from_tuple(ack)
+        if isinstance(the_tuple, BaseException):
+            raise the_tuple
+
+        if next_task is None and timeout != 0:
+            return await self.take(timeout, channel, msg_type)
+        return next_task
+
+    async def release(self, task_id, delay=None):
+        """
+        Put the task back into the deque by id.
+
+        Returns `True` is task is released.
+        """
+        the_tuple = await self.deque.release(self, task_id, delay=delay)
+
+        return bool(the_tuple[0][1] == (1 if delay is None else 0))
+
+    async def peek(self, task_id):
+        """
+        Look at a task by id without changing its state.
+
+        Returns `TaskRow` record.
+        """
+        the_tuple = await self.deque.peek(self, task_id)
+
+        if not the_tuple.rowcount:
+            raise Deque.ZeroTupleException("Error peeking task")
+
+        return task_row(the_tuple[0])
+
+    async def retry(self, task):
+        """
+        Release failed task according to retry policy, see `Task.retry`.
+        """
+        policy = self.retry_policy(task.channel)
+        if policy is None:
+            await task.release()
+            return 'released'
+        return await policy.retry_async(task)
+
+    async def _bulk(self, method, tasks, chunk_size, state, *args):
+        """
+        Call bulk deque `method` for tasks, one request per chunk.
+
+        See `Tube._bulk`.
+        """
+        result = BulkResult()
+
+        for offset, chunk in _chunks(tasks, chunk_size):
+            task_ids = [
+                task.task_id if isinstance(task, (Task, TaskRow)) else task
+                for task in chunk
+            ]
+
+            try:
+                the_tuple = await method(self, task_ids, *args)
+            except Deque.DatabaseError as e:
+                result.add_error(offset, chunk, e)
+                continue
+
+            rows = dict((row[0], row) for row in the_tuple)
+            for task, task_id in zip(chunk, task_ids):
+                row = rows.get(task_id)
+                if row is not None and isinstance(task, Task):
+                    task.update_from_row(row)
+                result.results.append(bool(row is not None and
+                                           row[1] == state))
+
+        return result
+
+    async def ack_many(self, tasks, chunk_size=1000):
+        """
+        Report successful execution of many tasks, see `Tube.ack_many`.
+        """
+        return await self._bulk(self.deque.ack_many, tasks, chunk_size, 3)
+
+    async def release_many(self, tasks, delay=None, chunk_size=1000):
+        """
+        Put many tasks back into the deque, see `Tube.release_many`.
+        """
+        state = 1 if delay is None else 0
+
+        return await self._bulk(self.deque.release_many, tasks, chunk_size,
+                                state, delay)
+
+    async def delete_many(self, tasks, chunk_size=1000):
+        """
+        Delete many tasks (in any state) permanently, see `Tube.delete_many`.
+        """
+        return await self._bulk(self.deque.delete_many, tasks, chunk_size, 3)
+
+    async def drop(self):
+        """
+        Drop entire query (if there are no in-progress tasks or workers).
+        """
+        return await self.deque.drop(self)
+
+
+class AsyncDeque(object):
+    """
+    Tarantool deque wrapper for asyncio.
+
+    Connection is opened on first command (or by `connect`).
+    """
+    DatabaseError = Deque.DatabaseError
+    NetworkError = Deque.NetworkError
+    BadConfigException = Deque.BadConfigException
+    ZeroTupleException = Deque.ZeroTupleException
+    BadTupleException = Deque.BadTupleException
+
+    def __init__(self, host='localhost', port=33013, user=None,
+                 password=None):
+        if not host or not port:
+            raise Deque.BadConfigException(
+                "Host and port params must be not empty"
+            )
+
+        if not isinstance(port, int):
+            raise Deque.BadConfigException("Port must be int")
+
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.tubes = {}
+        self.loop = None
+        self._tnt = None
+        self._lock = None
+        self._no_bulk = set()
+
+    async def connect(self):
+        """
+        Get or create tarantool connection.
+        """
+        if self._tnt is not None and self._tnt.connected:
+            return self._tnt
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._tnt is None or not self._tnt.connected:
+                tnt = AsyncConnection(self.host, self.port,
+                                      user=self.user, password=self.password)
+                await tnt.connect()
+                self._tnt = tnt
+                self.loop = asyncio.get_event_loop()
+
+        return self._tnt
+
+    async def close(self):
+        """
+        Close tarantool connection.
+        """
+        if self._tnt is not None:
+            await self._tnt.close()
+            self._tnt = None
+
+    async def call(self, tube, cmd, args, task_ids=()):
+        """
+        Call tarantool deque command.
+
+        Returns `Response` object.
+        """
+        tnt = await self.connect()
+        return await tnt.call(cmd, args)
+
+    async def _bulk_call(self, tube, cmd_name, fallback, call):
+        """
+        Call bulk deque command by `await call(cmd)`, or `await fallback()`
+        if deque script has no such command, see `Deque._bulk_call`.
+        """
+        cmd = tube.cmd(cmd_name)
+        if cmd not in self._no_bulk:
+            try:
+                return await call(cmd)
+            except Deque.NetworkError:
+                raise
+            except Deque.DatabaseError as e:
+                if e.args[0] != iproto.ER_NO_SUCH_PROC:
+                    raise
+
+        rows = await fallback()
+        self._no_bulk.add(cmd)
+        return rows
+
+    async def _call_each(self, tube, cmd_name, calls):
+        """
+        Send single command for every `(args, task_ids)` pair at once
+        (fallback of bulk commands).
+
+        Returns list of `Response` objects or `DatabaseError` objects
+        of failed calls. Raises other errors (e.g. `NetworkError`).
+        """
+        cmd = tube.cmd(cmd_name)
+        results = await asyncio.gather(*[
+            self.call(tube, cmd, args, task_ids) for args, task_ids in calls
+        ], return_exceptions=True)
+
+        for error in results:
+            if isinstance(error, BaseException) and not (
+                isinstance(error, Deque.DatabaseError) and
+                not isinstance(error, Deque.NetworkError) and
+                error.args[0] != iproto.ER_NO_SUCH_PROC
+            ):
+                raise error
+        return results
+
+    async def _call_tasks(self, tube, cmd_name, task_ids, args=()):
+        """
+        Call bulk tarantool deque command on list of tasks. Without bulk
+        command in deque script tasks are sent one by one.
+
+        Returns `Response` object or list of rows.
+        """
+        task_ids = list(task_ids)
+
+        async def call(cmd):
+            return await self.call(tube, cmd, (task_ids,) + args, task_ids)
+
+        async def fallback():
+            # failed commands are skipped, like in bulk command result
+            results = await self._call_each(tube, cmd_name[:-len('_many')], [
+                ((task_id,) + args, (task_id,)) for task_id in task_ids
+            ])
+            return [row for the_tuple in results
+                    if not isinstance(the_tuple, Exception)
+                    for row in the_tuple]
+
+        return await self._bulk_call(tube, cmd_name, fallback, call)
+
+    async def put_many(self, tube, tasks):
+        """
+        Enqueue many tasks (list of `put` arguments) in one request.
+
+        Without `put_many` in deque script tasks are put one by one:
+        returned list has error object instead of row for every failed
+        task.
+
+        Returns `Response` object with one row per task.
+        """
+        async def call(cmd):
+            return await self.call(tube, cmd, (tasks,))
+
+        async def fallback():
+            rows = []
+            for the_tuple in await self._call_each(tube, 'put', [
+                (args, ()) for args in tasks
+            ]):
+                if not isinstance(the_tuple, Exception) and \
+                        not the_tuple.rowcount:
+                    the_tuple = Deque.ZeroTupleException(
+                        "Error creating task"
+                    )
+                rows.append(the_tuple if isinstance(the_tuple, Exception)
+                            else the_tuple[0])
+            return rows
+
+        return await self._bulk_call(tube, 'put_many', fallback, call)
+
+    async def take(self, tube, timeout=None, channel=None, msg_type=None):
+        """
+        Get a task from deque for execution.
+
+        Returns `Response` object.
+        """
+        cmd = tube.cmd(tube.take_cmd_name('take', channel, msg_type))
+        args = tube.take_args(timeout, channel, msg_type)
+
+        return await self.call(tube, cmd, args)
+
+    async def take_many(self, tube, count, timeout=None, channel=None,
+                        msg_type=None):
+        """
+        Get up to `count` tasks from deque for execution.
+
+        Returns `Response` object (or list) with one row per task.
+        """
+        args = (count,) + tube.take_args(timeout, channel, msg_type)
+
+        async def call(cmd):
+            return await self.call(tube, cmd, args)
+
+        async def fallback():
+            # wait for the first task, then take the rest without waiting
+            rows = list(await self.take(tube, timeout, channel, msg_type))
+            if rows and count > 1:
+                take_args = tube.take_args(0, channel, msg_type)
+                for the_tuple in await self._call_each(
+                    tube, tube.take_cmd_name('take', channel, msg_type),
+                    [(take_args, ())] * (count - 1)
+                ):
+                    if not isinstance(the_tuple, Exception):
+                        rows.extend(the_tuple)
+            return rows
+
+        return await self._bulk_call(
+            tube, tube.take_cmd_name('take_many', channel, msg_type),
+            fallback, call
+        )
+
+    async def ack(self, tube, task_id):
+        """
+        Report task successful execution.
+
+        Returns `Response` object.
+        """
+        cmd = tube.cmd('ack')
+        args = (task_id,)
+
+        return await self.call(tube, cmd, args, (task_id,))
+
+    async def release(self, tube, task_id, delay=None):
+        """
+        Put the task back into the deque.
+
+        Returns `Response` object.
+        """
+        cmd = tube.cmd('release')
+        args = (task_id,)
+
+        if delay is not None:
+            args += (delay,)
+
+        return await self.call(tube, cmd, args, (task_id,))
+
+    async def ack_many(self, tube, task_ids):
+        """
+        Report successful execution of many tasks.
+
+        Returns `Response` object (or list of rows) of acked tasks only.
+        """
+        return await self._call_tasks(tube, 'ack_many', task_ids)
+
+    async def release_many(self, tube, task_ids, delay=None):
+        """
+        Put many tasks back into the deque.
+
+        Returns `Response` object (or list of rows) of released tasks only.
+        """
+        args = ()
+
+        if delay is not None:
+            args += (delay,)
+
+        return await self._call_tasks(tube, 'release_many', task_ids, args)
+
+    async def delete_many(self, tube, task_ids):
+        """
+        Delete many tasks (in any state) permanently.
+
+        Returns `Response` object (or list of rows) of deleted tasks only.
+        """
+        return await self._call_tasks(tube, 'delete_many', task_ids)
+
+    async def peek(self, tube, task_id):
+        """
+        Look at a task without changing its state.
+
+        Returns `Response` object.
+        """
+        cmd = tube.cmd('peek')
+        args = (task_id,)
+
+        return await self.call(tube, cmd, args, (task_id,))
+
+    async def delete(self, tube, task_id):
+        """
+        Delete task (in any state) permanently.
+
+        Returns `Response` object.
+        """
+        cmd = tube.cmd('delete')
+        args = (task_id,)
+
+        return await self.call(tube, cmd, args, (task_id,))
+
+    async def drop(self, tube):
+        """
+        Drop entire query (if there are no in-progress tasks or workers).
+
+        Returns `True` on successful drop.
+        """
+        cmd = tube.cmd('drop')
+        args = ()
+
+        the_tuple = await self.call(tube, cmd, args)
+
+        return bool(the_tuple.return_code == 0)
+
+    def tube(self, name, codec=None):
+        """
+        Create tube object, if not created before.
+
+        Returns `AsyncTube` object.
+        """
+        tube = self.tubes.get(name)
+
+        if tube is None:
+            tube = AsyncTube(self, name)
+            self.tubes[name] = tube
+        if codec is not None:
+            tube.codec = codec
+
+        return tube
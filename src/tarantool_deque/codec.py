@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Task payload codecs.
+
+Encoded payload is stored in deque as bytes: header (magic, serializer
+and compression codes) and serialized (maybe compressed) data. Codes are
+recorded in every payload, so payloads encoded with different codecs
+(or not encoded at all) are decoded by the same `decode` function.
+
+Usage:
+
+    >>> tube = deque.tube('name', codec=Codec('json', 'zlib', threshold=1024))
+    >>> tube.put({'large': 'payload'}, channel=1, msg_type=1)
+"""
+import json
+import struct
+import zlib
+
+import msgpack
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+# 0xc1 is never used in msgpack, so serialized payload never starts with it
+MAGIC = b'\xc1TDQ'
+HEADER = struct.Struct('>4sBB')
+
+# name -> (code, dumps, loads)
+SERIALIZERS = {}
+# name -> (code, compress, decompress)
+COMPRESSIONS = {}
+
+_serializers_by_code = {}
+_compressions_by_code = {}
+
+
+def register_serializer(name, code, dumps, loads):
+    """
+    Register serializer: `dumps(data)` returns bytes, `loads(bytes)`
+    returns data. Codes 0-127 are reserved for built-in serializers.
+    """
+    if not 0 <= code <= 255:
+        raise ValueError("Serializer code must be in range 0-255")
+    SERIALIZERS[name] = (code, dumps, loads)
+    _serializers_by_code[code] = (name, dumps, loads)
+
+
+def register_compression(name, code, compress, decompress):
+    """
+    Register compression: `compress(bytes)` and `decompress(bytes)`
+    return bytes. Codes 0-127 are reserved for built-in compressions.
+    """
+    if not 0 <= code <= 255:
+        raise ValueError("Compression code must be in range 0-255")
+    COMPRESSIONS[name] = (code, compress, decompress)
+    _compressions_by_code[code] = (name, compress, decompress)
+
+
+def _bytes(data):
+    """
+    Raw serializer: payload must be bytes already.
+    """
+    if not isinstance(data, bytes):
+        raise TypeError("Raw payload must be bytes")
+    return data
+
+
+register_serializer('raw', 0, _bytes, _bytes)
+register_serializer(
+    'msgpack', 1,
+    lambda data: msgpack.packb(data, use_bin_type=True),
+    lambda buf: msgpack.unpackb(buf, raw=False),
+)
+register_serializer(
+    'json', 2,
+    lambda data: json.dumps(data, separators=(',', ':')).encode('utf-8'),
+    lambda buf: json.loads(buf.decode('utf-8')),
+)
+
+register_compression('none', 0, _bytes, _bytes)
+register_compression('zlib', 1, zlib.compress, zlib.decompress)
+if lz4 is not None:
+    register_compression('lz4', 2, lz4.frame.compress, lz4.frame.decompress)
+
+
+def is_encoded(value):
+    """
+    Returns `True` if value is encoded payload.
+    """
+    return isinstance(value, bytes) and value[:len(MAGIC)] == MAGIC
+
+
+def decode(value):
+    """
+    Returns decoded payload. Not encoded values are returned as is.
+    """
+    if not is_encoded(value):
+        return value
+
+    _, serializer, compression = HEADER.unpack_from(value)
+    try:
+        loads = _serializers_by_code[serializer][2]
+        decompress = _compressions_by_code[compression][2]
+    except KeyError:
+        raise ValueError("Unknown payload codec: {0}/{1}".format(
+            serializer, compression
+        ))
+    return loads(decompress(value[HEADER.size:]))
+
+
+class Codec(object):
+    """
+    Payload codec: serializes data with `serializer` and compresses
+    it with `compression` if serialized data is at least `threshold`
+    bytes long (and compressed data is shorter).
+    """
+    def __init__(self, serializer='msgpack', compression='zlib',
+                 threshold=1024):
+        if serializer not in SERIALIZERS:
+            raise ValueError("Unknown serializer: {0}".format(serializer))
+        if compression is None:
+            compression = 'none'
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                "Unknown compression (maybe not installed): {0}".format(
+                    compression
+                )
+            )
+
+        self.serializer = serializer
+        self.compression = compression
+        self.threshold = threshold
+
+        self._serializer_code, self._dumps, _ = SERIALIZERS[serializer]
+        self._compression_code, self._compress, _ = COMPRESSIONS[compression]
+
+    def __repr__(self):
+        return "Codec({0!r}, {1!r}, threshold={2})".format(
+            self.serializer, self.compression, self.threshold
+        )
+
+    def encode(self, data):
+        """
+        Returns encoded payload (bytes).
+        """
+        buf = self._dumps(data)
+        compression = 0
+        if self._compression_code and len(buf) >= self.threshold:
+            compressed = self._compress(buf)
+            if len(compressed) < len(buf):
+                buf = compressed
+                compression = self._compression_code
+        return HEADER.pack(MAGIC, self._serializer_code, compression) + buf
+
+    decode = staticmethod(decode)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal Tarantool binary protocol (iproto) helpers.
+
+Only the parts used by deque bindings are implemented: greeting,
+authentication (chap-sha1), `call` requests and responses.
+"""
+import base64
+import hashlib
+import struct
+
+import msgpack
+
+
+GREETING_SIZE = 128
+GREETING_LINE_SIZE = 64
+SCRAMBLE_SIZE = 20
+
+# request types
+REQUEST_TYPE_OK = 0x00
+REQUEST_TYPE_SELECT = 0x01
+REQUEST_TYPE_CALL_16 = 0x06
+REQUEST_TYPE_AUTHENTICATE = 0x07
+REQUEST_TYPE_EVAL = 0x08
+REQUEST_TYPE_CALL = 0x0a
+REQUEST_TYPE_PING = 0x40
+REQUEST_TYPE_ID = 0x49
+REQUEST_TYPE_ERROR = 0x8000
+
+# header and body keys
+IPROTO_CODE = 0x00
+IPROTO_SYNC = 0x01
+IPROTO_SCHEMA_ID = 0x05
+IPROTO_TUPLE = 0x21
+IPROTO_FUNCTION_NAME = 0x22
+IPROTO_USER_NAME = 0x23
+IPROTO_DATA = 0x30
+IPROTO_ERROR = 0x31
+
+# error codes
+ER_PROC_LUA = 32
+ER_NO_SUCH_PROC = 33
+ER_ACCESS_DENIED = 42
+ER_NO_SUCH_USER = 45
+ER_PASSWORD_MISMATCH = 47
+ER_UNKNOWN_REQUEST_TYPE = 48
+
+
+def _sha1(*parts):
+    """
+    Returns SHA1 digest of all `parts`.
+    """
+    sha = hashlib.sha1()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = part.encode('utf-8')
+        sha.update(part)
+    return sha.digest()
+
+
+def _xor(left, right):
+    """
+    Returns bytewise XOR of two byte strings.
+    """
+    pairs = zip(bytearray(left), bytearray(right))
+    return bytes(bytearray(a ^ b for a, b in pairs))
+
+
+def greeting(version, uuid, salt):
+    """
+    Returns server greeting (128 bytes) for given `version`, instance
+    `uuid` and raw `salt` bytes.
+    """
+    line1 = 'Tarantool {0} (Binary) {1}'.format(version, uuid)
+    line2 = base64.b64encode(salt).decode('ascii')
+
+    return (
+        line1.ljust(GREETING_LINE_SIZE - 1) + '\n' +
+        line2.ljust(GREETING_LINE_SIZE - 1) + '\n'
+    ).encode('ascii')
+
+
+def greeting_version(greeting_buf):
+    """
+    Returns server version tuple (e.g. `(1, 6, 9)`) from greeting.
+    """
+    line = greeting_buf[:GREETING_LINE_SIZE].decode('ascii', 'replace')
+    version = line.split()[1].split('-')[0]
+    return tuple(int(part) for part in version.split('.')[:3])
+
+
+def greeting_salt(greeting_buf):
+    """
+    Returns raw salt bytes from server greeting.
+    """
+    salt = greeting_buf[GREETING_LINE_SIZE:].strip()
+    return base64.b64decode(salt)[:SCRAMBLE_SIZE]
+
+
+def scramble(salt, password):
+    """
+    Returns chap-sha1 scramble for `password` and raw `salt` bytes.
+    """
+    hash1 = _sha1(password)
+    hash2 = _sha1(hash1)
+    return _xor(hash1, _sha1(salt[:SCRAMBLE_SIZE], hash2))
+
+
+def check_scramble(salt, scramble_buf, password):
+    """
+    Returns `True` if chap-sha1 `scramble_buf` matches `password`.
+    """
+    hash2 = _sha1(_sha1(password))
+    hash1 = _xor(scramble_buf, _sha1(salt[:SCRAMBLE_SIZE], hash2))
+    return _sha1(hash1) == hash2
+
+
+def pack(header, body=None):
+    """
+    Returns length-prefixed iproto packet.
+    """
+    payload = msgpack.packb(header, use_bin_type=True)
+    if body is not None:
+        payload += msgpack.packb(body, use_bin_type=True)
+    return b'\xce' + struct.pack('>I', len(payload)) + payload
+
+
+def request(code, sync, body):
+    """
+    Returns iproto request packet.
+    """
+    return pack({IPROTO_CODE: code, IPROTO_SYNC: sync}, body)
+
+
+def call_request(sync, name, args, call_16=False):
+    """
+    Returns iproto `call` request packet.
+    """
+    code = REQUEST_TYPE_CALL_16 if call_16 else REQUEST_TYPE_CALL
+    return request(code, sync, {
+        IPROTO_FUNCTION_NAME: name,
+        IPROTO_TUPLE: list(args),
+    })
+
+
+def auth_request(sync, user, salt, password):
+    """
+    Returns iproto chap-sha1 authentication request packet.
+    """
+    return request(REQUEST_TYPE_AUTHENTICATE, sync, {
+        IPROTO_USER_NAME: user,
+        IPROTO_TUPLE: ['chap-sha1', scramble(salt, password)],
+    })
+
+
+def response(sync, data, schema_id=0):
+    """
+    Returns successful iproto response packet.
+    """
+    header = {
+        IPROTO_CODE: REQUEST_TYPE_OK,
+        IPROTO_SYNC: sync,
+        IPROTO_SCHEMA_ID: schema_id,
+    }
+    return pack(header, {IPROTO_DATA: data})
+
+
+def error_response(sync, code, message, schema_id=0):
+    """
+    Returns error iproto response packet.
+    """
+    header = {
+        IPROTO_CODE: REQUEST_TYPE_ERROR | code,
+        IPROTO_SYNC: sync,
+        IPROTO_SCHEMA_ID: schema_id,
+    }
+    return pack(header, {IPROTO_ERROR: message})
+
+
+def length_size(first_byte):
+    """
+    Returns number of bytes left to read for msgpack-encoded packet length
+    starting with `first_byte`.
+    """
+    if first_byte <= 0x7f:
+        return 0
+    sizes = {0xcc: 1, 0xcd: 2, 0xce: 4, 0xcf: 8}
+    if first_byte not in sizes:
+        raise ValueError("Bad packet length prefix: {0:#x}".format(first_byte))
+    return sizes[first_byte]
+
+
+def unpack_length(buf):
+    """
+    Returns packet length from msgpack-encoded integer.
+    """
+    return msgpack.unpackb(buf)
+
+
+def unpack_header(payload):
+    """
+    Returns header of packet payload (body is not decoded).
+    """
+    unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+    unpacker.feed(payload)
+    return unpacker.unpack()
+
+
+def unpack(payload):
+    """
+    Returns `(header, body)` pair from packet payload.
+    """
+    unpacker = msgpack.Unpacker(raw=False, strict_map_key=False,
+                                unicode_errors='surrogateescape')
+    unpacker.feed(payload)
+    header = unpacker.unpack()
+    try:
+        body = unpacker.unpack()
+    except msgpack.OutOfData:
+        body = {}
+    return header, body
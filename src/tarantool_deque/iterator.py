@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Prefetching iterator over deque tube tasks.
+"""
+import collections
+import threading
+import time
+
+
+class TaskIterator(object):
+    """
+    Iterator over tasks taken from tube by background fetcher thread.
+
+    Fetcher keeps up to `prefetch` taken tasks in local buffer, so consumer
+    does not wait for `take` round trip. When buffer is not empty fetcher
+    does not wait on server, so commands from consumer are not delayed
+    by long `take`.
+
+    Waiting fetcher takes are sent via take lane (`Deque.take_lane`),
+    use pool of connections (`Deque.configure_pool`) to run other fetcher
+    and consumer commands in parallel.
+    """
+    def __init__(self, tube, prefetch=10, timeout=None, poll_interval=1.0,
+                 channel=None, msg_type=None):
+        if prefetch < 1:
+            raise ValueError("Prefetch must be positive")
+
+        self.tube = tube
+        self.prefetch = prefetch
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.channel = channel
+        self.msg_type = msg_type
+
+        self._cond = threading.Condition()
+        self._buffer = collections.deque()
+        self._thread = None
+        self._closed = False
+        self._error = None
+        self._counters = dict.fromkeys((
+            'fetches', 'fetched', 'yielded', 'released', 'waits',
+            'max_depth',
+        ), 0)
+        self._wait_time = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def depth(self):
+        """
+        Returns number of buffered tasks.
+        """
+        return len(self._buffer)
+
+    def stats(self):
+        """
+        Returns iterator statistics dict.
+
+        `wait_time` is total time consumer waited for tasks.
+        """
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update(
+                depth=len(self._buffer),
+                prefetch=self.prefetch,
+                wait_time=self._wait_time,
+            )
+            return stats
+
+    def _start(self):
+        """
+        Start fetcher thread (must be called under lock).
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._fetch_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _fetch_loop(self):
+        """
+        Keep buffer filled with taken tasks.
+        """
+        while True:
+            with self._cond:
+                while not self._closed and len(self._buffer) >= self.prefetch:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                count = self.prefetch - len(self._buffer)
+                # wait on server only if consumer has nothing to do
+                timeout = 0 if self._buffer else self.poll_interval
+
+            try:
+                tasks = self.tube.take_many(count, timeout=timeout,
+                                            channel=self.channel,
+                                            msg_type=self.msg_type)
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self._counters['fetches'] += 1
+                self._counters['fetched'] += len(tasks)
+                self._buffer.extend(tasks)
+                self._counters['max_depth'] = max(
+                    self._counters['max_depth'], len(self._buffer)
+                )
+                self._cond.notify_all()
+
+                if not tasks and timeout == 0 and not self._closed:
+                    # tube is empty, wait until consumer drains buffer
+                    self._cond.wait(self.poll_interval)
+
+    def __next__(self):
+        started = time.time()
+        deadline = None if self.timeout is None else started + self.timeout
+
+        with self._cond:
+            if self._closed:
+                raise StopIteration
+
+            self._start()
+            waited = False
+            while not self._buffer:
+                if self._error is not None:
+                    # fetcher is stopped, so iteration is over
+                    self._closed = True
+                    error, self._error = self._error, None
+                    raise error
+                if self._closed:
+                    raise StopIteration
+
+                now = time.time()
+                if deadline is not None and now >= deadline:
+                    self._wait_time += now - started
+                    raise StopIteration
+
+                waited = True
+                self._cond.wait(None if deadline is None else deadline - now)
+
+            task = self._buffer.popleft()
+            self._counters['yielded'] += 1
+            if waited:
+                self._counters['waits'] += 1
+                self._wait_time += time.time() - started
+            self._cond.notify_all()
+
+        return task
+
+    next = __next__
+
+    def ack(self, task):
+        """
+        Ack task yielded by iterator. If buffer is not full, the next task
+        is taken into buffer in the same round trip (see `Tube.ack_and_take`).
+
+        Returns `True` if task is acked.
+        """
+        with self._cond:
+            room = not self._closed and len(self._buffer) < self.prefetch
+
+        if not room:
+            return task.ack()
+
+        next_task = task.ack_and_take(timeout=0, channel=self.channel,
+                                      msg_type=self.msg_type)
+        if next_task is not None:
+            with self._cond:
+                if not self._closed:
+                    self._counters['fetched'] += 1
+                    self._buffer.append(next_task)
+                    self._counters['max_depth'] = max(
+                        self._counters['max_depth'], len(self._buffer)
+                    )
+                    self._cond.notify_all()
+                    next_task = None
+            if next_task is not None:
+                # iterator is closed while task was taken
+                next_task.release()
+
+        return bool(task.state == 3)
+
+    def close(self):
+        """
+        Stop fetcher and release all buffered tasks.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+        with self._cond:
+            tasks = list(self._buffer)
+            self._buffer.clear()
+
+        if tasks:
+            result = self.tube.release_many(tasks)
+            with self._cond:
+                self._counters['released'] += sum(1 for ok in result if ok)
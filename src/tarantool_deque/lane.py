@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Separate connections for blocking takes.
+"""
+import threading
+import time
+
+from .metrics import LATENCY_BUCKETS, Histogram
+from .pool import ConnectionPool
+
+
+class TakeLane(object):
+    """
+    Connections for blocking `take` and `take_many` (long polls), so
+    a take parked on server does not delay other commands.
+
+    At most `max_size` takes are parked at the same time, other blocking
+    takes wait for a free lane connection (`PoolTimeoutException` is raised
+    after `timeout` seconds, if set).
+
+    Deque accepts commands on a taken task only from the session which
+    took it, so commands on tasks taken via lane are sent via the same
+    lane connection. Takes are parked only on lane connections without
+    taken tasks, so such commands never wait for a parked take: if all
+    `max_size` connections hold tasks, takes wait until some of them are
+    acked or released.
+    """
+    def __init__(self, factory, max_size=4, timeout=None,
+                 buckets=LATENCY_BUCKETS):
+        self.pool = ConnectionPool(factory, max_size=max_size,
+                                   timeout=timeout)
+        self.max_size = max_size
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._parked = 0
+        self._counters = dict.fromkeys(('takes', 'empty', 'max_parked'), 0)
+        self._parked_time = Histogram(buckets)
+
+    def stats(self):
+        """
+        Returns lane statistics dict.
+
+        `parked` is number of takes waiting on server now, `parked_time`
+        is histogram of seconds spent by takes on server, `waits` and
+        `wait_time` are number of takes which waited for a free lane
+        connection and total seconds of waiting.
+        """
+        pool = self.pool.stats()
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                parked=self._parked,
+                parked_time=self._parked_time.snapshot(),
+                size=pool['size'],
+                max_size=self.max_size,
+                waits=pool['waits'],
+                wait_time=pool['wait_time'],
+                timeouts=pool['timeouts'],
+            )
+        return stats
+
+    def owns(self, connection):
+        """
+        Returns `True` if connection is opened by this lane and not closed.
+        """
+        return self.pool.owns(connection)
+
+    def call(self, cmd, args, prefer=None, parked=False, track=None):
+        """
+        Call command via lane connection (`prefer` one, if given).
+        If `parked` is set, time spent on server is recorded and only
+        connection without pins is used. `track(connection, the_tuple)`
+        is called before connection is returned to lane, so it may pin
+        connection holding taken tasks.
+
+        Returns tarantool tuple object.
+        """
+        with self.pool.connection(prefer, unpinned=parked) as connection:
+            if not parked:
+                the_tuple = connection.call(cmd, args)
+                if track is not None:
+                    track(connection, the_tuple)
+                return the_tuple
+
+            with self._lock:
+                self._parked += 1
+                if self._parked > self._counters['max_parked']:
+                    self._counters['max_parked'] = self._parked
+            started = time.time()
+            the_tuple = None
+            try:
+                the_tuple = connection.call(cmd, args)
+            finally:
+                elapsed = time.time() - started
+                with self._lock:
+                    self._parked -= 1
+                    self._counters['takes'] += 1
+                    if the_tuple is not None and not len(the_tuple):
+                        self._counters['empty'] += 1
+                    self._parked_time.add(elapsed)
+            if track is not None:
+                track(connection, the_tuple)
+            return the_tuple
+
+    def close(self):
+        """
+        Close lane connections.
+        """
+        self.pool.close()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Per-command deque call metrics.
+"""
+import bisect
+import threading
+
+import msgpack
+
+
+# default latency histogram bucket upper bounds, seconds
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0,
+)
+
+
+def payload_size(value):
+    """
+    Returns size of msgpack-encoded value (estimated payload size).
+    """
+    try:
+        return len(msgpack.packb(value, use_bin_type=True))
+    except (TypeError, ValueError):
+        return 0
+
+
+class Histogram(object):
+    """
+    Histogram with fixed bucket upper `bounds`, last bucket is unbounded.
+    """
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """
+        Add value to histogram.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Returns upper bound of bucket containing `percent` percentile
+        (`max` for the last bucket), or `None` if histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self):
+        """
+        Returns histogram state dict.
+        """
+        return dict(
+            buckets=list(zip(self.bounds + (None,), self.counts)),
+            count=self.count,
+            sum=self.total,
+            avg=self.total / self.count if self.count else 0,
+            min=self.min or 0,
+            max=self.max or 0,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+        )
+
+
+class CommandStats(object):
+    """
+    Counters and latency histogram of one tube command.
+    """
+    def __init__(self, buckets):
+        self.calls = 0
+        self.errors = {}
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.latency = Histogram(buckets)
+
+    def snapshot(self):
+        """
+        Returns command statistics dict.
+        """
+        return dict(
+            calls=self.calls,
+            errors=dict(self.errors),
+            error_count=sum(self.errors.values()),
+            bytes_out=self.bytes_out,
+            bytes_in=self.bytes_in,
+            latency=self.latency.snapshot(),
+        )
+
+
+class Metrics(object):
+    """
+    Thread-safe per tube and command call metrics: call and error
+    counters (by exception type), estimated bytes sent and received
+    (msgpack size of call arguments and returned rows) and latency
+    histograms.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, tube, command, elapsed, args, result=None, error=None):
+        """
+        Record one call of tube `command`.
+        """
+        bytes_out = payload_size(args)
+        bytes_in = payload_size(list(result)) if result is not None else 0
+
+        with self._lock:
+            stats = self._stats.get((tube, command))
+            if stats is None:
+                stats = CommandStats(self.buckets)
+                self._stats[(tube, command)] = stats
+            stats.calls += 1
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.latency.add(elapsed)
+            if error is not None:
+                name = type(error).__name__
+                stats.errors[name] = stats.errors.get(name, 0) + 1
+
+    def snapshot(self, reset=False):
+        """
+        Returns `{tube: {command: stats}}` dict, optionally resets metrics.
+        """
+        result = {}
+        with self._lock:
+            for (tube, command), stats in self._stats.items():
+                result.setdefault(tube, {})[command] = stats.snapshot()
+            if reset:
+                self._stats = {}
+        return result
+
+    def reset(self):
+        """
+        Reset all metrics.
+        """
+        with self._lock:
+            self._stats = {}
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Pipelining of deque commands.
+
+Usage:
+
+    >>> with deque.pipeline() as pipe:
+    ...     put = pipe.put(tube, [1, 2, 3], channel=1, msg_type=1)
+    ...     pipe.ack(task1)
+    ...     pipe.release(task2, delay=10)
+    >>> put.result()  # Task object
+    >>> task1.state_name  # task objects are updated
+    'done'
+"""
+import collections
+import itertools
+import threading
+import time
+
+import tarantool
+from tarantool.response import Response
+
+from . import iproto
+from .tarantool_deque import Task
+
+
+_syncs = itertools.count(1)
+_syncs_lock = threading.Lock()
+
+
+def _next_sync():
+    """
+    Returns request sync id unique within process.
+    """
+    with _syncs_lock:
+        return next(_syncs)
+
+
+def call_pipelined(connection, calls):
+    """
+    Send all `(name, args)` calls back to back via tarantool connection,
+    then read responses and match them by request sync id.
+
+    Returns list of responses (or `DatabaseError` objects for failed
+    calls) in the same order as calls. Connections without access to
+    socket (e.g. custom `Deque.tarantool_connection`) are called one by one.
+
+    Raises `NetworkError` if connection is broken.
+    """
+    if not hasattr(connection, '_sendall') or \
+            not hasattr(connection, '_read_response'):
+        results = []
+        for name, args in calls:
+            try:
+                results.append(connection.call(name, args))
+            except tarantool.NetworkError:
+                raise
+            except tarantool.DatabaseError as e:
+                results.append(e)
+        return results
+
+    if hasattr(connection, '_opt_reconnect'):
+        connection._opt_reconnect()
+
+    call_16 = getattr(connection, 'call_16', False)
+    syncs = [_next_sync() for _ in calls]
+    connection._sendall(b''.join(
+        iproto.call_request(sync, name, args, call_16)
+        for sync, (name, args) in zip(syncs, calls)
+    ))
+
+    responses = {}
+    for _ in calls:
+        payload = connection._read_response()
+        sync = iproto.unpack_header(payload).get(iproto.IPROTO_SYNC)
+        try:
+            responses[sync] = Response(connection, payload)
+        except tarantool.DatabaseError as e:
+            responses[sync] = e
+
+    return [responses.get(sync) for sync in syncs]
+
+
+class PipelineResult(object):
+    """
+    Result of pipelined command, available after pipeline is executed.
+    """
+    def __init__(self, tube, cmd, args, task_ids=(), callback=None):
+        self.tube = tube
+        self.cmd = cmd
+        self.args = args
+        self.task_ids = task_ids
+        self.callback = callback
+        self.done = False
+        self.value = None
+        self.error = None
+
+    def resolve(self, response):
+        """
+        Set result from tarantool response (or exception).
+        """
+        self.done = True
+        if isinstance(response, Exception):
+            self.error = response
+            return
+        try:
+            if self.callback is not None:
+                self.value = self.callback(response)
+            else:
+                self.value = response
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        """
+        Returns command result or raises command error.
+        """
+        if not self.done:
+            raise RuntimeError("Pipeline is not executed yet")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Pipeline(object):
+    """
+    Queue of deque commands sent at once.
+
+    Commands are sent back to back via one connection (in pool mode:
+    one batch per connection which took the tasks) and responses are
+    matched by request sync id, so N commands take about one round trip.
+    Commands sent via the same connection are executed in order.
+
+    Every command method returns `PipelineResult`. Task objects passed
+    to commands are updated when pipeline is executed.
+    """
+    def __init__(self, deque):
+        self.deque = deque
+        self._queue = []
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            self._queue = []
+
+    def call(self, tube, cmd, args, task_ids=(), callback=None):
+        """
+        Queue deque command. `callback(response)` result is the value
+        of returned `PipelineResult`.
+        """
+        result = PipelineResult(tube, cmd, args, task_ids, callback)
+        self._queue.append(result)
+        return result
+
+    def put(self, tube, data, channel, msg_type, obj_type=0, obj_id=0,
+            to_send_at=None, valid_until=None):
+        """
+        Queue `put`, result is a `Task` object.
+        """
+        args = tube.encode_args(data, channel, msg_type, obj_type, obj_id,
+                                to_send_at, valid_until)
+        return self.call(tube, tube.cmd('put'), args, callback=(
+            lambda the_tuple: Task.create_from_tuple(tube, the_tuple)
+        ))
+
+    def take(self, tube, timeout=0, channel=None, msg_type=None):
+        """
+        Queue `take`, result is a `Task` object or `None`.
+
+        Pipeline waits for the task (matching `channel` and `msg_type`,
+        if set) up to `timeout` seconds.
+        """
+        def callback(the_tuple):
+            if the_tuple.rowcount:
+                return Task.create_from_tuple(tube, the_tuple)
+
+        return self.call(tube,
+                         tube.cmd(tube.take_cmd_name('take', channel,
+                                                     msg_type)),
+                         tube.take_args(timeout, channel, msg_type),
+                         callback=callback)
+
+    def _task_call(self, task, cmd_name, args, state):
+        """
+        Queue command on task, result is `True` if task is in `state`.
+        """
+        def callback(the_tuple):
+            task.update_from_tuple(the_tuple)
+            return state is None or task.state == state
+
+        return self.call(task.tube, task.tube.cmd(cmd_name),
+                         (task.task_id,) + args, (task.task_id,), callback)
+
+    def ack(self, task):
+        """
+        Queue `ack` of task.
+        """
+        return self._task_call(task, 'ack', (), 3)
+
+    def release(self, task, delay=None):
+        """
+        Queue `release` of task.
+        """
+        if delay is None:
+            return self._task_call(task, 'release', (), 1)
+        return self._task_call(task, 'release', (delay,), 0)
+
+    def peek(self, task):
+        """
+        Queue `peek` of task.
+        """
+        return self._task_call(task, 'peek', (), None)
+
+    def delete(self, task):
+        """
+        Queue `delete` of task.
+        """
+        return self._task_call(task, 'delete', (), 3)
+
+    def _groups(self, queue):
+        """
+        Returns queued commands grouped by connection which must be used
+        (`None` - any connection).
+        """
+        groups = collections.OrderedDict()
+        for result in queue:
+            owner = None
+            if self.deque._owners:
+                for task_id in result.task_ids:
+                    owner = self.deque._owner(result.tube, task_id)
+                    if owner is not None:
+                        break
+            groups.setdefault(owner, []).append(result)
+        return groups
+
+    def _send(self, connection, results):
+        """
+        Send commands via connection, returns responses.
+        """
+        return call_pipelined(connection, [
+            (result.cmd, result.args) for result in results
+        ])
+
+    def execute(self, raise_on_error=True):
+        """
+        Send all queued commands and wait for responses.
+
+        Returns list of command results. If `raise_on_error` is set,
+        the first command error is raised after all results are set.
+        """
+        queue, self._queue = self._queue, []
+        lane = self.deque.take_lane
+        metrics = self.deque.metrics
+
+        for owner, results in self._groups(queue).items():
+            pool = self.deque.pool
+            if lane is not None and owner is not None and lane.owns(owner):
+                # tasks taken by blocking take
+                pool = lane.pool
+            started = time.time()
+            try:
+                if pool is None:
+                    tnt = self.deque.tnt
+                    with self.deque._call_lock:
+                        responses = self._send(tnt, results)
+                else:
+                    with pool.connection(owner) as connection:
+                        responses = self._send(connection, results)
+                    for result, response in zip(results, responses):
+                        if not isinstance(response, Exception):
+                            self.deque._track(result.tube, connection,
+                                              response)
+            except Exception as e:
+                responses = [e] * len(results)
+            elapsed = time.time() - started
+
+            for result, response in zip(results, responses):
+                result.resolve(response)
+                if metrics is not None:
+                    metrics.record(
+                        result.tube.name, result.cmd.rpartition(':')[2],
+                        elapsed, result.args,
+                        None if result.error else response, result.error
+                    )
+
+        if raise_on_error:
+            for result in queue:
+                if result.error is not None:
+                    raise result.error
+
+        return [result.value for result in queue]
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Thread-safe pool of tarantool connections.
+"""
+import contextlib
+import threading
+import time
+
+import tarantool
+
+
+class PoolTimeoutException(Exception):
+    """
+    No connection became available within checkout timeout.
+    """
+    pass
+
+
+def ping_check(connection):
+    """
+    Default health check: connection is alive if it answers ping.
+    """
+    try:
+        connection.ping(notime=True)
+    except Exception:
+        return False
+    return True
+
+
+class ConnectionPool(object):
+    """
+    Pool of connections created by `factory` on demand.
+
+    - `min_size` connections are never evicted as idle;
+    - at most `max_size` connections are opened at the same time;
+    - `timeout` is the default checkout timeout in seconds (`None` - wait
+      forever);
+    - idle connections above `min_size` are closed after `idle_timeout`
+      seconds (`None` - never);
+    - `health_check` is a callable taking connection and returning `False`
+      if connection must be dropped, it is called on checkout
+      of connections idle for more than `health_check_interval` seconds.
+
+    Connections may be pinned (e.g. connection holds taken tasks) - pinned
+    connections are never evicted as idle.
+    """
+    def __init__(self, factory, min_size=0, max_size=10, timeout=None,
+                 idle_timeout=None, health_check=None,
+                 health_check_interval=10):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool size must be 0 <= min_size <= max_size"
+                             " and max_size >= 1")
+
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # stack of (connection, released_at) pairs
+        self._in_use = set()
+        self._pins = {}
+        self._opening = 0
+        self._closed = False
+        self._counters = dict.fromkeys((
+            'created', 'closed', 'evicted', 'broken', 'checkouts', 'waits',
+            'timeouts', 'health_check_failures',
+        ), 0)
+        self._wait_time = 0.0
+
+    @property
+    def size(self):
+        """
+        Returns number of opened (and opening) connections.
+        """
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def stats(self):
+        """
+        Returns pool statistics dict.
+        """
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update(
+                size=self.size,
+                idle=len(self._idle),
+                in_use=len(self._in_use),
+                pinned=len(self._pins),
+                min_size=self.min_size,
+                max_size=self.max_size,
+                wait_time=self._wait_time,
+            )
+            return stats
+
+    def owns(self, connection):
+        """
+        Returns `True` if connection is opened by this pool and not closed.
+        """
+        with self._cond:
+            return connection in self._in_use or any(
+                conn is connection for conn, _ in self._idle
+            )
+
+    def pin(self, connection):
+        """
+        Protect connection from idle eviction.
+        """
+        with self._cond:
+            self._pins[connection] = self._pins.get(connection, 0) + 1
+
+    def unpin(self, connection):
+        """
+        Remove one pin from connection.
+        """
+        with self._cond:
+            count = self._pins.get(connection, 0) - 1
+            if count > 0:
+                self._pins[connection] = count
+            else:
+                self._pins.pop(connection, None)
+                # wake up checkouts waiting for unpinned connection
+                self._cond.notify_all()
+
+    def _close(self, connection, counter=None):
+        """
+        Close connection and forget about it (must be called under lock).
+        """
+        self._pins.pop(connection, None)
+        if counter is not None:
+            self._counters[counter] += 1
+        self._counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self, now):
+        """
+        Close connections idle for more than `idle_timeout` seconds.
+        """
+        if self.idle_timeout is None:
+            return
+
+        keep = []
+        excess = self.size - self.min_size
+        for connection, released_at in self._idle:
+            if (excess > 0 and now - released_at >= self.idle_timeout and
+                    connection not in self._pins):
+                self._close(connection, 'evicted')
+                excess -= 1
+            else:
+                keep.append((connection, released_at))
+        self._idle = keep
+
+    def _pop_idle(self, prefer, unpinned=False):
+        """
+        Returns `(connection, released_at)` from idle stack or `None`.
+        Pinned connection is returned only if `unpinned` is not set.
+        """
+        if prefer is None:
+            # keep connections holding taken tasks free for their commands
+            for index in range(len(self._idle) - 1, -1, -1):
+                if self._idle[index][0] not in self._pins:
+                    return self._idle.pop(index)
+            if unpinned:
+                return None
+            return self._idle.pop()
+
+        for index, (connection, released_at) in enumerate(self._idle):
+            if connection is prefer:
+                del self._idle[index]
+                return connection, released_at
+
+    def acquire(self, prefer=None, timeout=-1, unpinned=False):
+        """
+        Checkout connection from the pool.
+
+        If `prefer` connection is given and it is still opened - waits for
+        exactly this connection. Default `timeout` is pool `timeout`.
+        If `unpinned` is set, waits for connection without pins (e.g. for
+        long commands, which would delay commands on taken tasks).
+
+        Raises `PoolTimeoutException` if no connection is available within
+        `timeout` seconds.
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        started = time.time()
+        deadline = None if timeout is None else started + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeoutException("Pool is closed")
+
+                    now = time.time()
+                    self._evict_idle(now)
+
+                    if prefer is not None and prefer not in self._in_use:
+                        if not any(conn is prefer for conn, _ in self._idle):
+                            # preferred connection is closed already
+                            prefer = None
+
+                    item = None
+                    if self._idle:
+                        item = self._pop_idle(prefer, unpinned)
+                    if item is not None:
+                        connection, released_at = item
+                        self._in_use.add(connection)
+                        break
+
+                    if prefer is None and self.size < self.max_size:
+                        self._opening += 1
+                        connection, released_at = None, None
+                        break
+
+                    if deadline is not None and now >= deadline:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeoutException(
+                            "No free connection within {0} seconds".format(
+                                timeout
+                            )
+                        )
+                    waited = True
+                    self._cond.wait(
+                        None if deadline is None else deadline - now
+                    )
+
+            if connection is None:
+                connection = self._open()
+            elif not self._check(connection, released_at):
+                continue
+
+            with self._cond:
+                self._counters['checkouts'] += 1
+                if waited:
+                    self._counters['waits'] += 1
+                    self._wait_time += time.time() - started
+            return connection
+
+    def _open(self):
+        """
+        Open new connection (slot is reserved by caller).
+        """
+        try:
+            connection = self.factory()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._opening -= 1
+            self._in_use.add(connection)
+            self._counters['created'] += 1
+        return connection
+
+    def _check(self, connection, released_at):
+        """
+        Run health check on connection idle for a long time.
+
+        Returns `False` (and drops connection) if check failed.
+        """
+        if (self.health_check is None or
+                time.time() - released_at < self.health_check_interval):
+            return True
+        if self.health_check(connection):
+            return True
+
+        with self._cond:
+            self._in_use.discard(connection)
+            self._counters['health_check_failures'] += 1
+            self._close(connection, 'broken')
+            self._cond.notify_all()
+        return False
+
+    def release(self, connection, broken=False):
+        """
+        Return connection to the pool.
+
+        Broken connections are closed and dropped.
+        """
+        with self._cond:
+            self._in_use.discard(connection)
+            if broken or self._closed:
+                self._close(connection, 'broken' if broken else None)
+            else:
+                self._idle.append((connection, time.time()))
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def connection(self, prefer=None, timeout=-1, unpinned=False):
+        """
+        Context manager: checkout connection and return it back.
+
+        Connection is dropped if `NetworkError` is raised.
+        """
+        connection = self.acquire(prefer, timeout, unpinned)
+        try:
+            yield connection
+        except tarantool.NetworkError:
+            self.release(connection, broken=True)
+            raise
+        except BaseException:
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    def close(self):
+        """
+        Close all idle connections, in-use ones are closed on release.
+        """
+        with self._cond:
+            self._closed = True
+            for connection, _ in self._idle:
+                self._close(connection)
+            self._idle = []
+            self._cond.notify_all()
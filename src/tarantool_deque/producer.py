@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind producer: buffered `put` flushed in batches.
+
+Usage:
+
+    >>> producer = tube.producer(batch_size=500, interval=0.01)
+    >>> future = producer.put([1, 2, 3], channel=1, msg_type=1)
+    >>> future.result()  # task id, when batch is stored
+    >>> producer.close()  # flush buffered tasks and stop
+"""
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+
+class ProducerFullException(Exception):
+    """
+    Producer buffer is full (or producer is closed).
+    """
+    pass
+
+
+class Producer(object):
+    """
+    Buffers tasks and enqueues them in background thread with `put_many`:
+    batch is sent when `batch_size` tasks are buffered or the oldest
+    buffered task waits for `interval` seconds.
+
+    Up to `max_pending` tasks are buffered or in flight. When buffer is
+    full `put` waits for space (`overflow='block'`, up to `put_timeout`
+    seconds if set), returns failed future (`'drop'`) or raises
+    `ProducerFullException` (`'raise'`).
+
+    If `coalesce` is set, tasks with the same key (`msg_type`, `obj_type`,
+    `obj_id`, `channel`) buffered at the same time (up to `interval`
+    seconds) are enqueued as one task and share one future: `'first'`
+    keeps the first task, `'last'` keeps the last one, callable
+    `coalesce(old_data, new_data)` returns merged data (other arguments
+    are taken from the last task).
+    """
+    overflow_policies = ('block', 'drop', 'raise')
+    coalesce_policies = ('first', 'last')
+
+    def __init__(self, tube, batch_size=1000, interval=0.05,
+                 max_pending=10000, overflow='block', put_timeout=None,
+                 coalesce=None):
+        if batch_size < 1:
+            raise ValueError("Batch size must be positive")
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        if max_pending < batch_size:
+            raise ValueError("Max pending must be at least batch size")
+        if overflow not in self.overflow_policies:
+            raise ValueError("Overflow must be one of: {0}".format(
+                ', '.join(self.overflow_policies)
+            ))
+        if coalesce is not None and coalesce not in self.coalesce_policies \
+                and not callable(coalesce):
+            raise ValueError("Coalesce must be one of: {0} or callable".format(
+                ', '.join(self.coalesce_policies)
+            ))
+
+        self.tube = tube
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.put_timeout = put_timeout
+        self.coalesce = coalesce
+
+        self._buffer = collections.deque()
+        self._keys = {}
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._queued = 0
+        self._done = 0
+        self._flushing = 0
+        self._closed = False
+        self._thread = None
+        self._counters = dict.fromkeys(
+            ('put', 'sent', 'failed', 'dropped', 'coalesced', 'batches'), 0
+        )
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def stats(self):
+        """
+        Returns producer statistics dict.
+
+        `sent` and `failed` are numbers of tasks stored and failed,
+        `coalesced` is number of puts saved by coalescing, `pending`
+        is number of tasks buffered or in flight.
+        """
+        with self._cond:
+            stats = dict(self._counters)
+            stats['pending'] = self._pending
+        return stats
+
+    def start(self):
+        """
+        Start producer thread.
+
+        Returns producer itself.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def put(self, data, channel, msg_type, obj_type=0, obj_id=0,
+            to_send_at=None, valid_until=None):
+        """
+        Buffer a task, see `Tube.put` for arguments.
+
+        Returns `concurrent.futures.Future` with task id as result.
+        Payload is encoded by tube codec in producer thread.
+        """
+        args = dict(data=data, channel=channel, msg_type=msg_type,
+                    obj_type=obj_type, obj_id=obj_id, to_send_at=to_send_at,
+                    valid_until=valid_until)
+        future = Future()
+
+        with self._cond:
+            if self.coalesce is not None and not self._closed:
+                key = (msg_type, obj_type, obj_id, channel)
+                entry = self._keys.get(key)
+                if entry is not None and not entry[1].cancelled():
+                    self._merge(entry[0], args)
+                    self._counters['put'] += 1
+                    self._counters['coalesced'] += 1
+                    return entry[1]
+
+            if self._pending >= self.max_pending and not self._closed:
+                if self.overflow == 'drop':
+                    self._counters['dropped'] += 1
+                    future.set_exception(
+                        ProducerFullException("Producer buffer is full")
+                    )
+                    return future
+                if self.overflow == 'raise':
+                    raise ProducerFullException("Producer buffer is full")
+                if not self._cond.wait_for(
+                    lambda: self._pending < self.max_pending or self._closed,
+                    self.put_timeout
+                ):
+                    raise ProducerFullException("Producer buffer is full")
+
+            if self._closed:
+                raise ProducerFullException("Producer is closed")
+
+            entry = (args, future, time.time())
+            self._buffer.append(entry)
+            if self.coalesce is not None:
+                self._keys[(msg_type, obj_type, obj_id, channel)] = entry
+            self._pending += 1
+            self._queued += 1
+            self._counters['put'] += 1
+            if len(self._buffer) in (1, self.batch_size):
+                # producer thread waits for the first task or full batch
+                self._cond.notify_all()
+
+        return future
+
+    def _merge(self, args, new_args):
+        """
+        Merge arguments of coalesced task into buffered task arguments.
+        """
+        if self.coalesce == 'first':
+            return
+        data = args['data']
+        args.update(new_args)
+        if callable(self.coalesce):
+            args['data'] = self.coalesce(data, new_args['data'])
+
+    def _ready(self):
+        """
+        Returns seconds to wait until the next batch (0 - send now,
+        `None` - wait for tasks).
+        """
+        if not self._buffer:
+            return None
+        if len(self._buffer) >= self.batch_size or self._flushing or \
+                self._closed:
+            return 0
+        return max(0, self._buffer[0][2] + self.interval - time.time())
+
+    def _run(self):
+        """
+        Producer thread loop.
+        """
+        while True:
+            with self._cond:
+                wait = self._ready()
+                while wait != 0:
+                    if self._closed and not self._buffer:
+                        return
+                    self._cond.wait(wait)
+                    wait = self._ready()
+
+                batch = self._batch()
+
+            self._send(batch)
+
+    def _batch(self):
+        """
+        Returns up to `batch_size` buffered tasks removed from buffer.
+        """
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            entry = self._buffer.popleft()
+            batch.append(entry)
+            if self._keys:
+                args = entry[0]
+                key = (args['msg_type'], args['obj_type'], args['obj_id'],
+                       args['channel'])
+                if self._keys.get(key) is entry:
+                    del self._keys[key]
+        return batch
+
+    def _send(self, batch):
+        """
+        Enqueue batch of buffered tasks, resolve their futures.
+        """
+        items = [(args, future) for args, future, _ in batch
+                 if future.set_running_or_notify_cancel()]
+
+        sent = 0
+        if items:
+            try:
+                result = self.tube.put_many(
+                    [args for args, _ in items],
+                    chunk_size=self.batch_size, ids_only=True
+                )
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+            else:
+                for error in result.errors:
+                    for _, future in items[
+                        error.offset:error.offset + len(error.items)
+                    ]:
+                        future.set_exception(error.error)
+                for (_, future), task_id in zip(items, result.results):
+                    if task_id is not None:
+                        future.set_result(task_id)
+                        sent += 1
+
+        with self._cond:
+            self._pending -= len(batch)
+            self._done += len(batch)
+            self._counters['sent'] += sent
+            self._counters['failed'] += len(items) - sent
+            self._counters['batches'] += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Send buffered tasks now and wait until tasks buffered before
+        the call are stored (or failed).
+
+        Returns `False` if not done within `timeout` seconds.
+        """
+        if self._thread is None:
+            # not started: send buffered tasks in caller thread
+            while self._buffer:
+                with self._cond:
+                    batch = self._batch()
+                self._send(batch)
+            return True
+
+        with self._cond:
+            target = self._queued
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._done >= target,
+                                           timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=None):
+        """
+        Stop accepting tasks, flush buffered tasks and stop producer thread.
+
+        Returns `False` if buffered tasks are not stored within `timeout`
+        seconds.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        thread = self._thread
+        if thread is None:
+            return self.flush()
+
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        return not thread.is_alive()
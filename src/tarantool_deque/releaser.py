@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Background releaser of abandoned taken tasks.
+"""
+import collections
+import threading
+
+
+class Releaser(object):
+    """
+    Releases taken tasks collected by garbage collector in background
+    thread, `batch_size` tasks per `release_many` request.
+
+    `Task.__del__` only appends task id to lock-free queue, so no network
+    call (and no lock) happens on garbage collection path. Queue is
+    flushed every `interval` seconds.
+    """
+    def __init__(self, interval=0.1, batch_size=1000):
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        if batch_size < 1:
+            raise ValueError("Batch size must be positive")
+
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = dict.fromkeys(('released', 'failed', 'batches'), 0)
+
+    def stats(self):
+        """
+        Returns releaser statistics dict.
+
+        `released` is number of abandoned tasks released in background,
+        `pending` is number of tasks waiting for the next flush.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pending'] = len(self._queue)
+        return stats
+
+    def put(self, tube, task_id):
+        """
+        Schedule release of taken task (safe to call from `__del__`).
+        """
+        self._queue.append((tube, task_id))
+
+    def start(self):
+        """
+        Start releaser thread.
+
+        Returns releaser itself.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def _run(self):
+        """
+        Releaser thread loop.
+        """
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Release all queued tasks now.
+
+        Returns number of released tasks.
+        """
+        tubes = collections.OrderedDict()
+        while True:
+            try:
+                tube, task_id = self._queue.popleft()
+            except IndexError:
+                break
+            tubes.setdefault(tube, []).append(task_id)
+
+        released = 0
+        for tube, task_ids in tubes.items():
+            try:
+                result = tube.release_many(task_ids,
+                                           chunk_size=self.batch_size)
+            except Exception:
+                # e.g. pool checkout timeout: tasks are released by server
+                # when connection is closed
+                result = ()
+            ok = sum(1 for item in result if item)
+            released += ok
+            with self._lock:
+                self._counters['released'] += ok
+                self._counters['failed'] += len(task_ids) - ok
+                self._counters['batches'] += (
+                    (len(task_ids) - 1) // self.batch_size + 1
+                )
+        return released
+
+    def close(self):
+        """
+        Stop releaser thread and release remaining tasks.
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Retry policies: release delay of failed tasks and terminal action.
+
+Usage:
+
+    >>> tube.set_retry_policy(RetryPolicy(
+    ...     ExponentialBackoff(base=1, factor=2, max_delay=600),
+    ...     max_attempts=10, on_exhausted=deque.tube('dead_letters'),
+    ... ))
+    >>> tube.set_retry_policy(RetryPolicy(FixedBackoff(5)), channel=2)
+    >>> task.retry()  # released with delay, deleted or moved
+    'released'
+"""
+import collections
+import inspect
+import random
+import threading
+import time
+
+
+class FixedBackoff(object):
+    """
+    The same delay before every retry.
+    """
+    def __init__(self, delay):
+        self.seconds = delay
+
+    def delay(self, attempt):
+        """
+        Returns delay in seconds before retry `attempt` (1 - first retry).
+        """
+        return self.seconds
+
+
+class ExponentialBackoff(object):
+    """
+    Delay `base * factor ** (attempt - 1)` seconds, up to `max_delay`,
+    randomized by +/- `jitter` fraction so failed tasks are spread
+    in time.
+    """
+    def __init__(self, base=1.0, factor=2.0, max_delay=3600.0, jitter=0.1):
+        if base <= 0 or factor < 1:
+            raise ValueError("Base must be positive and factor at least 1")
+        if not 0 <= jitter < 1:
+            raise ValueError("Jitter must be in range [0, 1)")
+
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """
+        Returns delay in seconds before retry `attempt` (1 - first retry).
+        """
+        try:
+            delay = self.base * self.factor ** (attempt - 1)
+        except OverflowError:
+            delay = self.max_delay
+        delay = min(delay, self.max_delay)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return delay
+
+
+class RetryPolicy(object):
+    """
+    Releases failed task with delay computed by `backoff` from attempt
+    number. Task is exhausted after `max_attempts` retries or if it was
+    created more than `max_age` seconds ago: it is deleted
+    (`on_exhausted='delete'`) or moved to other tube (`on_exhausted`
+    is `Tube` object).
+
+    Deque rows have no retry counter, so attempts are counted by policy
+    (up to `max_tracked` recent tasks), while task age is carried with
+    the task: use `max_age` to bound retries of tasks failed
+    in several processes.
+    """
+    def __init__(self, backoff=None, max_attempts=None, max_age=None,
+                 on_exhausted='delete', max_tracked=100000):
+        if on_exhausted != 'delete' and not hasattr(on_exhausted, 'put'):
+            raise ValueError("On exhausted must be 'delete' or tube")
+
+        self.backoff = backoff or ExponentialBackoff()
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.on_exhausted = on_exhausted
+        self.max_tracked = max_tracked
+
+        self._lock = threading.Lock()
+        self._attempts = collections.OrderedDict()
+
+    def attempt(self, task):
+        """
+        Count failure of task.
+
+        Returns retry attempt number (1 - first retry).
+        """
+        key = (task.tube.name, task.task_id)
+        with self._lock:
+            attempt = self._attempts.pop(key, 0) + 1
+            self._attempts[key] = attempt
+            while len(self._attempts) > self.max_tracked:
+                self._attempts.popitem(last=False)
+        return attempt
+
+    def forget(self, task):
+        """
+        Forget attempts of task (e.g. task is done).
+        """
+        with self._lock:
+            self._attempts.pop((task.tube.name, task.task_id), None)
+
+    def exhausted(self, task, attempt):
+        """
+        Returns `True` if task must not be retried anymore.
+        """
+        if self.max_attempts is not None and attempt > self.max_attempts:
+            return True
+        if self.max_age is not None and \
+                time.time() - task.created_at > self.max_age:
+            return True
+        return False
+
+    def action(self, task):
+        """
+        Count failure of task and choose what to do with it.
+
+        Returns `(action, delay)` pair: action is 'released', 'deleted'
+        or 'moved', delay is release delay in seconds.
+        """
+        attempt = self.attempt(task)
+        if not self.exhausted(task, attempt):
+            return 'released', self.backoff.delay(attempt)
+
+        self.forget(task)
+        if self.on_exhausted == 'delete':
+            return 'deleted', None
+        return 'moved', None
+
+    def retry(self, task):
+        """
+        Release failed task with delay or apply terminal action.
+
+        Returns action: 'released', 'deleted' or 'moved'.
+        """
+        action, delay = self.action(task)
+        if action == 'released':
+            task.release(delay=delay)
+            return action
+
+        if action == 'moved':
+            self.on_exhausted.put(task.data, task.channel, task.msg_type,
+                                  task.obj_type, task.obj_id)
+        task.delete()
+        return action
+
+    async def retry_async(self, task):
+        """
+        Coroutine version of `retry` for `AsyncTask` (`on_exhausted` may
+        be sync or async tube).
+
+        Returns action: 'released', 'deleted' or 'moved'.
+        """
+        action, delay = self.action(task)
+        if action == 'released':
+            await task.release(delay=delay)
+            return action
+
+        if action == 'moved':
+            moved = self.on_exhausted.put(task.data, task.channel,
+                                          task.msg_type, task.obj_type,
+                                          task.obj_id)
+            if inspect.isawaitable(moved):
+                await moved
+        await task.delete()
+        return action
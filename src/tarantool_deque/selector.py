@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Taking tasks from several tubes.
+
+Usage:
+
+    >>> tubes = [deque.tube(name) for name in ('email', 'sms', 'push')]
+    >>> task = deque.take_any(tubes, timeout=10, strategy='priority')
+    >>> task = deque.take_any(tubes, strategy='weighted',
+    ...                       weights={'email': 5, 'sms': 1, 'push': 1})
+"""
+import threading
+import time
+
+import tarantool
+
+from . import iproto
+
+# server procedure taking a task from the first non-empty tube
+TAKE_ANY = 'deque.take_any'
+
+
+class Strategy(object):
+    """
+    Order in which tubes are tried by `take_any`.
+    """
+    def __init__(self, tubes, weights=None):
+        self.tubes = list(tubes)
+        if not self.tubes:
+            raise ValueError("At least one tube is required")
+        self._lock = threading.Lock()
+
+    def order(self):
+        """
+        Returns tubes in order they must be tried.
+        """
+        return self.tubes
+
+    def served(self, tube):
+        """
+        Account task taken from tube.
+        """
+        pass
+
+
+class RoundRobin(Strategy):
+    """
+    Tubes are tried starting from the one after the last served tube.
+    """
+    def __init__(self, tubes, weights=None):
+        super(RoundRobin, self).__init__(tubes)
+        self._next = 0
+
+    def order(self):
+        with self._lock:
+            start = self._next % len(self.tubes)
+        return self.tubes[start:] + self.tubes[:start]
+
+    def served(self, tube):
+        with self._lock:
+            self._next = self.tubes.index(tube) + 1
+
+
+class Weighted(Strategy):
+    """
+    Smooth weighted round-robin: tubes are served in proportion to their
+    weights (`{tube_name: weight}`, default weight is 1) while they have
+    tasks, served tubes are interleaved.
+    """
+    def __init__(self, tubes, weights=None):
+        super(Weighted, self).__init__(tubes)
+        self.weights = dict(
+            (tube.name, (weights or {}).get(tube.name, 1))
+            for tube in self.tubes
+        )
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ValueError("Tube weights must be positive")
+        self._current = dict((tube.name, 0) for tube in self.tubes)
+
+    def order(self):
+        with self._lock:
+            return sorted(self.tubes, key=lambda tube: -(
+                self._current[tube.name] + self.weights[tube.name]
+            ))
+
+    def served(self, tube):
+        with self._lock:
+            for name, weight in self.weights.items():
+                self._current[name] += weight
+            self._current[tube.name] -= sum(self.weights.values())
+
+
+class Priority(Strategy):
+    """
+    Strict priority: tubes are tried in given order, so tube is served
+    only if all tubes before it are empty.
+    """
+
+
+STRATEGIES = {
+    'round_robin': RoundRobin,
+    'weighted': Weighted,
+    'priority': Priority,
+}
+
+
+def _probe(deque, tubes):
+    """
+    Take one task from each tube with one pipelined request.
+
+    Returns the first taken task in tubes order (or `None`), other taken
+    tasks are released at once.
+    """
+    pipe = deque.pipeline()
+    results = [pipe.take(tube) for tube in tubes]
+    pipe.execute(raise_on_error=False)
+
+    tasks = [result.value for result in results if result.value is not None]
+    if len(tasks) > 1:
+        for task in tasks[1:]:
+            pipe.release(task)
+        pipe.execute(raise_on_error=False)
+
+    for result in results:
+        if result.error is not None:
+            if tasks:
+                tasks[0].release()
+            raise result.error
+
+    if tasks:
+        return tasks[0]
+
+
+def take_any(deque, strategy, timeout=None, poll_interval=0.1):
+    """
+    Take a task from any tube of `strategy`, wait up to `timeout`
+    seconds (forever if `None`).
+
+    Tubes are passed to `deque.take_any` procedure in strategy order, so
+    one request waits on all tubes. Deque script without this procedure
+    is polled, see `poll`.
+
+    Returns `Task` object or `None`.
+    """
+    if TAKE_ANY not in deque._no_bulk:
+        try:
+            task = deque.take_first(strategy.order(), timeout)
+        except tarantool.NetworkError:
+            raise
+        except tarantool.DatabaseError as e:
+            if e.args[0] != iproto.ER_NO_SUCH_PROC:
+                raise
+            deque._no_bulk.add(TAKE_ANY)
+        else:
+            if task is not None:
+                strategy.served(task.tube)
+            return task
+
+    return poll(deque, strategy, timeout, poll_interval)
+
+
+def poll(deque, strategy, timeout=None, poll_interval=0.1):
+    """
+    Take a task from any tube of `strategy` without server support.
+
+    Tubes are probed in strategy order by pipelined requests in waves
+    of growing size (1, 2, 4, ... tubes), so idle tubes cost a few round
+    trips and only tubes of one wave are taken from at once (tasks besides
+    the first one are released at once). If all tubes are empty, blocking
+    take waits on the first tube for up to `poll_interval` seconds, then
+    all tubes are probed again.
+
+    Returns `Task` object or `None`.
+    """
+    deadline = None if timeout is None else time.time() + timeout
+
+    while True:
+        tubes = strategy.order()
+        start, size = 0, 1
+        while start < len(tubes):
+            task = _probe(deque, tubes[start:start + size])
+            if task is not None:
+                strategy.served(task.tube)
+                return task
+            start, size = start + size, size * 2
+
+        wait = poll_interval
+        if deadline is not None:
+            wait = min(wait, deadline - time.time())
+            if wait <= 0:
+                return None
+        task = tubes[0].take(timeout=wait)
+        if task is not None:
+            strategy.served(task.tube)
+            return task
@@ -0,0 +1,927 @@
+# -*- coding: utf-8 -*-
+"""
+Pure-Python stand-in for Tarantool with deque script.
+
+Speaks enough of the Tarantool binary protocol (greeting, auth, `call`)
+to serve `tarantool.Connection` and implements deque tube commands
+in memory. Intended for tests and benchmarks, not for production.
+
+Usage:
+
+    >>> from tarantool_deque.server import DequeServer
+    >>> server = DequeServer(user='test', password='test',
+    ...                      tubes=['test_tube'])
+    >>> server.start()
+    >>> deque = Deque(*server.address, user='test', password='test')
+    ...
+    >>> server.stop()
+
+Or from command line:
+
+    $ python -m tarantool_deque.server --port 33016 --tube test_tube
+"""
+import argparse
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+
+from . import iproto
+
+
+TIME_UNITS = 10000000
+
+STATE_DELAYED = 0
+STATE_READY = 1
+STATE_TAKEN = 2
+STATE_DONE = 3
+
+# task row fields
+ID = 0
+STATE = 1
+NEXT_EVENT = 2
+MSG_TYPE = 3
+OBJ_TYPE = 4
+OBJ_ID = 5
+CHANNEL = 6
+TO_SEND_AT = 7
+VALID_UNTIL = 8
+CREATED_AT = 9
+DATA = 10
+
+
+def _now():
+    """
+    Returns current time in deque time units.
+    """
+    return int(time.time() * TIME_UNITS)
+
+
+class ServerError(Exception):
+    """
+    Error returned to client in iproto error response.
+    """
+    def __init__(self, code, message):
+        super(ServerError, self).__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ServerTube(object):
+    """
+    In-memory deque tube.
+
+    Tasks are stored in dict by id and indexed by heaps of ready
+    (by `to_send_at`), delayed (by `to_send_at`) and expiring
+    (by `valid_until`) tasks, so all commands take O(log N) time.
+    Heap entries are not removed on state change, stale entries are
+    skipped when popped.
+
+    Filtered takes (by `channel` and/or `msg_type`) use heap of ready
+    tasks per filter, built on the first take with this filter.
+
+    Taken tasks belong to client session: only this session may ack
+    or release them, and they are released when session is closed.
+    """
+    # commands available to clients
+    commands = ('put', 'put_many', 'take', 'take_many', 'take_filtered',
+                'take_many_filtered', 'ack', 'ack_many', 'release',
+                'release_many', 'peek', 'delete', 'delete_many', 'drop')
+    # commands which need client session
+    session_commands = ('take', 'take_many', 'take_filtered',
+                        'take_many_filtered', 'ack', 'ack_many', 'release',
+                        'release_many')
+    # commands which may wait for tasks: name -> timeout argument index
+    blocking = {'take': 0, 'take_many': 1, 'take_filtered': 0,
+                'take_many_filtered': 1}
+
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+        self.cond = server.cond
+        self.tasks = {}
+        self._ready = []
+        self._delayed = []
+        self._expiring = []
+        self._filtered = {}
+        self._owners = {}
+        self._sessions = {}
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @staticmethod
+    def _row(task):
+        """
+        Returns task row as sent to client.
+        """
+        row = list(task)
+        if row[STATE] == STATE_DELAYED:
+            row[NEXT_EVENT] = row[TO_SEND_AT]
+        elif row[STATE] == STATE_READY:
+            row[NEXT_EVENT] = row[VALID_UNTIL]
+        else:
+            row[NEXT_EVENT] = 0
+        return row
+
+    def _index(self, task):
+        """
+        Add task to heaps according to its state.
+        """
+        if task[STATE] == STATE_READY:
+            self._push_ready(task)
+        elif task[STATE] == STATE_DELAYED:
+            heapq.heappush(self._delayed, (task[TO_SEND_AT], task[ID]))
+        if task[VALID_UNTIL]:
+            heapq.heappush(self._expiring, (task[VALID_UNTIL], task[ID]))
+
+    def _push_ready(self, task):
+        """
+        Add ready task to heap of ready tasks and to filtered heaps.
+        """
+        entry = (task[TO_SEND_AT], task[ID])
+        self._push(self._ready, entry)
+        if not self._filtered:
+            return
+
+        channel, msg_type = task[CHANNEL], task[MSG_TYPE]
+        for key in ((channel, None), (None, msg_type), (channel, msg_type)):
+            heap = self._filtered.get(key)
+            if heap is not None:
+                self._push(heap, entry)
+
+    def _push(self, heap, entry):
+        """
+        Push entry to heap of ready tasks, drop stale entries if heap
+        is much larger than tube.
+        """
+        heapq.heappush(heap, entry)
+        if len(heap) > 2 * len(self.tasks) + 64:
+            # tasks taken via other heaps (with or without filter)
+            # leave stale entries here
+            heap[:] = [item for item in heap if self._valid(
+                item, TO_SEND_AT, STATE_READY
+            ) is not None]
+            heapq.heapify(heap)
+
+    def _ready_heap(self, key):
+        """
+        Returns heap of ready tasks matching filter `key`
+        (`(channel, msg_type)` pair or `None`).
+        """
+        if key is None:
+            return self._ready
+
+        heap = self._filtered.get(key)
+        if heap is None:
+            channel, msg_type = key
+            heap = [
+                (task[TO_SEND_AT], task[ID]) for task in self.tasks.values()
+                if task[STATE] == STATE_READY and
+                (channel is None or task[CHANNEL] == channel) and
+                (msg_type is None or task[MSG_TYPE] == msg_type)
+            ]
+            heapq.heapify(heap)
+            self._filtered[key] = heap
+        return heap
+
+    @staticmethod
+    def _filter_key(options):
+        """
+        Returns filter key of `take` options or `None`.
+        """
+        if not options:
+            return None
+        unknown = set(options) - set(('channel', 'msg_type'))
+        if unknown:
+            raise ServerError(iproto.ER_PROC_LUA,
+                              "Unknown take options: {0}".format(
+                                  ', '.join(sorted(unknown))
+                              ))
+        channel = options.get('channel')
+        msg_type = options.get('msg_type')
+        if channel is None and msg_type is None:
+            return None
+        return channel, msg_type
+
+    def _valid(self, entry, field, state=None):
+        """
+        Returns task for heap `entry` or `None` if entry is stale.
+        """
+        task = self.tasks.get(entry[1])
+        if task is None or task[field] != entry[0]:
+            return None
+        if state is not None and task[STATE] != state:
+            return None
+        return task
+
+    def _promote(self, now):
+        """
+        Make delayed tasks ready and delete expired ones.
+        """
+        expiring = self._expiring
+        while expiring and expiring[0][0] <= now:
+            task = self._valid(heapq.heappop(expiring), VALID_UNTIL)
+            # taken task is checked again when released
+            if task is not None and task[STATE] != STATE_TAKEN:
+                del self.tasks[task[ID]]
+
+        delayed = self._delayed
+        while delayed and delayed[0][0] <= now:
+            task = self._valid(heapq.heappop(delayed), TO_SEND_AT,
+                               STATE_DELAYED)
+            if task is not None:
+                task[STATE] = STATE_READY
+                self._push_ready(task)
+
+    def _get(self, task_id):
+        """
+        Returns alive task by id.
+        """
+        self._promote(_now())
+        task = self.tasks.get(task_id)
+        if task is None:
+            raise ServerError(iproto.ER_PROC_LUA, "Task not found")
+        return task
+
+    def _get_taken(self, task_id, session):
+        """
+        Returns task taken by `session` (any session if `None`).
+        """
+        task = self._get(task_id)
+        if task[STATE] != STATE_TAKEN:
+            raise ServerError(iproto.ER_PROC_LUA, "Task was not taken")
+        if session is not None and self._owners.get(task_id) is not session:
+            raise ServerError(iproto.ER_PROC_LUA,
+                              "Task was taken in another session")
+        return task
+
+    def _disown(self, task_id):
+        """
+        Forget session which took the task.
+        """
+        session = self._owners.pop(task_id, None)
+        if session is not None:
+            task_ids = self._sessions.get(session)
+            if task_ids is not None:
+                task_ids.discard(task_id)
+                if not task_ids:
+                    del self._sessions[session]
+
+    def _delete(self, task):
+        """
+        Delete task, returns its row.
+        """
+        del self.tasks[task[ID]]
+        self._disown(task[ID])
+        task[STATE] = STATE_DONE
+        return [self._row(task)]
+
+    def _make_task(self, now, data, channel, msg_type, obj_type=0, obj_id=0,
+                   params=None):
+        """
+        Returns new task (not stored yet).
+        """
+        params = params or {}
+        to_send_at = params.get('to_send_at')
+        valid_until = params.get('valid_until')
+
+        to_send_at = int(to_send_at * TIME_UNITS) if to_send_at else now
+        valid_until = int(valid_until * TIME_UNITS) if valid_until else 0
+        state = STATE_DELAYED if to_send_at > now else STATE_READY
+
+        return [None, state, 0, msg_type, obj_type, obj_id, channel,
+                to_send_at, valid_until, now, data]
+
+    def _store(self, task):
+        """
+        Store new task and wake up waiting consumers.
+        """
+        self._last_id += 1
+        task[ID] = self._last_id
+        self.tasks[task[ID]] = task
+        self._index(task)
+        self.cond.notify_all()
+        return task
+
+    def _take_ready(self, session, key=None):
+        """
+        Returns first ready task matching filter `key` (taken now)
+        or `None`.
+        """
+        ready = self._ready_heap(key)
+        while ready:
+            task = self._valid(heapq.heappop(ready), TO_SEND_AT, STATE_READY)
+            if task is not None:
+                task[STATE] = STATE_TAKEN
+                if session is not None:
+                    self._owners[task[ID]] = session
+                    self._sessions.setdefault(session, set()).add(task[ID])
+                return task
+
+    def _next_wakeup(self, now):
+        """
+        Returns seconds until the next delayed task becomes ready (or task
+        expires) or `None`.
+        """
+        wait = None
+        delayed = self._delayed
+        while delayed and self._valid(delayed[0], TO_SEND_AT,
+                                      STATE_DELAYED) is None:
+            heapq.heappop(delayed)
+        if delayed:
+            wait = max(delayed[0][0] - now, 0) / float(TIME_UNITS)
+        if self._expiring:
+            # wake up to drop expired tasks as well
+            expires = max(self._expiring[0][0] - now, 0) / float(TIME_UNITS)
+            wait = expires if wait is None else min(wait, expires)
+        return wait
+
+    def clear(self):
+        """
+        Delete all tasks (not available to clients).
+        """
+        with self.cond:
+            self.tasks.clear()
+            del self._ready[:], self._delayed[:], self._expiring[:]
+            self._filtered.clear()
+            self._owners.clear()
+            self._sessions.clear()
+
+    def release_session(self, session):
+        """
+        Release all tasks taken by closed session.
+        """
+        with self.cond:
+            for task_id in self._sessions.pop(session, ()):
+                self._owners.pop(task_id, None)
+                task = self.tasks.get(task_id)
+                if task is not None:
+                    task[STATE] = STATE_READY
+                    self._index(task)
+            self.cond.notify_all()
+
+    def put(self, data, channel, msg_type, obj_type=0, obj_id=0,
+            params=None):
+        """
+        Enqueue a task.
+        """
+        with self.cond:
+            task = self._make_task(_now(), data, channel, msg_type,
+                                   obj_type, obj_id, params)
+            return [self._row(self._store(task))]
+
+    def put_many(self, tasks):
+        """
+        Enqueue list of tasks, each one is a list of `put` arguments.
+
+        Either all tasks are enqueued or none of them.
+        """
+        with self.cond:
+            now = _now()
+            try:
+                new_tasks = [self._make_task(now, *args) for args in tasks]
+            except (TypeError, ValueError) as e:
+                raise ServerError(iproto.ER_PROC_LUA,
+                                  "Bad task arguments: {0}".format(e))
+            return [self._row(self._store(task)) for task in new_tasks]
+
+    def take(self, timeout=None, session=None):
+        """
+        Take first ready task, wait up to `timeout` seconds.
+        """
+        return self._take(1, timeout, None, session)
+
+    def take_many(self, count, timeout=None, session=None):
+        """
+        Take up to `count` ready tasks, wait up to `timeout` seconds
+        for the first one.
+        """
+        return self._take(count, timeout, None, session)
+
+    def take_filtered(self, timeout=None, options=None, session=None):
+        """
+        Take first ready task matching `options` (`channel` and
+        `msg_type`), wait up to `timeout` seconds.
+        """
+        return self._take(1, timeout, self._filter_key(options), session)
+
+    def take_many_filtered(self, count, timeout=None, options=None,
+                           session=None):
+        """
+        Take up to `count` ready tasks matching `options`, wait up
+        to `timeout` seconds for the first one.
+        """
+        return self._take(count, timeout, self._filter_key(options), session)
+
+    def _take(self, count, timeout, key, session):
+        """
+        Take up to `count` ready tasks matching filter `key`, wait up
+        to `timeout` seconds for the first one.
+
+        Waiting is cancelled when client session is closed.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.cond:
+            while session is None or not session.closed:
+                now = _now()
+                self._promote(now)
+                rows = []
+                while len(rows) < count:
+                    task = self._take_ready(session, key)
+                    if task is None:
+                        break
+                    rows.append(self._row(task))
+                if rows:
+                    return rows
+                if self.server.stopped:
+                    break
+
+                wait = self._next_wakeup(now)
+                if deadline is not None:
+                    left = deadline - time.time()
+                    if left <= 0:
+                        break
+                    wait = left if wait is None else min(wait, left)
+                self.cond.wait(wait)
+
+        return []
+
+    def ack(self, task_id, session=None):
+        """
+        Mark taken task as done.
+        """
+        with self.cond:
+            return self._delete(self._get_taken(task_id, session))
+
+    def release(self, task_id, delay=None, session=None):
+        """
+        Put taken task back, with optional `delay` in seconds.
+        """
+        with self.cond:
+            task = self._get_taken(task_id, session)
+            self._disown(task_id)
+            if delay:
+                task[STATE] = STATE_DELAYED
+                task[TO_SEND_AT] = _now() + int(delay * TIME_UNITS)
+            else:
+                task[STATE] = STATE_READY
+            self._index(task)
+            self.cond.notify_all()
+            return [self._row(task)]
+
+    def _many(self, method, task_ids, *args, **kwargs):
+        """
+        Apply `method` to every task id, skip failed ones.
+        """
+        rows = []
+        with self.cond:
+            for task_id in task_ids:
+                try:
+                    rows.extend(method(task_id, *args, **kwargs))
+                except ServerError:
+                    pass
+        return rows
+
+    def ack_many(self, task_ids, session=None):
+        """
+        Ack list of tasks. Returns rows of acked tasks only.
+        """
+        return self._many(self.ack, task_ids, session=session)
+
+    def release_many(self, task_ids, delay=None, session=None):
+        """
+        Release list of tasks. Returns rows of released tasks only.
+        """
+        return self._many(self.release, task_ids, delay, session=session)
+
+    def delete_many(self, task_ids):
+        """
+        Delete list of tasks. Returns rows of deleted tasks only.
+        """
+        return self._many(self.delete, task_ids)
+
+    def peek(self, task_id):
+        """
+        Look at a task.
+        """
+        with self.cond:
+            return [self._row(self._get(task_id))]
+
+    def delete(self, task_id):
+        """
+        Delete task in any state.
+        """
+        with self.cond:
+            return self._delete(self._get(task_id))
+
+    def drop(self):
+        """
+        Drop tube if there are no taken tasks.
+        """
+        with self.cond:
+            if self._owners or any(task[STATE] == STATE_TAKEN
+                                   for task in self.tasks.values()):
+                raise ServerError(iproto.ER_PROC_LUA,
+                                  "Tube has taken tasks")
+            self.server.tubes.pop(self.name, None)
+            return [True]
+
+
+class DequeServer(object):
+    """
+    Threaded in-process stand-in for Tarantool deque server.
+
+    Each client connection is served in its own thread, commands which
+    may wait (e.g. `take` with timeout) are executed in separate threads,
+    so one connection can have several requests in flight like in
+    Tarantool.
+    """
+    version = '1.6.9'
+    tube_class = ServerTube
+    # procedures over several tubes: name -> method
+    procedures = {'deque.take_any': 'take_any'}
+    # procedures which may wait for tasks: name -> timeout argument index
+    blocking = {'deque.take_any': 1}
+
+    def __init__(self, host='127.0.0.1', port=0, user=None, password=None,
+                 tubes=()):
+        self.host = host
+        self.port = port
+        self.users = {}
+        if user is not None:
+            self.users[user] = password or ''
+        self.cond = threading.Condition()
+        self.tubes = {}
+        self.stopped = True
+        self._uuid = uuid.uuid4()
+        self._socket = None
+        self._clients = set()
+        self._thread = None
+
+        for name in tubes:
+            self.tube(name)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def address(self):
+        """
+        Returns `(host, port)` server is listening on.
+        """
+        return self.host, self.port
+
+    def tube(self, name):
+        """
+        Create tube, if not created before.
+
+        Returns `ServerTube` object.
+        """
+        with self.cond:
+            tube = self.tubes.get(name)
+            if tube is None:
+                tube = self.tube_class(self, name)
+                self.tubes[name] = tube
+            return tube
+
+    def take_any(self, names, timeout=None, session=None):
+        """
+        Take first ready task from the first tube in `names` order which
+        has one, wait up to `timeout` seconds.
+
+        Returns `[tube_name, row]` pair in one tuple.
+        """
+        tubes = []
+        for name in names:
+            tube = self.tubes.get(name)
+            if tube is None:
+                raise ServerError(iproto.ER_PROC_LUA,
+                                  "Tube '{0}' is not found".format(name))
+            tubes.append(tube)
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.cond:
+            while session is None or not session.closed:
+                now = _now()
+                wait = None
+                for tube in tubes:
+                    tube._promote(now)
+                    task = tube._take_ready(session)
+                    if task is not None:
+                        return [[tube.name, tube._row(task)]]
+                    tube_wait = tube._next_wakeup(now)
+                    if tube_wait is not None:
+                        wait = tube_wait if wait is None else min(wait,
+                                                                  tube_wait)
+                if self.stopped:
+                    break
+
+                if deadline is not None:
+                    left = deadline - time.time()
+                    if left <= 0:
+                        break
+                    wait = left if wait is None else min(wait, left)
+                self.cond.wait(wait)
+
+        return []
+
+    def start(self):
+        """
+        Start listening and serving clients in background thread.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(128)
+
+        self.port = sock.getsockname()[1]
+        self.stopped = False
+        self._socket = sock
+        self._thread = threading.Thread(target=self._accept_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop server and close all client connections.
+        """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self._socket.close()
+            self._socket = None
+
+        for client in list(self._clients):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def serve_forever(self):
+        """
+        Start server and block until interrupted.
+        """
+        self.start()
+        try:
+            while not self.stopped:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _accept_loop(self):
+        """
+        Accept client connections.
+        """
+        while not self.stopped:
+            try:
+                client, _ = self._socket.accept()
+            except (socket.error, AttributeError):
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            thread = threading.Thread(target=self._serve, args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    @staticmethod
+    def _recv(client, size):
+        """
+        Read exactly `size` bytes from client socket or `None` on EOF.
+        """
+        buf = b''
+        while len(buf) < size:
+            chunk = client.recv(size - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    def _read_packet(self, client):
+        """
+        Read one request packet. Returns `(header, body)` or `None` on EOF.
+        """
+        prefix = self._recv(client, 1)
+        if prefix is None:
+            return None
+        rest = iproto.length_size(bytearray(prefix)[0])
+        if rest:
+            tail = self._recv(client, rest)
+            if tail is None:
+                return None
+            prefix += tail
+        payload = self._recv(client, iproto.unpack_length(prefix))
+        if payload is None:
+            return None
+        return iproto.unpack(payload)
+
+    def _serve(self, client):
+        """
+        Serve one client connection.
+        """
+        session = Session(client)
+        self._clients.add(client)
+        try:
+            client.sendall(iproto.greeting(self.version, self._uuid,
+                                           session.salt))
+            while not self.stopped:
+                packet = self._read_packet(client)
+                if packet is None:
+                    break
+                self._dispatch(session, *packet)
+        except (socket.error, ValueError):
+            pass
+        finally:
+            self._clients.discard(client)
+            client.close()
+            self._disconnect(session)
+
+    def _disconnect(self, session):
+        """
+        Cancel waiting requests and release tasks of closed session.
+        """
+        with self.cond:
+            session.closed = True
+            for tube in list(self.tubes.values()):
+                tube.release_session(session)
+            self.cond.notify_all()
+
+    def _dispatch(self, session, header, body):
+        """
+        Handle one request, maybe in a separate thread.
+        """
+        code = header.get(iproto.IPROTO_CODE)
+        sync = header.get(iproto.IPROTO_SYNC, 0)
+
+        if code in (iproto.REQUEST_TYPE_CALL, iproto.REQUEST_TYPE_CALL_16):
+            name = body.get(iproto.IPROTO_FUNCTION_NAME, '')
+            args = body.get(iproto.IPROTO_TUPLE, [])
+            if self._is_blocking(name, args):
+                thread = threading.Thread(target=self._handle,
+                                          args=(session, code, sync, body))
+                thread.daemon = True
+                thread.start()
+                return
+
+        self._handle(session, code, sync, body)
+
+    def _is_blocking(self, name, args):
+        """
+        Returns `True` if call may wait for a long time.
+        """
+        method = name.rpartition(':')[2]
+        index = self.blocking.get(name, self.tube_class.blocking.get(method))
+        if index is None:
+            return False
+        return len(args) <= index or args[index] != 0
+
+    def _handle(self, session, code, sync, body):
+        """
+        Execute request and send response.
+        """
+        try:
+            if code == iproto.REQUEST_TYPE_AUTHENTICATE:
+                data = self._authenticate(session, body)
+            elif code in (iproto.REQUEST_TYPE_CALL,
+                          iproto.REQUEST_TYPE_CALL_16):
+                data = self._call(session, body)
+                if code == iproto.REQUEST_TYPE_CALL_16:
+                    data = [value if isinstance(value, (list, tuple))
+                            else [value] for value in data]
+            elif code in (iproto.REQUEST_TYPE_SELECT,
+                          iproto.REQUEST_TYPE_PING):
+                data = []
+            else:
+                raise ServerError(iproto.ER_UNKNOWN_REQUEST_TYPE,
+                                  "Unknown request type {0}".format(code))
+            packet = iproto.response(sync, data)
+        except ServerError as e:
+            packet = iproto.error_response(sync, e.code, e.message)
+
+        session.send(packet)
+
+    def _authenticate(self, session, body):
+        """
+        Check chap-sha1 scramble sent by client.
+        """
+        user = body.get(iproto.IPROTO_USER_NAME)
+        tuple_ = body.get(iproto.IPROTO_TUPLE) or ['', b'']
+        scramble = tuple_[1] if len(tuple_) > 1 else b''
+        if not isinstance(scramble, bytes):
+            scramble = scramble.encode('utf-8', 'surrogateescape')
+
+        if user not in self.users:
+            raise ServerError(iproto.ER_NO_SUCH_USER,
+                              "User '{0}' is not found".format(user))
+        if not iproto.check_scramble(session.salt, scramble,
+                                     self.users[user]):
+            raise ServerError(
+                iproto.ER_PASSWORD_MISMATCH,
+                "Incorrect password supplied for user '{0}'".format(user)
+            )
+
+        session.user = user
+        return []
+
+    def _call(self, session, body):
+        """
+        Call deque tube command.
+        """
+        name = body.get(iproto.IPROTO_FUNCTION_NAME, '')
+        args = body.get(iproto.IPROTO_TUPLE) or []
+
+        if self.users and session.user is None:
+            raise ServerError(
+                iproto.ER_ACCESS_DENIED,
+                "Execute access denied for user 'guest' "
+                "to function '{0}'".format(name)
+            )
+
+        if name in self.procedures:
+            try:
+                return getattr(self, self.procedures[name])(*args,
+                                                            session=session)
+            except TypeError as e:
+                raise ServerError(iproto.ER_PROC_LUA, str(e))
+
+        prefix, _, method = name.partition(':')
+        tube = None
+        if prefix.startswith('deque.tube.'):
+            tube = self.tubes.get(prefix[len('deque.tube.'):])
+        if tube is None or method not in tube.commands:
+            raise ServerError(
+                iproto.ER_NO_SUCH_PROC,
+                "Procedure '{0}' is not defined".format(name)
+            )
+
+        kwargs = {}
+        if method in tube.session_commands:
+            kwargs['session'] = session
+        try:
+            return getattr(tube, method)(*args, **kwargs)
+        except (TypeError, ValueError) as e:
+            raise ServerError(iproto.ER_PROC_LUA, str(e))
+
+
+class Session(object):
+    """
+    Client connection state.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.salt = os.urandom(32)
+        self.user = None
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, packet):
+        """
+        Send packet to client, ignore closed connections.
+        """
+        with self._lock:
+            try:
+                self.client.sendall(packet)
+            except socket.error:
+                pass
+
+
+def main():
+    """
+    Run stand-in server from command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=33016)
+    parser.add_argument('--user', default='test')
+    parser.add_argument('--password', default='test')
+    parser.add_argument('--tube', action='append', default=[],
+                        help="tube name (may be used several times)")
+    args = parser.parse_args()
+
+    server = DequeServer(args.host, args.port, user=args.user,
+                         password=args.password,
+                         tubes=args.tube or ['test_tube'])
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
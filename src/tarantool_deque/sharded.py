@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Deque sharded across several Tarantool instances.
+
+Usage:
+
+    >>> from tarantool_deque.sharded import ShardedDeque
+    >>> deque = ShardedDeque([
+    ...     Deque('10.0.0.1', 33013, user='test', password='test'),
+    ...     Deque('10.0.0.2', 33013, user='test', password='test'),
+    ... ], key='obj')
+    >>> tube = deque.tube('delayed_queue')
+    >>> tube.put([1, 2, 3], channel=1, msg_type=1, obj_type=1, obj_id=42)
+    >>> task = tube.take(timeout=1)  # from any shard
+    >>> task.ack()  # sent to the shard which owns the task
+"""
+import bisect
+import collections
+import hashlib
+import struct
+import threading
+import time
+
+from .iterator import TaskIterator
+from .tarantool_deque import BulkResult, Task, Tube
+from .worker import Worker
+
+
+def _hash(value):
+    """
+    Returns 64-bit hash of string.
+    """
+    digest = hashlib.md5(value.encode('utf-8')).digest()
+    return struct.unpack('>Q', digest[:8])[0]
+
+
+class HashRing(object):
+    """
+    Consistent hash ring: every node has `replicas` points on the ring,
+    key belongs to the node of the first point after key hash.
+
+    Adding (or removing) a node moves only keys of this node.
+    """
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._points = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(set(self._nodes.values()))
+
+    def add(self, node):
+        """
+        Add node (string name) to the ring.
+        """
+        for replica in range(self.replicas):
+            point = _hash('{0}#{1}'.format(node, replica))
+            if point not in self._nodes:
+                bisect.insort(self._points, point)
+            self._nodes[point] = node
+
+    def remove(self, node):
+        """
+        Remove node from the ring.
+        """
+        for point in [point for point, name in self._nodes.items()
+                      if name == node]:
+            del self._nodes[point]
+            del self._points[bisect.bisect_left(self._points, point)]
+
+    def get(self, key):
+        """
+        Returns node for key.
+        """
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        index = bisect.bisect(self._points, _hash(key))
+        return self._nodes[self._points[index % len(self._points)]]
+
+
+def obj_key(data, channel, msg_type, obj_type=0, obj_id=0, *args):
+    """
+    Shard key: task object (`obj_type` and `obj_id`).
+    """
+    return '{0}:{1}'.format(obj_type, obj_id)
+
+
+def channel_key(data, channel, msg_type, *args):
+    """
+    Shard key: task channel.
+    """
+    return str(channel)
+
+
+class ShardedTube(object):
+    """
+    Tube spread across deque shards.
+
+    Tasks are put to the shard chosen by key, taken from all shards
+    in round-robin order. Tasks are bound to their shard tubes, so task
+    commands are sent to the shard which owns the task.
+    """
+    def __init__(self, deque, name):
+        self.deque = deque
+        self.name = name
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def shard(self, *args, **kwargs):
+        """
+        Returns shard tube for task with `put` arguments.
+        """
+        key = self.deque.key(*Tube.put_args(*args, **kwargs))
+        return self.deque.shard(key).tube(self.name)
+
+    def shards(self):
+        """
+        Returns tubes of all shards (draining ones included), starting
+        from the next one in round-robin order.
+        """
+        deques = self.deque.shards + self.deque.draining
+        with self._lock:
+            start = self._next % len(deques)
+            self._next = start + 1
+        return [deque.tube(self.name)
+                for deque in deques[start:] + deques[:start]]
+
+    def put(self, data, channel, msg_type, obj_type=0, obj_id=0,
+            to_send_at=None, valid_until=None):
+        """
+        Enqueue a task to the shard chosen by key.
+
+        Returns a `Task` object.
+        """
+        tube = self.shard(data, channel, msg_type, obj_type, obj_id)
+        return tube.put(data, channel, msg_type, obj_type, obj_id,
+                        to_send_at, valid_until)
+
+    def put_many(self, tasks, chunk_size=1000, ids_only=False):
+        """
+        Enqueue many tasks, one request per chunk and shard.
+
+        Returns `BulkResult` in the same order as `tasks`. Task ids (if
+        `ids_only` is set) are unique within shard only. Offset of failed
+        chunk is the position of its first task, chunk items are tasks
+        of one shard.
+        """
+        groups = collections.OrderedDict()
+        for index, task in enumerate(tasks):
+            if isinstance(task, dict):
+                tube = self.shard(**task)
+            else:
+                tube = self.shard(*task)
+            groups.setdefault(tube, []).append((index, task))
+
+        result = BulkResult()
+        result.results = [None] * sum(len(items) for items in groups.values())
+        for tube, items in groups.items():
+            shard_result = tube.put_many([task for _, task in items],
+                                         chunk_size, ids_only)
+            for (index, _), value in zip(items, shard_result.results):
+                result.results[index] = value
+            for error in shard_result.errors:
+                error.offset = items[error.offset][0]
+                result.errors.append(error)
+
+        return result
+
+    def _take(self, count, timeout, **filters):
+        """
+        Take up to `count` tasks from shards in round-robin order,
+        wait up to `timeout` seconds for the first one.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        poll_interval = self.deque.poll_interval
+
+        while True:
+            tasks = []
+            tubes = self.shards()
+            for tube in tubes:
+                tasks.extend(tube.take_many(count - len(tasks), timeout=0,
+                                            **filters))
+                if len(tasks) >= count:
+                    break
+            if tasks:
+                return tasks
+
+            # wait on the first shard, then look at all shards again
+            wait = poll_interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.time())
+                if wait <= 0:
+                    return tasks
+            tasks = tubes[0].take_many(count, timeout=wait, **filters)
+            if tasks:
+                return tasks
+
+    def take(self, timeout=None, channel=None, msg_type=None):
+        """
+        Get a task from any shard.
+
+        Waits `timeout` seconds until a READY task (matching `channel`
+        and `msg_type`, if set) appears in any shard.
+
+        Returns either a `Task` object or `None`.
+        """
+        tasks = self._take(1, timeout, channel=channel, msg_type=msg_type)
+        if tasks:
+            return tasks[0]
+
+    def take_many(self, count, timeout=None, channel=None, msg_type=None):
+        """
+        Get up to `count` tasks from shards in round-robin order.
+
+        Returns list of `Task` objects (may be empty).
+        """
+        return self._take(count, timeout, channel=channel, msg_type=msg_type)
+
+    def iter_tasks(self, prefetch=10, timeout=None, poll_interval=1.0,
+                   channel=None, msg_type=None):
+        """
+        Iterate over tasks taken from all shards, see `Tube.iter_tasks`.
+        """
+        return TaskIterator(self, prefetch=prefetch, timeout=timeout,
+                            poll_interval=poll_interval, channel=channel,
+                            msg_type=msg_type)
+
+    def consume(self, handler, concurrency=1, **options):
+        """
+        Run `handler(task)` over tasks from all shards, see `Tube.consume`.
+        """
+        return Worker(self, handler, concurrency, **options).start()
+
+    def _bulk(self, method, tasks, *args):
+        """
+        Call bulk tube `method` on every shard for its tasks.
+        """
+        groups = collections.OrderedDict()
+        for index, task in enumerate(tasks):
+            if not isinstance(task, Task):
+                raise TypeError("Task ids are ambiguous in sharded tube,"
+                                " use Task objects")
+            groups.setdefault(task.tube, []).append((index, task))
+
+        result = BulkResult()
+        result.results = [None] * sum(len(items) for items in groups.values())
+        for tube, items in groups.items():
+            shard_result = getattr(tube, method)(
+                [task for _, task in items], *args
+            )
+            for (index, _), value in zip(items, shard_result.results):
+                result.results[index] = value
+            for error in shard_result.errors:
+                error.offset = items[error.offset][0]
+                result.errors.append(error)
+
+        return result
+
+    def ack_many(self, tasks, chunk_size=1000):
+        """
+        Ack many tasks, one request per chunk and shard.
+        """
+        return self._bulk('ack_many', tasks, chunk_size)
+
+    def release_many(self, tasks, delay=None, chunk_size=1000):
+        """
+        Release many tasks, one request per chunk and shard.
+        """
+        return self._bulk('release_many', tasks, delay, chunk_size)
+
+    def delete_many(self, tasks, chunk_size=1000):
+        """
+        Delete many tasks, one request per chunk and shard.
+        """
+        return self._bulk('delete_many', tasks, chunk_size)
+
+
+class ShardedDeque(object):
+    """
+    Deque spread across several Tarantool instances (`Deque` objects).
+
+    Tasks are put to the shard chosen by consistent hashing of task key:
+    'obj' (`obj_type` and `obj_id`), 'channel' or custom callable taking
+    `put` arguments and returning string.
+
+    Take waits on one shard at a time for up to `poll_interval` seconds,
+    then looks at all shards again.
+
+    Removed shards are kept in `draining` list: no new tasks are put
+    there, but takes still visit them until `forget_shard` is called.
+    """
+    keys = {
+        'obj': obj_key,
+        'channel': channel_key,
+    }
+
+    def __init__(self, shards, key='obj', replicas=100, poll_interval=0.1):
+        if not shards:
+            raise ValueError("At least one shard is required")
+
+        self.key = self.keys[key] if key in self.keys else key
+        if not callable(self.key):
+            raise ValueError("Key must be one of: {0} or callable".format(
+                ', '.join(sorted(self.keys))
+            ))
+
+        self.poll_interval = poll_interval
+        self.shards = []
+        self.draining = []
+        self.tubes = {}
+        self._ring = HashRing(replicas=replicas)
+        self._by_name = {}
+        for deque in shards:
+            self.add_shard(deque)
+
+    @staticmethod
+    def shard_name(deque):
+        """
+        Returns shard name (`host:port`).
+        """
+        return '{0}:{1}'.format(deque.host, deque.port)
+
+    def add_shard(self, deque):
+        """
+        Add shard. Only keys of the new shard are moved to it.
+        """
+        name = self.shard_name(deque)
+        if name in self._by_name:
+            raise ValueError("Shard {0} is already added".format(name))
+        self._by_name[name] = deque
+        self.shards = self.shards + [deque]
+        self.draining = [shard for shard in self.draining
+                         if shard is not deque]
+        self._ring.add(name)
+
+    def remove_shard(self, deque):
+        """
+        Remove shard from routing of new tasks. Already taken tasks
+        of this shard are still bound to it.
+
+        Shard is moved to `draining` list, so its READY (and delayed)
+        tasks are still taken. Call `forget_shard` once it is empty.
+        """
+        name = self.shard_name(deque)
+        self._ring.remove(name)
+        self._by_name.pop(name, None)
+        if any(shard is deque for shard in self.shards):
+            self.shards = [shard for shard in self.shards
+                           if shard is not deque]
+            self.draining = self.draining + [deque]
+
+    def forget_shard(self, deque):
+        """
+        Stop taking tasks from removed (drained) shard.
+        """
+        self.draining = [shard for shard in self.draining
+                         if shard is not deque]
+
+    def shard(self, key):
+        """
+        Returns shard `Deque` for key.
+        """
+        return self._by_name[self._ring.get(key)]
+
+    def tube(self, name):
+        """
+        Create sharded tube object, if not created before.
+
+        Returns `ShardedTube` object.
+        """
+        tube = self.tubes.get(name)
+
+        if tube is None:
+            tube = ShardedTube(self, name)
+            self.tubes[name] = tube
+
+        return tube
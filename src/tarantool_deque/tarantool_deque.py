@@ -4,10 +4,24 @@ Python bindings for Tarantool delayed queue script.
 
 See also: https://github.com/dreadatour/tarantool-deque-python
 """
+import collections
+import itertools
+import os
 import threading
+import time
+import weakref
 
 import tarantool
 
+from . import codec, iproto, selector
+from .iterator import TaskIterator
+from .lane import TakeLane
+from .metrics import LATENCY_BUCKETS, Metrics
+from .pool import ConnectionPool, PoolTimeoutException, ping_check
+from .producer import Producer
+from .releaser import Releaser
+from .worker import Worker
+
 
 TASK_STATE = {
     0: 'delayed',
@@ -17,14 +31,59 @@ TASK_STATE = {
 }
 
 
+def _chunks(iterable, size):
+    """
+    Split iterable into lists of `size` items.
+
+    Yields `(offset, chunk)` pairs.
+    """
+    if size < 1:
+        raise ValueError("Chunk size must be positive")
+
+    iterator = iter(iterable)
+    offset = 0
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield offset, chunk
+        offset += len(chunk)
+        chunk = list(itertools.islice(iterator, size))
+
+
+# deques of this process, reset in child process after fork
+_deques = weakref.WeakSet()
+_LOCK_TYPE = type(threading.Lock())
+
+
+def _after_fork():
+    """
+    Drop connections inherited from parent process.
+    """
+    for deque in list(_deques):
+        deque._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+# `Task._data` value until payload is decoded
+_NOT_DECODED = object()
+
+
 class Task(object):
     """
     Tarantool deque task wrapper.
+
+    Task fields are kept in `__slots__`, so holding many taken tasks costs
+    one small object per task. Payload is decoded on first access.
     """
+    __slots__ = ('tube', 'task_id', 'state', 'next_event', 'msg_type',
+                 'obj_type', 'obj_id', 'channel', '_to_send_at',
+                 '_valid_until', '_created_at', '_payload', '_data')
+
     def __init__(self, tube, task_id, state, next_event, msg_type, obj_type,
                  obj_id, channel, to_send_at, valid_until, created_at, data):
         self.tube = tube
-        self.deque = tube.deque
         self.task_id = task_id
         self.state = state
         self.next_event = next_event
@@ -35,18 +94,45 @@ class Task(object):
         self._to_send_at = to_send_at
         self._valid_until = valid_until
         self._created_at = created_at
-        self.data = data
+        self._payload = data
+        self._data = _NOT_DECODED
 
     def __str__(self):
         return "Task <{0}>: {1}".format(self.task_id, self.state_name)
 
     def __del__(self):
-        if self.state == 2:
+        # task may be half-built if row is malformed
+        if getattr(self, 'state', None) == 2:
+            releaser = self.deque.releaser
+            if releaser is not None:
+                releaser.put(self.tube, self.task_id)
+                return
             try:
                 self.release()
             except self.deque.DatabaseError:
                 pass
 
+    @property
+    def data(self):
+        """
+        Returns task payload, decoded on first access (see `codec`).
+        """
+        data = self._data
+        if data is _NOT_DECODED:
+            data = self._data = codec.decode(self._payload)
+        return data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def deque(self):
+        """
+        Returns deque of task tube.
+        """
+        return self.tube.deque
+
     @property
     def state_name(self):
         """
@@ -88,22 +174,20 @@ class Task(object):
         if not the_tuple.rowcount:
             raise Deque.ZeroTupleException("Error creating task")
 
-        row = the_tuple[0]
-
-        return cls(
-            tube,
-            task_id=row[0],
-            state=row[1],
-            next_event=row[2],
-            msg_type=row[3],
-            obj_type=row[4],
-            obj_id=row[5],
-            channel=row[6],
-            to_send_at=row[7],
-            valid_until=row[8],
-            created_at=row[9],
-            data=row[10]
-        )
+        return cls.create_from_row(tube, the_tuple[0])
+
+    @classmethod
+    def create_from_row(cls, tube, row):
+        """
+        Create task from single tuple row.
+
+        Returns `Task` instance.
+        """
+        task = cls.__new__(cls)
+        task.tube = tube
+        task.task_id = row[0]
+        task._set_fields(row)
+        return task
 
     def update_from_tuple(self, the_tuple):
         """
@@ -112,12 +196,21 @@ class Task(object):
         if not the_tuple.rowcount:
             raise Deque.ZeroTupleException("Error updating task")
 
-        row = the_tuple[0]
+        self.update_from_row(the_tuple[0])
 
+    def update_from_row(self, row):
+        """
+        Update task from single tuple row.
+        """
         if self.task_id != row[0]:
             raise Deque.BadTupleException("Wrong task: id's are not match")
 
-        self.state = row[1]
+        self._set_fields(row)
+
+    def _set_fields(self, row):
+        """
+        Copy fields (except id) from tuple row.
+        """
         self.next_event = row[2]
         self.msg_type = row[3]
         self.obj_type = row[4]
@@ -126,7 +219,10 @@ class Task(object):
         self._to_send_at = row[7]
         self._valid_until = row[8]
         self._created_at = row[9]
-        self.data = row[10]
+        self._payload = row[10]
+        # state is set last: task with malformed row is not released
+        self.state = row[1]
+        self._data = _NOT_DECODED
 
     def ack(self):
         """
@@ -140,6 +236,18 @@ class Task(object):
 
         return bool(self.state == 3)
 
+    def ack_and_take(self, timeout=None, raw=False, channel=None,
+                     msg_type=None):
+        """
+        Report task successful execution and get the next task from tube
+        in one round trip, see `Tube.ack_and_take`.
+
+        Returns either a `Task` object (or `TaskRow` if `raw` is set)
+        or `None`.
+        """
+        return self.tube.ack_and_take(self, timeout=timeout, raw=raw,
+                                      channel=channel, msg_type=msg_type)
+
     def release(self, delay=None):
         """
         Put the task back into the deque.
@@ -182,29 +290,122 @@ class Task(object):
 
         return bool(self.state == 3)
 
+    def retry(self):
+        """
+        Release failed task according to tube retry policy (with delay
+        computed from attempt number), or delete it or move it to other
+        tube if retries are exhausted. Without policy task is released.
+
+        Returns action: 'released', 'deleted' or 'moved'.
+        """
+        return self.tube.retry(self)
+
+
+# immutable task record returned in raw mode: timestamps are floats,
+# data is decoded, no `Task` object (and no release on garbage collection)
+TaskRow = collections.namedtuple('TaskRow', (
+    'task_id', 'state', 'next_event', 'msg_type', 'obj_type', 'obj_id',
+    'channel', 'to_send_at', 'valid_until', 'created_at', 'data',
+))
 
-class Tube(object):
+
+def task_row(row, _new=tuple.__new__):
     """
-    Tarantol deque tube wrapper.
+    Returns `TaskRow` record of task tuple row.
+    """
+    data = row[10]
+    if isinstance(data, bytes):
+        data = codec.decode(data)
+    # skip namedtuple `__new__` wrapper, it is measurable on hot path
+    return _new(TaskRow, (row[0], row[1], row[2], row[3], row[4], row[5],
+                          row[6], row[7] / 10000000, row[8] / 10000000,
+                          row[9] / 10000000, data))
+
+
+class ChunkError(object):
+    """
+    Failed chunk of bulk operation.
+    """
+    def __init__(self, offset, items, error):
+        self.offset = offset
+        self.items = items
+        self.error = error
+
+    def __str__(self):
+        return "Chunk [{0}:{1}]: {2}".format(
+            self.offset, self.offset + len(self.items), self.error
+        )
+
+
+class BulkResult(object):
+    """
+    Result of bulk operation.
+
+    `results` contains one item per requested element (in the same order),
+    items of failed chunks are `None`. `errors` contains `ChunkError`
+    object for every failed chunk.
+    """
+    def __init__(self):
+        self.results = []
+        self.errors = []
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    @property
+    def ok(self):
+        """
+        Returns `True` if all chunks succeeded.
+        """
+        return not self.errors
+
+    def add_error(self, offset, items, error):
+        """
+        Report failed chunk.
+        """
+        self.errors.append(ChunkError(offset, items, error))
+        self.results.extend([None] * len(items))
+
+
+class BaseTube(object):
     """
-    def __init__(self, deque, name):
+    Tube name, codec, retry policies and command helpers shared by
+    `Tube` and `tarantool_deque.aio.AsyncTube`.
+    """
+    commands = ('put', 'put_many', 'take', 'take_many', 'take_filtered',
+                'take_many_filtered', 'ack', 'ack_many', 'release',
+                'release_many', 'peek', 'delete', 'delete_many', 'drop')
+
+    def __init__(self, deque, name, codec=None):
         self.deque = deque
         self.name = name
+        self.codec = codec
+        self.retry_policies = {}
+        self._cmds = {}
 
     def cmd(self, cmd_name):
         """
         Returns tarantool deque command name for current tube.
         """
-        return 'deque.tube.{0}:{1}'.format(self.name, cmd_name)
-
-    def put(self, data, channel, msg_type, obj_type=0, obj_id=0,
-            to_send_at=None, valid_until=None):
+        try:
+            return self._cmds[cmd_name]
+        except KeyError:
+            name = 'deque.tube.{0}:{1}'.format(self.name, cmd_name)
+            self._cmds[cmd_name] = name
+            return name
+
+    @staticmethod
+    def put_args(data, channel, msg_type, obj_type=0, obj_id=0,
+                 to_send_at=None, valid_until=None):
         """
-        Enqueue a task.
-
-        Returns a `Task` object.
+        Returns tarantool deque `put` command arguments.
         """
-        cmd = self.cmd('put')
         args = (data, channel, msg_type, obj_type, obj_id)
 
         params = dict()
@@ -215,23 +416,401 @@ class Tube(object):
         if params:
             args += (params,)
 
-        the_tuple = self.deque.tnt.call(cmd, args)
+        return args
+
+    @staticmethod
+    def take_cmd_name(cmd_name, channel=None, msg_type=None):
+        """
+        Returns name of `take` (or `take_many`) command: filtered takes
+        are separate commands (`take_filtered`, `take_many_filtered`),
+        so deque script without filters fails instead of taking tasks
+        of every channel.
+        """
+        if channel is None and msg_type is None:
+            return cmd_name
+        return cmd_name + '_filtered'
+
+    @staticmethod
+    def take_args(timeout=None, channel=None, msg_type=None):
+        """
+        Returns tarantool deque `take` command arguments (`take_many`
+        arguments after `count`), see `take_cmd_name`.
+        """
+        args = ()
+
+        options = dict()
+        if channel is not None:
+            options['channel'] = channel
+        if msg_type is not None:
+            options['msg_type'] = msg_type
+        if timeout is not None or options:
+            args += (timeout,)
+        if options:
+            args += (options,)
+
+        return args
+
+    def encode_args(self, *args, **kwargs):
+        """
+        Returns `put` command arguments with payload encoded by tube codec.
+        """
+        args = self.put_args(*args, **kwargs)
+        if self.codec is not None:
+            args = (self.codec.encode(args[0]),) + args[1:]
+        return args
+
+    def set_retry_policy(self, policy, channel=None):
+        """
+        Set retry policy (see `tarantool_deque.retry.RetryPolicy`) of tasks
+        of `channel`, or default policy if `channel` is `None`. Policy
+        `None` removes it.
+        """
+        if policy is None:
+            self.retry_policies.pop(channel, None)
+        else:
+            self.retry_policies[channel] = policy
+
+    def retry_policy(self, channel=None):
+        """
+        Returns retry policy of tasks of `channel` or `None`.
+        """
+        policy = self.retry_policies.get(channel)
+        if policy is None:
+            policy = self.retry_policies.get(None)
+        return policy
+
+
+class Tube(BaseTube):
+    """
+    Tarantol deque tube wrapper.
+    """
+    def put(self, data, channel, msg_type, obj_type=0, obj_id=0,
+            to_send_at=None, valid_until=None, raw=False):
+        """
+        Enqueue a task.
+
+        Returns a `Task` object (or `TaskRow` record if `raw` is set).
+        """
+        cmd = self.cmd('put')
+        args = self.encode_args(data, channel, msg_type, obj_type, obj_id,
+                                to_send_at, valid_until)
+
+        the_tuple = self.deque.call(self, cmd, args)
+
+        if raw:
+            if not the_tuple.rowcount:
+                raise Deque.ZeroTupleException("Error creating task")
+            return task_row(the_tuple[0])
 
         return Task.create_from_tuple(self, the_tuple)
 
-    def take(self, timeout=None):
+    def put_many(self, tasks, chunk_size=1000, ids_only=False, raw=False):
+        """
+        Enqueue many tasks, one request per `chunk_size` tasks.
+
+        Every task is either a dict of `put` keyword arguments or a tuple
+        of `put` positional arguments. Every chunk is enqueued entirely
+        or not at all, failed chunks are reported in result `errors`.
+        If deque script has no `put_many` command, tasks are put one
+        by one (pipelined) and every failed task is reported separately.
+
+        Returns `BulkResult` with `Task` objects (task ids only, if
+        `ids_only` is set, or `TaskRow` records, if `raw` is set)
+        in the same order as `tasks`.
+        """
+        result = BulkResult()
+
+        for offset, chunk in _chunks(tasks, chunk_size):
+            args = [
+                self.encode_args(**task) if isinstance(task, dict)
+                else self.encode_args(*task)
+                for task in chunk
+            ]
+
+            try:
+                the_tuple = self.deque.put_many(self, args)
+            except (Deque.DatabaseError, Deque.NetworkError) as e:
+                result.add_error(offset, chunk, e)
+                continue
+
+            if any(isinstance(row, Exception) for row in the_tuple):
+                # tasks are put one by one (see `Deque.put_many`)
+                for index, row in enumerate(the_tuple):
+                    if isinstance(row, Exception):
+                        result.add_error(offset + index, [chunk[index]], row)
+                    elif ids_only:
+                        result.results.append(row[0])
+                    elif raw:
+                        result.results.append(task_row(row))
+                    else:
+                        result.results.append(Task.create_from_row(self, row))
+            elif ids_only:
+                result.results.extend(row[0] for row in the_tuple)
+            elif raw:
+                result.results.extend(task_row(row) for row in the_tuple)
+            else:
+                result.results.extend(
+                    Task.create_from_row(self, row) for row in the_tuple
+                )
+
+        return result
+
+    def take(self, timeout=None, raw=False, channel=None, msg_type=None):
         """
         Get a task from deque for execution.
 
         Waits `timeout` seconds until a READY task appears in the deque.
+        If `channel` or `msg_type` is set, only matching tasks are taken
+        (other tasks are left READY).
 
-        Returns either a `Task` object or `None`.
+        Returns either a `Task` object or `None`. If `raw` is set,
+        `TaskRow` record is returned: it is not released on garbage
+        collection, use `ack` and `release` with task id.
         """
-        the_tuple = self.deque.take(self, timeout=timeout)
+        the_tuple = self.deque.take(self, timeout=timeout, channel=channel,
+                                    msg_type=msg_type)
 
         if the_tuple.rowcount:
+            if raw:
+                return task_row(the_tuple[0])
             return Task.create_from_tuple(self, the_tuple)
 
+    def take_many(self, count, timeout=None, raw=False, channel=None,
+                  msg_type=None):
+        """
+        Get up to `count` tasks from deque for execution in one request.
+
+        Waits `timeout` seconds until at least one READY task appears
+        in the deque, then takes all READY tasks (but not more than `count`)
+        without waiting. Tasks may be filtered by `channel` and `msg_type`,
+        see `take`.
+
+        Returns list of `Task` objects (or `TaskRow` records if `raw`
+        is set, see `take`), may be empty.
+        """
+        the_tuple = self.deque.take_many(self, count, timeout=timeout,
+                                         channel=channel, msg_type=msg_type)
+
+        if raw:
+            return [task_row(row) for row in the_tuple]
+        return [Task.create_from_row(self, row) for row in the_tuple]
+
+    def ack(self, task_id):
+        """
+        Report execution of task by id.
+
+        Returns `True` is task is acked.
+        """
+        the_tuple = self.deque.ack(self, task_id)
+
+        return bool(the_tuple[0][1] == 3)
+
+    def ack_and_take(self, task, timeout=None, raw=False, channel=None,
+                     msg_type=None):
+        """
+        Ack task (`Task` object, updated in place, or task id) and get
+        the next task for execution in one round trip: `ack` and `take`
+        without waiting are pipelined via connection which took the acked
+        task.
+
+        If no READY task (matching `channel` and `msg_type`, if set) is
+        found, waits for it up to `timeout` seconds by a separate `take`
+        (via take lane, if enabled). If ack fails, taken task is released
+        and ack error is raised.
+
+        Returns either a `Task` object (or `TaskRow` if `raw` is set)
+        or `None`.
+        """
+        task_id = task.task_id if isinstance(task, (Task, TaskRow)) else task
+        args = self.take_args(0, channel, msg_type)
+
+        pipe = self.deque.pipeline()
+        ack = pipe.call(self, self.cmd('ack'), (task_id,), (task_id,))
+        take = pipe.call(
+            self, self.cmd(self.take_cmd_name('take', channel, msg_type)),
+            args, (task_id,)
+        )
+        pipe.execute(raise_on_error=False)
+
+        the_tuple = take.value if take.error is None else None
+        next_task = None
+        if the_tuple is not None and the_tuple.rowcount:
+            if raw:
+                next_task = task_row(the_tuple[0])
+            else:
+                next_task = Task.create_from_tuple(self, the_tuple)
+
+        if ack.error is not None:
+            if isinstance(next_task, Task):
+                next_task.release()
+            elif next_task is not None:
+                self.release(next_task.task_id)
+            raise ack.error
+        if isinstance(task, Task):
+            task.update_from_tuple(ack.value)
+        if take.error is not None:
+            raise take.error
+
+        if next_task is None and timeout != 0:
+            return self.take(timeout, raw, channel, msg_type)
+        return next_task
+
+    def release(self, task_id, delay=None):
+        """
+        Put the task back into the deque by id.
+
+        Returns `True` is task is released.
+        """
+        the_tuple = self.deque.release(self, task_id, delay=delay)
+
+        return bool(the_tuple[0][1] == (1 if delay is None else 0))
+
+    def peek(self, task_id):
+        """
+        Look at a task by id without changing its state.
+
+        Returns `TaskRow` record.
+        """
+        the_tuple = self.deque.peek(self, task_id)
+
+        if not the_tuple.rowcount:
+            raise Deque.ZeroTupleException("Error peeking task")
+
+        return task_row(the_tuple[0])
+
+    def iter_tasks(self, prefetch=10, timeout=None, poll_interval=1.0,
+                   channel=None, msg_type=None):
+        """
+        Iterate over tasks taken from deque.
+
+        Up to `prefetch` tasks are taken ahead of consumer by background
+        thread (using `take_many`). Iteration stops if no task appears
+        within `timeout` seconds (`None` - iterate forever). Tasks still
+        buffered are released when iterator is closed:
+
+            >>> with tube.iter_tasks(prefetch=100) as tasks:
+            ...     for task in tasks:
+            ...         handle(task)
+            ...         task.ack()
+
+        Only tasks matching `channel` and `msg_type` are taken, if set.
+
+        Returns `TaskIterator` object.
+        """
+        return TaskIterator(self, prefetch=prefetch, timeout=timeout,
+                            poll_interval=poll_interval, channel=channel,
+                            msg_type=msg_type)
+
+    def consume(self, handler, concurrency=1, **options):
+        """
+        Run `handler(task)` over tasks from tube in `concurrency` threads
+        (or processes, if `executor='process'`).
+
+        Task is acked if handler returns and released with `release_delay`
+        seconds delay if handler raises exception:
+
+            >>> worker = tube.consume(handler, concurrency=8,
+            ...                       release_delay=10)
+            >>> worker.stop()  # wait for in-flight tasks
+            >>> worker.stats()
+
+        Returns started `Worker` object.
+        """
+        return Worker(self, handler, concurrency, **options).start()
+
+    def retry(self, task):
+        """
+        Release failed task according to retry policy, see `Task.retry`.
+        """
+        policy = self.retry_policy(task.channel)
+        if policy is None:
+            task.release()
+            return 'released'
+        return policy.retry(task)
+
+    def producer(self, batch_size=1000, interval=0.05, max_pending=10000,
+                 overflow='block', put_timeout=None, coalesce=None):
+        """
+        Create write-behind producer: `put` buffers task and returns
+        future, tasks are enqueued in batches by background thread:
+
+            >>> producer = tube.producer(batch_size=500, interval=0.01)
+            >>> future = producer.put([1, 2, 3], channel=1, msg_type=1)
+            >>> producer.flush()  # wait until buffered tasks are stored
+            >>> future.result()  # task id
+
+        Duplicate tasks buffered within `interval` may be coalesced,
+        see `Producer`.
+
+        Returns started `Producer` object.
+        """
+        return Producer(self, batch_size, interval, max_pending, overflow,
+                        put_timeout, coalesce).start()
+
+    def _bulk(self, method, tasks, chunk_size, state, *args):
+        """
+        Call bulk deque `method` for tasks, one request per chunk.
+
+        Tasks may be `Task` objects (updated in place), `TaskRow` records
+        or task ids. Result item is `True` if task is in `state` after command.
+        """
+        result = BulkResult()
+
+        for offset, chunk in _chunks(tasks, chunk_size):
+            task_ids = [
+                task.task_id if isinstance(task, (Task, TaskRow)) else task
+                for task in chunk
+            ]
+
+            try:
+                the_tuple = method(self, task_ids, *args)
+            except (Deque.DatabaseError, Deque.NetworkError) as e:
+                result.add_error(offset, chunk, e)
+                continue
+
+            rows = dict((row[0], row) for row in the_tuple)
+            for task, task_id in zip(chunk, task_ids):
+                row = rows.get(task_id)
+                if row is not None and isinstance(task, Task):
+                    task.update_from_row(row)
+                result.results.append(bool(row is not None and
+                                           row[1] == state))
+
+        return result
+
+    def ack_many(self, tasks, chunk_size=1000):
+        """
+        Report successful execution of many tasks, one request per chunk.
+
+        Tasks may be `Task` objects (updated in place) or task ids.
+
+        Returns `BulkResult` with `True` for every acked task.
+        """
+        return self._bulk(self.deque.ack_many, tasks, chunk_size, 3)
+
+    def release_many(self, tasks, delay=None, chunk_size=1000):
+        """
+        Put many tasks back into the deque, one request per chunk.
+
+        Tasks may be `Task` objects (updated in place) or task ids.
+
+        Returns `BulkResult` with `True` for every released task.
+        """
+        state = 1 if delay is None else 0
+
+        return self._bulk(self.deque.release_many, tasks, chunk_size, state,
+                          delay)
+
+    def delete_many(self, tasks, chunk_size=1000):
+        """
+        Delete many tasks (in any state) permanently, one request per chunk.
+
+        Tasks may be `Task` objects (updated in place) or task ids.
+
+        Returns `BulkResult` with `True` for every deleted task.
+        """
+        return self._bulk(self.deque.delete_many, tasks, chunk_size, 3)
+
     def drop(self):
         """
         Drop entire query (if there are no in-progress tasks or workers).
@@ -267,9 +846,24 @@ class Deque(object):
         # Take task and mark it as complete
         >>> tube.take().ack()
             True
+
+    By default all threads share one connection. Set `pool_size` (or call
+    `configure_pool`) to use pool of connections instead:
+
+        >>> deque = Deque('127.0.0.1', 33013, pool_size=10)
+        >>> deque.pool.stats()
+
+    Blocking takes (`timeout` is `None` or positive) are sent via separate
+    connections, up to `take_lanes` at once (see `configure_take_lane`),
+    so they do not delay other commands.
+
+    Deque may be created (and used) before fork: connections and pool
+    inherited by child process are dropped, so child opens its own ones.
+    Call `prepare_for_fork` before fork to close parent connections too.
     """
     DatabaseError = tarantool.DatabaseError
     NetworkError = tarantool.NetworkError
+    PoolTimeoutException = PoolTimeoutException
 
     class BadConfigException(Exception):
         """
@@ -289,7 +883,14 @@ class Deque(object):
         """
         pass
 
-    def __init__(self, host='localhost', port=33013, user=None, password=None):
+    class TubeNotFoundException(Exception):
+        """
+        Tube is not found on server.
+        """
+        pass
+
+    def __init__(self, host='localhost', port=33013, user=None, password=None,
+                 pool_size=None, take_lanes=4):
         if not host or not port:
             raise Deque.BadConfigException(
                 "Host and port params must be not empty"
@@ -306,6 +907,23 @@ class Deque(object):
         self._lockinst = threading.Lock()
         self._conclass = tarantool.Connection
         self._tnt = None
+        self._pool = None
+        self._pool_options = None
+        self._take_lane = None
+        self._take_lane_options = None
+        self._owners = {}
+        self._call_lock = threading.RLock()
+        self._releaser = None
+        self._metrics = None
+        self._strategies = {}
+        self._no_bulk = set()
+        self._pid = os.getpid()
+        _deques.add(self)
+
+        if pool_size is not None:
+            self.configure_pool(max_size=pool_size)
+        if take_lanes:
+            self.configure_take_lane(max_size=take_lanes)
 
     @property
     def tarantool_connection(self):
@@ -334,6 +952,11 @@ class Deque(object):
                             " and call methods or be None")
         self._tnt = None
 
+        if self._pool is not None:
+            self.configure_pool(**self._pool_options)
+        if self._take_lane is not None:
+            self.configure_take_lane(**self._take_lane_options)
+
     @property
     def tarantool_lock(self):
         """
@@ -361,6 +984,17 @@ class Deque(object):
             raise TypeError("Lock class must have `__enter__`"
                             " and `__exit__` methods or be None")
 
+    def create_connection(self):
+        """
+        Create new tarantool connection.
+        """
+        return self.tarantool_connection(
+            self.host,
+            self.port,
+            user=self.user,
+            password=self.password
+        )
+
     @property
     def tnt(self):
         """
@@ -369,30 +1003,624 @@ class Deque(object):
         if self._tnt is None:
             with self.tarantool_lock:
                 if self._tnt is None:
-                    self._tnt = self.tarantool_connection(
-                        self.host,
-                        self.port,
-                        user=self.user,
-                        password=self.password
-                    )
+                    self._tnt = self.create_connection()
         return self._tnt
 
-    def take(self, tube, timeout=None):
+    def connect(self, warm=True):
+        """
+        Open connection (or `min_size` pool connections, at least one)
+        and take lane connection (if lane is enabled and has none yet)
+        now, so the first command does not wait for connect
+        and authentication.
+
+        If `warm` is `True`, command names of created tubes are resolved
+        and tubes are checked to exist on server (one pipelined `peek`
+        per tube, all in one round trip).
+
+        May be used as readiness check: raises `NetworkError` if server
+        is not reachable, `DatabaseError` if access is denied
+        and `Deque.TubeNotFoundException` if tubes are missing.
+
+        Returns dict: seconds taken by `connect`, `warm` and in `total`,
+        number of `connections` checked out, number of opened
+        `lane_connections` and names of checked `tubes`.
+        """
+        started = time.time()
+        if self._pool is None:
+            connections = [self.tnt]
+        else:
+            connections = []
+            try:
+                for _ in range(max(self._pool.min_size, 1)):
+                    connections.append(self._pool.acquire())
+            finally:
+                for connection in connections:
+                    self._pool.release(connection)
+
+        lane = self._take_lane
+        if lane is not None and not lane.pool.size:
+            lane.pool.release(lane.pool.acquire())
+        connected = time.time()
+
+        tubes = sorted(self.tubes) if warm else []
+        if tubes:
+            self._check_tubes([self.tubes[name] for name in tubes])
+        finished = time.time()
+
+        return {
+            'connect': connected - started,
+            'warm': finished - connected,
+            'total': finished - started,
+            'connections': len(connections),
+            'lane_connections': 0 if lane is None else lane.pool.size,
+            'tubes': tubes,
+        }
+
+    def _check_tubes(self, tubes):
+        """
+        Resolve command names of tubes and check tubes exist on server.
+
+        Raises `Deque.TubeNotFoundException` if some tubes are missing.
+        """
+        from .pipeline import call_pipelined
+
+        calls = []
+        for tube in tubes:
+            for cmd_name in tube.commands:
+                tube.cmd(cmd_name)
+            # task 0 is not expected to exist: tube answers with error
+            # from deque script, missing tube - with unknown procedure
+            calls.append((tube.cmd('peek'), (0,)))
+
+        if self._pool is None:
+            tnt = self.tnt
+            with self._call_lock:
+                results = call_pipelined(tnt, calls)
+        else:
+            with self._pool.connection() as connection:
+                results = call_pipelined(connection, calls)
+
+        missing = []
+        for tube, result in zip(tubes, results):
+            if not isinstance(result, tarantool.DatabaseError):
+                continue
+            if result.args[0] == iproto.ER_NO_SUCH_PROC:
+                missing.append(tube.name)
+            elif result.args[0] != iproto.ER_PROC_LUA:
+                raise result
+
+        if missing:
+            raise Deque.TubeNotFoundException(
+                "Tubes not found: {0}".format(', '.join(missing))
+            )
+
+    @property
+    def pool(self):
+        """
+        Connection pool or `None` if pool is not configured.
+        """
+        return self._pool
+
+    def _after_fork(self):
+        """
+        Reset state inherited from parent process: connections (sockets
+        are shared with parent, so they are not closed), locks which may
+        be held by parent threads, background threads state.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+
+        self._tnt = None
+        self._owners = {}
+        self._call_lock = threading.RLock()
+        if isinstance(self._lockinst, _LOCK_TYPE):
+            self._lockinst = threading.Lock()
+        if self._pool is not None:
+            self._pool = ConnectionPool(self.create_connection,
+                                        **self._pool_options)
+        if self._take_lane is not None:
+            self._take_lane = TakeLane(self.create_connection,
+                                       **self._take_lane_options)
+        if self._releaser is not None:
+            self._releaser = Releaser(self._releaser.interval,
+                                      self._releaser.batch_size).start()
+        if self._metrics is not None:
+            self._metrics = Metrics(self._metrics.buckets)
+
+    def prepare_for_fork(self):
+        """
+        Close connections (and pool connections) before fork, so no socket
+        is shared with child processes. Connections are opened again
+        on demand. Tasks taken via closed connections are released
+        by server, abandoned tasks queued for release are released now.
+        """
+        if self._releaser is not None:
+            self._releaser.flush()
+
+        with self.tarantool_lock:
+            with self._call_lock:
+                tnt, self._tnt = self._tnt, None
+                if tnt is not None and hasattr(tnt, 'close'):
+                    tnt.close()
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = ConnectionPool(self.create_connection,
+                                            **self._pool_options)
+            if self._take_lane is not None:
+                self._take_lane.close()
+                self._take_lane = TakeLane(self.create_connection,
+                                           **self._take_lane_options)
+            self._owners = {}
+
+    def configure_pool(self, max_size=10, min_size=0, timeout=None,
+                       idle_timeout=None, health_check=False,
+                       health_check_interval=10):
+        """
+        Use pool of tarantool connections instead of single connection.
+
+        `timeout` is checkout timeout (`Deque.PoolTimeoutException` is raised
+        after it). Idle connections above `min_size` are closed after
+        `idle_timeout` seconds. If `health_check` is `True`, connections
+        idle for more than `health_check_interval` seconds are pinged
+        before use; it may be custom callable as well.
+
+        Commands on a taken task are sent via the connection which took
+        this task (deque accepts them only from this session).
+        """
+        if health_check is True:
+            health_check = ping_check
+
+        with self.tarantool_lock:
+            if self._pool is not None:
+                self._pool.close()
+            self._owners = {}
+            self._pool_options = dict(
+                max_size=max_size,
+                min_size=min_size,
+                timeout=timeout,
+                idle_timeout=idle_timeout,
+                health_check=health_check or None,
+                health_check_interval=health_check_interval,
+            )
+            self._pool = ConnectionPool(self.create_connection,
+                                        **self._pool_options)
+
+    @property
+    def take_lane(self):
+        """
+        Connections of blocking takes or `None` if take lane is disabled.
+        """
+        return self._take_lane
+
+    def configure_take_lane(self, max_size=4, timeout=None):
+        """
+        Send blocking takes (`timeout` is `None` or positive) via separate
+        connections, so takes parked on server do not delay other
+        commands. At most `max_size` takes are parked at once, other
+        ones wait for a free lane connection up to `timeout` seconds
+        (`Deque.PoolTimeoutException` is raised after it).
+
+        Time spent by takes on server is in `deque.take_lane.stats()`.
+
+        Returns `TakeLane` object.
+        """
+        with self.tarantool_lock:
+            if self._take_lane is not None:
+                self._take_lane.close()
+            self._take_lane_options = dict(max_size=max_size,
+                                           timeout=timeout)
+            self._take_lane = TakeLane(self.create_connection,
+                                       **self._take_lane_options)
+            return self._take_lane
+
+    def disable_take_lane(self):
+        """
+        Send blocking takes via the same connections as other commands.
+        Tasks taken via lane connections are released by server.
+        """
+        with self.tarantool_lock:
+            if self._take_lane is not None:
+                self._take_lane.close()
+            self._take_lane = None
+            self._take_lane_options = None
+
+    @property
+    def releaser(self):
+        """
+        Background releaser or `None` if it is not configured.
+        """
+        return self._releaser
+
+    def configure_releaser(self, interval=0.1, batch_size=1000):
+        """
+        Release abandoned taken tasks in background thread.
+
+        By default garbage collected taken task is released synchronously
+        in `Task.__del__`. With releaser it is queued and released with
+        other abandoned tasks by `release_many` every `interval` seconds.
+        See `deque.releaser.stats()` for number of released tasks.
+
+        Returns releaser.
+        """
+        with self.tarantool_lock:
+            if self._releaser is not None:
+                self._releaser.close()
+            self._releaser = Releaser(interval, batch_size).start()
+            return self._releaser
+
+    def _pool_of(self, connection):
+        """
+        Returns pool (or take lane pool) which opened connection, `None`
+        if connection is closed.
+        """
+        for pool in (self._pool, self._take_lane and self._take_lane.pool):
+            if pool is not None and pool.owns(connection):
+                return pool
+        return None
+
+    def _owner(self, tube, task_id):
+        """
+        Returns pooled (or lane) connection which took the task or `None`.
+        """
+        connection = self._owners.get((tube.name, task_id))
+        if connection is not None and self._pool_of(connection) is None:
+            # connection is closed, so task is released by server
+            self._owners.pop((tube.name, task_id), None)
+            connection = None
+        return connection
+
+    def _track(self, tube, connection, the_tuple):
+        """
+        Remember which pooled (or lane) connection holds taken tasks.
+        """
+        pool = None
+        for row in the_tuple:
+            key = (tube.name, row[0])
+            owner = self._owners.get(key)
+            if row[1] == 2:
+                if owner is not connection:
+                    if owner is not None:
+                        owner_pool = self._pool_of(owner)
+                        if owner_pool is not None:
+                            owner_pool.unpin(owner)
+                    if pool is None:
+                        pool = self._pool_of(connection)
+                        if pool is None:
+                            # connection is closed, task is released
+                            return
+                    self._owners[key] = connection
+                    pool.pin(connection)
+            elif owner is connection:
+                # rows returned via other connections may be stale (e.g. `put`
+                # response processed after the task is taken by another thread)
+                del self._owners[key]
+                owner_pool = self._pool_of(connection)
+                if owner_pool is not None:
+                    owner_pool.unpin(connection)
+
+    @property
+    def metrics(self):
+        """
+        Call metrics or `None` if metrics are disabled.
+        """
+        return self._metrics
+
+    def enable_metrics(self, buckets=LATENCY_BUCKETS):
+        """
+        Collect metrics of every deque call: counters, errors by type,
+        estimated bytes sent and received and latency histograms (with
+        `buckets` upper bounds in seconds), per tube and command:
+
+            >>> deque.enable_metrics()
+            >>> deque.metrics.snapshot()['tube_name']['take']['latency']
+
+        Returns `Metrics` object.
+        """
+        if self._metrics is None:
+            self._metrics = Metrics(buckets)
+        return self._metrics
+
+    def disable_metrics(self):
+        """
+        Stop collecting call metrics.
+        """
+        self._metrics = None
+
+    def call(self, tube, cmd, args, task_ids=(), blocking=False):
+        """
+        Call tarantool deque command.
+
+        If pool (or take lane) is used - command is sent via connection
+        which took tasks `task_ids` (if any). Otherwise commands from all
+        threads are serialized on single connection. `blocking` commands
+        are sent via take lane, if it is enabled.
+
+        Returns tarantool tuple object.
+        """
+        metrics = self._metrics
+        if metrics is None:
+            return self._call(tube, cmd, args, task_ids, blocking)
+
+        command = cmd.rpartition(':')[2]
+        started = time.time()
+        try:
+            the_tuple = self._call(tube, cmd, args, task_ids, blocking)
+        except Exception as e:
+            metrics.record(tube.name, command, time.time() - started, args,
+                           error=e)
+            raise
+        metrics.record(tube.name, command, time.time() - started, args,
+                       the_tuple)
+        return the_tuple
+
+    def _call(self, tube, cmd, args, task_ids, blocking=False):
+        """
+        Call tarantool deque command via single connection, pool or take
+        lane.
+        """
+        owner = None
+        if self._owners:
+            for task_id in task_ids:
+                owner = self._owner(tube, task_id)
+                if owner is not None:
+                    break
+
+        def track(connection, the_tuple):
+            self._track(tube, connection, the_tuple)
+
+        return self._send(cmd, args, owner, blocking, track)
+
+    def _send(self, cmd, args, owner=None, blocking=False, track=None):
+        """
+        Send command via take lane, single connection or pool (`owner`
+        connection, if given).
+
+        Pooled (or lane) connection is passed to `track(connection,
+        the_tuple)` before it is returned to pool, so connection is pinned
+        before other threads may check it out.
+
+        Returns tarantool tuple object.
+        """
+        lane = self._take_lane
+        if lane is not None and (
+            blocking or owner is not None and lane.owns(owner)
+        ):
+            return lane.call(cmd, args, owner, blocking, track)
+
+        if self._pool is None:
+            tnt = self.tnt
+            with self._call_lock:
+                return tnt.call(cmd, args)
+
+        with self._pool.connection(owner) as connection:
+            the_tuple = connection.call(cmd, args)
+            if track is not None:
+                track(connection, the_tuple)
+            return the_tuple
+
+    def _bulk_call(self, tube, cmd_name, fallback, call):
+        """
+        Call bulk deque command by `call(cmd)`. Deque script without bulk
+        commands answers with unknown procedure error: `fallback()` is
+        called instead (and for later calls of this command as well).
+        """
+        cmd = tube.cmd(cmd_name)
+        if cmd not in self._no_bulk:
+            try:
+                return call(cmd)
+            except tarantool.NetworkError:
+                raise
+            except tarantool.DatabaseError as e:
+                if e.args[0] != iproto.ER_NO_SUCH_PROC:
+                    raise
+
+        rows = fallback()
+        self._no_bulk.add(cmd)
+        return rows
+
+    def _call_each(self, tube, cmd_name, calls):
+        """
+        Send single command for every `(args, task_ids)` pair
+        in a pipeline (fallback of bulk commands).
+
+        Returns list of tarantool tuple objects or `DatabaseError` objects
+        of failed calls. Raises other errors (e.g. `NetworkError`).
+        """
+        pipe = self.pipeline()
+        cmd = tube.cmd(cmd_name)
+        results = [pipe.call(tube, cmd, args, task_ids)
+                   for args, task_ids in calls]
+        pipe.execute(raise_on_error=False)
+
+        values = []
+        for result in results:
+            error = result.error
+            if error is None:
+                values.append(result.value)
+            elif isinstance(error, tarantool.DatabaseError) and \
+                    not isinstance(error, tarantool.NetworkError) and \
+                    error.args[0] != iproto.ER_NO_SUCH_PROC:
+                values.append(error)
+            else:
+                raise error
+        return values
+
+    def _call_tasks(self, tube, cmd_name, task_ids, args=()):
+        """
+        Call bulk tarantool deque command on list of tasks.
+
+        Tasks taken via different pooled connections are sent in separate
+        requests, so rows list is returned in this case. Without bulk
+        command in deque script tasks are sent one by one.
+
+        Returns tarantool tuple object or list of rows.
+        """
+        task_ids = list(task_ids)
+
+        def call(cmd):
+            groups = collections.OrderedDict()
+            for task_id in task_ids:
+                owner = self._owner(tube, task_id) if self._owners else None
+                groups.setdefault(owner, []).append(task_id)
+
+            if len(groups) <= 1:
+                return self.call(tube, cmd, (task_ids,) + args, task_ids)
+
+            rows = []
+            for group in groups.values():
+                rows.extend(self.call(tube, cmd, (group,) + args, group))
+            return rows
+
+        def fallback():
+            # failed commands are skipped, like in bulk command result
+            results = self._call_each(tube, cmd_name[:-len('_many')], [
+                ((task_id,) + args, (task_id,)) for task_id in task_ids
+            ])
+            return [row for the_tuple in results
+                    if not isinstance(the_tuple, Exception)
+                    for row in the_tuple]
+
+        return self._bulk_call(tube, cmd_name, fallback, call)
+
+    def put_many(self, tube, tasks):
+        """
+        Enqueue many tasks (list of `put` arguments) in one request.
+
+        Without `put_many` in deque script tasks are put one by one
+        in a pipeline: returned list has error object instead of row
+        for every failed task.
+
+        Returns tarantool tuple object with one row per task.
+        """
+        def call(cmd):
+            return self.call(tube, cmd, (tasks,))
+
+        def fallback():
+            rows = []
+            for the_tuple in self._call_each(tube, 'put', [
+                (args, ()) for args in tasks
+            ]):
+                if not isinstance(the_tuple, Exception) and \
+                        not the_tuple.rowcount:
+                    the_tuple = Deque.ZeroTupleException(
+                        "Error creating task"
+                    )
+                rows.append(the_tuple if isinstance(the_tuple, Exception)
+                            else the_tuple[0])
+            return rows
+
+        return self._bulk_call(tube, 'put_many', fallback, call)
+
+    def take(self, tube, timeout=None, channel=None, msg_type=None):
         """
         Get a task from deque for execution.
 
         Waits `timeout` seconds until a READY task appears in the deque.
-        If `timeout` is `None` - waits forever.
+        If `timeout` is `None` - waits forever. If `channel` or `msg_type`
+        is set, only matching tasks are taken (by deque index).
 
         Returns tarantool tuple object.
         """
-        cmd = tube.cmd('take')
-        args = ()
+        cmd = tube.cmd(tube.take_cmd_name('take', channel, msg_type))
+        args = tube.take_args(timeout, channel, msg_type)
+
+        return self.call(tube, cmd, args, blocking=timeout != 0)
 
+    def take_many(self, tube, count, timeout=None, channel=None,
+                  msg_type=None):
+        """
+        Get up to `count` tasks from deque for execution.
+
+        Waits `timeout` seconds until at least one READY task appears
+        in the deque. If `timeout` is `None` - waits forever. Tasks may be
+        filtered by `channel` and `msg_type`, see `take`.
+
+        Returns tarantool tuple object with one row per task.
+        """
+        args = (count,) + tube.take_args(timeout, channel, msg_type)
+
+        def call(cmd):
+            return self.call(tube, cmd, args, blocking=timeout != 0)
+
+        def fallback():
+            # wait for the first task, then take the rest without waiting
+            rows = list(self.take(tube, timeout, channel, msg_type))
+            if rows and count > 1:
+                take_args = tube.take_args(0, channel, msg_type)
+                for the_tuple in self._call_each(
+                    tube, tube.take_cmd_name('take', channel, msg_type),
+                    [(take_args, ())] * (count - 1)
+                ):
+                    if not isinstance(the_tuple, Exception):
+                        rows.extend(the_tuple)
+            return rows
+
+        return self._bulk_call(
+            tube, tube.take_cmd_name('take_many', channel, msg_type),
+            fallback, call
+        )
+
+    def take_first(self, tubes, timeout=None):
+        """
+        Get a task from the first of `tubes` which has a READY one,
+        in one request (`deque.take_any` procedure).
+
+        Waits `timeout` seconds until a READY task appears in any tube.
+        If `timeout` is `None` - waits forever.
+
+        Returns either a `Task` object or `None`.
+        """
+        by_name = dict((tube.name, tube) for tube in tubes)
+        args = ([tube.name for tube in tubes],)
         if timeout is not None:
             args += (timeout,)
 
-        return self.tnt.call(cmd, args)
+        def track(connection, the_tuple):
+            if len(the_tuple):
+                name, row = the_tuple[0]
+                self._track(by_name[name], connection, [row])
+
+        the_tuple = self._send('deque.take_any', args, blocking=timeout != 0,
+                               track=track)
+        if not len(the_tuple):
+            return None
+
+        name, row = the_tuple[0]
+        return Task.create_from_row(by_name[name], row)
+
+    def take_any(self, tubes, timeout=None, strategy='round_robin',
+                 weights=None, poll_interval=0.1):
+        """
+        Get a task from any of `tubes` for execution.
+
+        Tubes are tried in order of `strategy`: 'round_robin', 'weighted'
+        (by `weights` dict: `{tube_name: weight}`), 'priority' (tubes
+        order) or `selector.Strategy` object. Strategy state is kept
+        between calls with the same tubes.
+
+        Waits `timeout` seconds until a READY task appears in any tube.
+        If `timeout` is `None` - waits forever. Deque script without
+        `deque.take_any` procedure is polled instead: tubes other than
+        the first one in strategy order are checked every `poll_interval`
+        seconds while waiting.
+
+        Returns either a `Task` object or `None`.
+        """
+        if not isinstance(strategy, selector.Strategy):
+            if strategy not in selector.STRATEGIES:
+                raise ValueError("Strategy must be one of: {0}".format(
+                    ', '.join(sorted(selector.STRATEGIES))
+                ))
+            key = (strategy, tuple(tube.name for tube in tubes),
+                   tuple(sorted((weights or {}).items())))
+            instance = self._strategies.get(key)
+            if instance is None:
+                instance = selector.STRATEGIES[strategy](tubes, weights)
+                self._strategies[key] = instance
+            strategy = instance
+
+        return selector.take_any(self, strategy, timeout, poll_interval)
 
     def ack(self, tube, task_id):
         """
@@ -407,7 +1635,7 @@ class Deque(object):
         cmd = tube.cmd('ack')
         args = (task_id,)
 
-        return self.tnt.call(cmd, args)
+        return self.call(tube, cmd, args, (task_id,))
 
     def release(self, tube, task_id, delay=None):
         """
@@ -424,7 +1652,36 @@ class Deque(object):
         if delay is not None:
             args += (delay,)
 
-        return self.tnt.call(cmd, args)
+        return self.call(tube, cmd, args, (task_id,))
+
+    def ack_many(self, tube, task_ids):
+        """
+        Report successful execution of many tasks.
+
+        Returns rows of acked tasks only (see `_call_tasks`).
+        """
+        return self._call_tasks(tube, 'ack_many', task_ids)
+
+    def release_many(self, tube, task_ids, delay=None):
+        """
+        Put many tasks back into the deque.
+
+        Returns rows of released tasks only (see `_call_tasks`).
+        """
+        args = ()
+
+        if delay is not None:
+            args += (delay,)
+
+        return self._call_tasks(tube, 'release_many', task_ids, args)
+
+    def delete_many(self, tube, task_ids):
+        """
+        Delete many tasks (in any state) permanently.
+
+        Returns rows of deleted tasks only (see `_call_tasks`).
+        """
+        return self._call_tasks(tube, 'delete_many', task_ids)
 
     def peek(self, tube, task_id):
         """
@@ -435,7 +1692,7 @@ class Deque(object):
         cmd = tube.cmd('peek')
         args = (task_id,)
 
-        return self.tnt.call(cmd, args)
+        return self.call(tube, cmd, args, (task_id,))
 
     def delete(self, tube, task_id):
         """
@@ -446,7 +1703,7 @@ class Deque(object):
         cmd = tube.cmd('delete')
         args = (task_id,)
 
-        return self.tnt.call(cmd, args)
+        return self.call(tube, cmd, args, (task_id,))
 
     def drop(self, tube):
         """
@@ -457,14 +1714,32 @@ class Deque(object):
         cmd = tube.cmd('drop')
         args = ()
 
-        the_tuple = self.tnt.call(cmd, args)
+        the_tuple = self.call(tube, cmd, args)
 
         return bool(the_tuple.return_code == 0)
 
-    def tube(self, name):
+    def pipeline(self):
+        """
+        Create pipeline: commands are queued and sent at once, so several
+        commands take about one round trip:
+
+            >>> with deque.pipeline() as pipe:
+            ...     result = pipe.put(tube, data, channel=1, msg_type=1)
+            ...     pipe.ack(task)
+            >>> result.result()
+
+        Returns `Pipeline` object.
+        """
+        from .pipeline import Pipeline
+        return Pipeline(self)
+
+    def tube(self, name, codec=None):
         """
         Create tube object, if not created before.
 
+        If `codec` is given (see `tarantool_deque.codec.Codec`), payloads
+        of new tasks are encoded with it.
+
         Returns `Tube` object.
         """
         tube = self.tubes.get(name)
@@ -472,5 +1747,7 @@ class Deque(object):
         if tube is None:
             tube = Tube(self, name)
             self.tubes[name] = tube
+        if codec is not None:
+            tube.codec = codec
 
         return tube
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent tube consumer.
+
+Usage:
+
+    >>> def handler(task):
+    ...     send_notification(task.data)
+    >>> worker = tube.consume(handler, concurrency=8, release_delay=10)
+    >>> ...
+    >>> worker.stop()  # finish in-flight tasks, release buffered ones
+    >>> worker.stats()
+"""
+import collections
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+# picklable task snapshot passed to handlers running in process pool
+TaskData = collections.namedtuple('TaskData', (
+    'task_id', 'msg_type', 'obj_type', 'obj_id', 'channel',
+    'to_send_at', 'valid_until', 'created_at', 'data',
+))
+
+
+def task_data(task):
+    """
+    Returns `TaskData` snapshot of task.
+    """
+    return TaskData(task.task_id, task.msg_type, task.obj_type, task.obj_id,
+                    task.channel, task.to_send_at, task.valid_until,
+                    task.created_at, task.data)
+
+
+class Worker(object):
+    """
+    Runs `handler` over tasks from tube in `concurrency` threads.
+
+    Tasks are taken by one prefetching iterator (see `Tube.iter_tasks`)
+    and passed to handler threads. Task is acked if handler returns,
+    and released with `release_delay` if handler raises exception
+    (unless handler acked or released the task itself). Without
+    `release_delay` tube retry policy is applied (see `Task.retry`).
+    If `ack_and_take` is set, the next task is taken into iterator buffer
+    in the same round trip as ack (see `TaskIterator.ack`). If `channel`
+    or `msg_type` is set, only matching tasks are taken.
+
+    If `executor` is 'process', handlers are called in a pool
+    of `concurrency` processes with `TaskData` snapshot instead of `Task`
+    object, so `handler` must be picklable (e.g. module-level function).
+    """
+    executors = ('thread', 'process')
+
+    def __init__(self, tube, handler, concurrency=1, executor='thread',
+                 release_delay=None, prefetch=None, poll_interval=1.0,
+                 ack_and_take=False, channel=None, msg_type=None):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be positive")
+        if executor not in self.executors:
+            raise ValueError("Executor must be one of: {0}".format(
+                ', '.join(self.executors)
+            ))
+
+        self.tube = tube
+        self.handler = handler
+        self.concurrency = concurrency
+        self.executor = executor
+        self.release_delay = release_delay
+        self.prefetch = prefetch or concurrency
+        self.poll_interval = poll_interval
+        self.ack_and_take = ack_and_take
+        self.channel = channel
+        self.msg_type = msg_type
+
+        self._lock = threading.Lock()
+        self._tasks = None
+        self._threads = []
+        self._pool = None
+        self._started_at = None
+        self._stopped_at = None
+        self._counters = dict.fromkeys((
+            'processed', 'succeeded', 'failed', 'acked', 'released',
+            'deleted', 'moved', 'errors', 'in_flight',
+        ), 0)
+        self._latency = dict(total=0.0, min=None, max=None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def running(self):
+        """
+        Returns `True` if worker is started and not stopped.
+        """
+        return self._started_at is not None and self._stopped_at is None
+
+    def start(self):
+        """
+        Start handler threads.
+
+        Returns worker itself.
+        """
+        if self._started_at is not None:
+            raise RuntimeError("Worker is already started")
+
+        if self.executor == 'process':
+            # do not fork process with opened tarantool connections
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(self.concurrency,
+                                             mp_context=context)
+
+        self._tasks = self.tube.iter_tasks(prefetch=self.prefetch,
+                                           poll_interval=self.poll_interval,
+                                           channel=self.channel,
+                                           msg_type=self.msg_type)
+        self._started_at = time.time()
+
+        for _ in range(self.concurrency):
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop taking new tasks, release buffered ones and wait up to
+        `timeout` seconds for in-flight tasks to be handled.
+
+        Returns `True` if all in-flight tasks are handled.
+        """
+        if self._tasks is not None:
+            self._tasks.close()
+
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            left = None if deadline is None else max(deadline - time.time(),
+                                                     0)
+            thread.join(left)
+
+        drained = not any(thread.is_alive() for thread in self._threads)
+        if drained and self._pool is not None:
+            self._pool.shutdown()
+        if self._stopped_at is None:
+            self._stopped_at = time.time()
+        return drained
+
+    def wait(self, timeout=None):
+        """
+        Wait until handler threads are finished (e.g. fetcher failed).
+        """
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        """
+        Returns worker statistics dict: task counters, `throughput`
+        (handled tasks per second) and handler latency in seconds.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            processed = stats['processed']
+            latency = self._latency
+            stats.update(
+                latency_avg=latency['total'] / processed if processed else 0,
+                latency_min=latency['min'] or 0,
+                latency_max=latency['max'] or 0,
+            )
+
+        elapsed = 0
+        if self._started_at is not None:
+            elapsed = (self._stopped_at or time.time()) - self._started_at
+        stats['elapsed'] = elapsed
+        stats['throughput'] = stats['processed'] / elapsed if elapsed else 0
+        if self._tasks is not None:
+            stats['prefetch'] = self._tasks.stats()
+        return stats
+
+    def _count(self, **counters):
+        """
+        Increment counters.
+        """
+        with self._lock:
+            for name, value in counters.items():
+                self._counters[name] += value
+
+    def _run(self):
+        """
+        Handler thread loop.
+        """
+        while True:
+            try:
+                task = next(self._tasks)
+            except StopIteration:
+                return
+            except Exception:
+                self._count(errors=1)
+                return
+
+            self._count(in_flight=1)
+            try:
+                self._handle(task)
+            finally:
+                self._count(in_flight=-1)
+
+    def _call_handler(self, task):
+        """
+        Call handler in current thread or in process pool.
+        """
+        if self._pool is None:
+            self.handler(task)
+        else:
+            self._pool.submit(self.handler, task_data(task)).result()
+
+    def _handle(self, task):
+        """
+        Handle one task, ack or release it.
+        """
+        started = time.time()
+        try:
+            self._call_handler(task)
+        except Exception:
+            success = False
+        else:
+            success = True
+        elapsed = time.time() - started
+
+        with self._lock:
+            self._counters['processed'] += 1
+            self._counters['succeeded' if success else 'failed'] += 1
+            latency = self._latency
+            latency['total'] += elapsed
+            if latency['min'] is None or elapsed < latency['min']:
+                latency['min'] = elapsed
+            if latency['max'] is None or elapsed > latency['max']:
+                latency['max'] = elapsed
+
+        if task.state != 2:
+            # handler has already acked or released task
+            return
+
+        try:
+            if success:
+                if self.ack_and_take:
+                    self._tasks.ack(task)
+                else:
+                    task.ack()
+                self._count(acked=1)
+            else:
+                if self.release_delay is None and \
+                        task.tube.retry_policy(task.channel) is not None:
+                    action = task.retry()
+                else:
+                    task.release(delay=self.release_delay)
+                    action = 'released'
+                self._count(**{action: 1})
+        except task.deque.DatabaseError:
+            self._count(errors=1)
@@ -0,0 +1,73 @@
+"""
+Tests for tarantool deque.
+"""
+import socket
+import unittest
+
+from tarantool_deque import Deque
+from tarantool_deque.server import DequeServer
+
+
+# address of tarantool with deque script used by `test_tube`/`test_deque`
+TARANTOOL_ADDRESS = ('127.0.0.1', 33016)
+
+_stand_in = None
+
+
+def start_stand_in():
+    """
+    Start stand-in server on tarantool address, unless tarantool is
+    already listening there.
+    """
+    global _stand_in
+
+    try:
+        socket.create_connection(TARANTOOL_ADDRESS, timeout=1).close()
+        return
+    except socket.error:
+        pass
+
+    _stand_in = DequeServer(*TARANTOOL_ADDRESS, user='test', password='test',
+                            tubes=['test_tube'])
+    _stand_in.start()
+
+
+def stop_stand_in():
+    """
+    Stop stand-in server started by `start_stand_in`.
+    """
+    global _stand_in
+
+    if _stand_in is not None:
+        _stand_in.stop()
+        _stand_in = None
+
+
+class StandInTestCase(unittest.TestCase):
+    """
+    Base test case running against in-process stand-in deque server.
+    """
+    tube_name = 'test_tube'
+
+    @classmethod
+    def setUpClass(cls):
+        # start stand-in server on random port
+        cls.server = DequeServer(user='test', password='test',
+                                 tubes=[cls.tube_name])
+        cls.server.start()
+
+        # connect to stand-in server
+        cls.deque = Deque(cls.server.host, cls.server.port,
+                          user='test', password='test')
+
+        # connect to test tube
+        cls.tube = cls.deque.tube(cls.tube_name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        # start every test with empty tubes
+        for tube in self.server.tubes.values():
+            tube.clear()
@@ -0,0 +1,317 @@
+"""
+Tests for tarantool deque asyncio bindings.
+"""
+import asyncio
+import time
+
+from tarantool_deque.aio import AsyncDeque, AsyncTask
+from tarantool_deque.retry import FixedBackoff, RetryPolicy
+
+from . import StandInTestCase
+
+
+def run(coroutine):
+    """
+    Run coroutine in new event loop.
+    """
+    return asyncio.run(coroutine)
+
+
+class AsyncDequeTestCase(StandInTestCase):
+    """
+    Tests for `AsyncDeque`, `AsyncTube` and `AsyncTask`.
+    """
+    def async_deque(self, **kwargs):
+        """
+        Returns async deque connected to stand-in server.
+        """
+        kwargs.setdefault('user', 'test')
+        kwargs.setdefault('password', 'test')
+        return AsyncDeque(self.server.host, self.server.port, **kwargs)
+
+    def test_task_lifecycle(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+
+            # put task
+            task = await tube.put('foo', channel=1, msg_type=1)
+            self.assertIsInstance(task, AsyncTask)
+            self.assertEqual(task.state_name, 'ready')
+
+            # take, peek and release it
+            task = await tube.take(timeout=0)
+            self.assertEqual(task.data, 'foo')
+            self.assertEqual(task.state_name, 'taken')
+            self.assertTrue(await task.peek())
+            self.assertTrue(await task.release())
+            self.assertEqual(task.state_name, 'ready')
+
+            # take and ack it
+            task = await tube.take(timeout=0)
+            self.assertTrue(await task.ack())
+            self.assertEqual(task.state_name, 'done')
+
+            # no tasks left in tube
+            self.assertIsNone(await tube.take(timeout=0))
+
+            # acked task can't be acked again
+            with self.assertRaises(AsyncDeque.DatabaseError):
+                await task.ack()
+
+            await deque.close()
+
+        run(main())
+
+    def test_pipelining(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+
+            # long take does not block other requests on the connection
+            time_start = time.time()
+            take = asyncio.ensure_future(tube.take(timeout=2))
+            await asyncio.sleep(0.1)
+            await tube.put('foo', channel=1, msg_type=1)
+            task = await take
+            self.assertTrue(time.time() - time_start < 1)
+            self.assertEqual(task.data, 'foo')
+            self.assertTrue(await task.ack())
+
+            # many requests in flight at once
+            tasks = await asyncio.gather(*[
+                tube.put(i, channel=1, msg_type=1) for i in range(50)
+            ])
+            self.assertEqual(sorted(task.data for task in tasks),
+                             list(range(50)))
+            self.assertEqual(len(set(task.task_id for task in tasks)), 50)
+
+            await deque.close()
+
+        run(main())
+
+    def test_bulk(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+
+            result = await tube.put_many([(i, 1, 1) for i in range(5)],
+                                         chunk_size=2)
+            self.assertTrue(result.ok)
+            self.assertEqual([task.data for task in result], list(range(5)))
+
+            tasks = await tube.take_many(10, timeout=0)
+            self.assertEqual(len(tasks), 5)
+            self.assertEqual(list(await tube.release_many(tasks[:2])),
+                             [True, True])
+            self.assertEqual(list(await tube.ack_many(tasks)),
+                             [False, False, True, True, True])
+            self.assertEqual(list(await tube.delete_many(tasks[:2])),
+                             [True, True])
+
+            await deque.close()
+
+        run(main())
+
+    def test_sync_helpers(self):
+        tube = self.async_deque().tube(self.tube_name)
+
+        # thread based helpers of sync tube are not inherited
+        for name in ('iter_tasks', 'consume', 'producer'):
+            self.assertFalse(hasattr(tube, name), name)
+
+        self.assertEqual(tube.cmd('put'),
+                         'deque.tube.{0}:put'.format(self.tube_name))
+        self.assertEqual(tube.take_args(1, channel=2), (1, {'channel': 2}))
+
+    def test_commands_by_id(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+
+            task_id = (await tube.put('foo', channel=1, msg_type=1)).task_id
+            task = await tube.take(timeout=0)
+            self.assertEqual((await tube.peek(task_id)).state, 2)
+            self.assertTrue(await tube.release(task_id, delay=60))
+            self.assertEqual((await tube.peek(task_id)).state, 0)
+            self.assertTrue(await task.peek())
+            self.assertEqual(task.state_name, 'delayed')
+
+            await tube.put('bar', channel=1, msg_type=1)
+            task = await tube.take(timeout=0)
+            self.assertTrue(await tube.ack(task.task_id))
+
+            # bulk commands accept task rows
+            row = await tube.peek(task_id)
+            self.assertEqual(list(await tube.delete_many([row])), [True])
+
+            await deque.close()
+
+        run(main())
+
+    def test_ack_and_take(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+            await tube.put_many([('first', 1, 1), ('second', 1, 1)])
+
+            task = await tube.take(timeout=0)
+            next_task = await task.ack_and_take(timeout=0)
+            self.assertEqual(task.state_name, 'done')
+            self.assertEqual(next_task.data, 'second')
+
+            # waits for the next task
+            put = asyncio.ensure_future(tube.put('third', channel=1,
+                                                 msg_type=1))
+            last_task = await next_task.ack_and_take(timeout=2)
+            await put
+            self.assertEqual(next_task.state_name, 'done')
+            self.assertEqual(last_task.data, 'third')
+
+            # ack error: taken task is released
+            await tube.put('fourth', channel=1, msg_type=1)
+            with self.assertRaises(AsyncDeque.DatabaseError):
+                await tube.ack_and_take(task.task_id, timeout=0)
+            task = await tube.ack_and_take(last_task, timeout=0)
+            self.assertEqual(task.data, 'fourth')
+            self.assertIsNone(await task.ack_and_take(timeout=0))
+
+            await deque.close()
+
+        run(main())
+
+    def test_retry(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+            dead = deque.tube('dead_letters')
+            self.server.tube('dead_letters')
+            await tube.put('foo', channel=1, msg_type=1)
+
+            # without policy task is released
+            task = await tube.take(timeout=0)
+            self.assertEqual(await task.retry(), 'released')
+            self.assertEqual(task.state_name, 'ready')
+
+            tube.set_retry_policy(RetryPolicy(FixedBackoff(60),
+                                              max_attempts=1,
+                                              on_exhausted=dead))
+            task = await tube.take(timeout=0)
+            self.assertEqual(await task.retry(), 'released')
+            self.assertEqual(task.state_name, 'delayed')
+
+            # exhausted task is moved
+            self.assertEqual(await tube.retry(task), 'moved')
+            self.assertEqual(task.state_name, 'done')
+            moved = await dead.take(timeout=0)
+            self.assertEqual(moved.data, 'foo')
+            self.assertTrue(await moved.ack())
+
+            await deque.close()
+
+        run(main())
+
+    def test_errors(self):
+        async def main():
+            # bad password
+            deque = self.async_deque(password='bad')
+            with self.assertRaises(AsyncDeque.DatabaseError):
+                await deque.tube(self.tube_name).take(timeout=0)
+
+            # unknown tube
+            deque = self.async_deque()
+            with self.assertRaises(AsyncDeque.DatabaseError):
+                await deque.tube('unknown').take(timeout=0)
+            await deque.close()
+
+            # connection refused
+            deque = AsyncDeque('127.0.0.1', 1)
+            with self.assertRaises(AsyncDeque.NetworkError):
+                await deque.tube(self.tube_name).take(timeout=0)
+
+        run(main())
+
+    def test_close_pending(self):
+        async def main():
+            deque = self.async_deque()
+            take = asyncio.ensure_future(
+                deque.tube(self.tube_name).take(timeout=0.3)
+            )
+            await asyncio.sleep(0.1)
+
+            # pending requests fail on close
+            await deque.close()
+            with self.assertRaises(AsyncDeque.NetworkError):
+                await take
+
+            # let server finish orphaned take
+            await asyncio.sleep(0.3)
+
+        run(main())
+
+
+class AsyncFallbackTestCase(AsyncDequeTestCase):
+    """
+    Tests for async bulk operations with deque script without bulk commands.
+    """
+    def setUp(self):
+        super(AsyncFallbackTestCase, self).setUp()
+        server_tube = self.server.tube(self.tube_name)
+        server_tube.commands = tuple(
+            command for command in server_tube.commands
+            if not command.endswith('_many')
+        )
+        self.addCleanup(delattr, server_tube, 'commands')
+
+    def test_put_many(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+
+            result = await tube.put_many([
+                ('foo', 1, 1), ('bad', 1, 1, 0, 0, 'bad params'),
+                dict(data='bar', channel=2, msg_type=1),
+            ], ids_only=True)
+            self.assertIn(tube.cmd('put_many'), deque._no_bulk)
+
+            # tasks are put one by one, failed ones are reported
+            self.assertEqual(len(result), 3)
+            self.assertIsNone(result[1])
+            self.assertEqual([(error.offset, len(error.items))
+                              for error in result.errors], [(1, 1)])
+
+            tasks = await tube.take_many(3, timeout=0)
+            self.assertEqual([task.task_id for task in tasks],
+                             [result[0], result[2]])
+            self.assertEqual([task.data for task in tasks], ['foo', 'bar'])
+            self.assertEqual((await tube.ack_many(tasks)).results,
+                             [True, True])
+
+            await deque.close()
+
+        run(main())
+
+    def test_tasks(self):
+        async def main():
+            deque = self.async_deque()
+            tube = deque.tube(self.tube_name)
+
+            result = await tube.put_many([(i, 1, 1) for i in range(4)],
+                                         ids_only=True)
+            tasks = await tube.take_many(3, timeout=1)
+            self.assertEqual([task.data for task in tasks], [0, 1, 2])
+
+            self.assertEqual((await tube.release_many(tasks[:1])).results,
+                             [True])
+            self.assertEqual((await tube.ack_many(tasks)).results,
+                             [False, True, True])
+            self.assertEqual(
+                (await tube.delete_many([tasks[0], result[3]])).results,
+                [True, True]
+            )
+            self.assertEqual(await tube.take_many(3, timeout=0), [])
+            self.assertEqual(len(self.server.tube(self.tube_name)), 0)
+
+            await deque.close()
+
+        run(main())
@@ -0,0 +1,273 @@
+"""
+Tests for tarantool deque bulk operations.
+"""
+import time
+
+from tarantool_deque import Deque
+
+from . import StandInTestCase
+
+
+def delay(interval):
+    """
+    Returns current time timestamp + interval delay.
+    """
+    return time.time() + interval
+
+
+class PutManyTestCase(StandInTestCase):
+    """
+    Tests for `Tube.put_many`.
+    """
+    def test_put_many(self):
+        # put tasks given as dicts and as tuples
+        result = self.tube.put_many([
+            dict(data='foo', channel=1, msg_type=1),
+            ('bar', 2, 1),
+            dict(data='baz', channel=3, msg_type=2, obj_type=4, obj_id=5),
+        ])
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result), 3)
+
+        # tasks are created in the same order
+        self.assertEqual([task.data for task in result],
+                         ['foo', 'bar', 'baz'])
+        self.assertEqual([task.channel for task in result], [1, 2, 3])
+        self.assertEqual(result[2].obj_type, 4)
+        self.assertEqual(result[2].obj_id, 5)
+        self.assertTrue(all(task.state == 1 for task in result))
+
+        # tasks are taken in the same order
+        for task in result:
+            taken = self.tube.take(timeout=0)
+            self.assertEqual(taken.task_id, task.task_id)
+            self.assertTrue(taken.ack())
+
+    def test_put_many_chunks(self):
+        # put tasks in few chunks, ids only
+        result = self.tube.put_many(
+            (('task{0}'.format(i), 1, 1) for i in range(25)),
+            chunk_size=10,
+            ids_only=True
+        )
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result), 25)
+        self.assertEqual(len(set(result)), 25)
+        self.assertTrue(all(isinstance(task_id, int) for task_id in result))
+
+        for task_id in result:
+            task = self.tube.take(timeout=0)
+            self.assertEqual(task.task_id, task_id)
+            self.assertTrue(task.ack())
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_put_many_delayed(self):
+        # put delayed task
+        result = self.tube.put_many([
+            dict(data='foo', channel=1, msg_type=1, to_send_at=1e10),
+        ])
+        self.assertEqual(result[0].state, 0)
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_put_many_partial_failure(self):
+        # second chunk contains bad task
+        tasks = [('foo', 1, 1), ('bar', 1, 1), ('baz', 1, 1), (None, 1, 1)]
+        tasks[2] = ('baz', 1, 1, 0, 0, 'bad params')
+        result = self.tube.put_many(tasks, chunk_size=2)
+
+        # first chunk is enqueued, second one is failed entirely
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result), 4)
+        self.assertEqual([task.data for task in result[:2]], ['foo', 'bar'])
+        self.assertEqual(result[2:], [None, None])
+
+        self.assertEqual(len(result.errors), 1)
+        error = result.errors[0]
+        self.assertEqual(error.offset, 2)
+        self.assertEqual(error.items, tasks[2:])
+        self.assertIsInstance(error.error, Deque.DatabaseError)
+
+        # only first chunk tasks are in tube
+        self.assertTrue(self.tube.take(timeout=0).ack())
+        self.assertTrue(self.tube.take(timeout=0).ack())
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_put_many_empty(self):
+        result = self.tube.put_many([])
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result), 0)
+
+
+class TakeManyTestCase(StandInTestCase):
+    """
+    Tests for `Tube.take_many`.
+    """
+    def test_take_many(self):
+        # put few tasks in tube
+        put = self.tube.put_many([('task{0}'.format(i), 1, 1)
+                                  for i in range(5)])
+
+        # take part of them
+        tasks = self.tube.take_many(3, timeout=0)
+        self.assertEqual([task.task_id for task in tasks],
+                         [task.task_id for task in put[:3]])
+        self.assertTrue(all(task.state == 2 for task in tasks))
+
+        # take the rest of them
+        rest = self.tube.take_many(10, timeout=0)
+        self.assertEqual([task.task_id for task in rest],
+                         [task.task_id for task in put[3:]])
+
+        # no tasks left in tube
+        self.assertEqual(self.tube.take_many(10, timeout=0), [])
+
+        for task in tasks + rest:
+            self.assertTrue(task.ack())
+
+    def test_take_many_timeout(self):
+        # no tasks in tube within 'timeout' seconds
+        time_start = time.time()
+        self.assertEqual(self.tube.take_many(10, timeout=.3), [])
+        self.assertTrue(.3 <= time.time() - time_start < .5)
+
+    def test_take_many_wait(self):
+        # put delayed tasks, take will wait for them
+        to_send_at = delay(0.1)
+        self.tube.put('foo', channel=1, msg_type=1, to_send_at=to_send_at)
+        self.tube.put('bar', channel=1, msg_type=1, to_send_at=to_send_at)
+
+        tasks = self.tube.take_many(10, timeout=1)
+        self.assertEqual([task.data for task in tasks], ['foo', 'bar'])
+        for task in tasks:
+            self.assertTrue(task.ack())
+
+
+class AckReleaseDeleteManyTestCase(StandInTestCase):
+    """
+    Tests for `Tube.ack_many`, `Tube.release_many` and `Tube.delete_many`.
+    """
+    def _put_and_take(self, count):
+        """
+        Put `count` tasks in tube and take them back.
+        """
+        self.tube.put_many([('task{0}'.format(i), 1, 1)
+                            for i in range(count)])
+        return self.tube.take_many(count, timeout=0)
+
+    def test_ack_many(self):
+        tasks = self._put_and_take(5)
+
+        # ack tasks (given as objects) in few chunks
+        result = self.tube.ack_many(tasks, chunk_size=2)
+        self.assertTrue(result.ok)
+        self.assertEqual(list(result), [True] * 5)
+
+        # task objects are updated in place
+        self.assertTrue(all(task.state == 3 for task in tasks))
+
+        # tasks can't be acked twice (per-id result)
+        result = self.tube.ack_many([task.task_id for task in tasks])
+        self.assertTrue(result.ok)
+        self.assertEqual(list(result), [False] * 5)
+
+        # no tasks left in tube
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_ack_many_partial(self):
+        tasks = self._put_and_take(3)
+
+        # release one task, it can't be acked
+        self.assertTrue(tasks[1].release())
+        result = self.tube.ack_many([task.task_id for task in tasks])
+        self.assertEqual(list(result), [True, False, True])
+
+        # take and ack released task
+        self.assertTrue(self.tube.take(timeout=0).ack())
+
+    def test_release_many(self):
+        tasks = self._put_and_take(3)
+
+        # release tasks
+        result = self.tube.release_many(tasks)
+        self.assertEqual(list(result), [True] * 3)
+        self.assertTrue(all(task.state == 1 for task in tasks))
+
+        # take them again and release with delay
+        tasks = self.tube.take_many(3, timeout=0)
+        self.assertEqual(len(tasks), 3)
+        result = self.tube.release_many(tasks, delay=10)
+        self.assertEqual(list(result), [True] * 3)
+        self.assertTrue(all(task.state == 0 for task in tasks))
+
+        # no ready tasks in tube
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_delete_many(self):
+        tasks = self._put_and_take(2)
+        ready = self.tube.put('foo', channel=1, msg_type=1)
+
+        # delete tasks in any state, even mixed with ids
+        result = self.tube.delete_many(tasks + [ready.task_id])
+        self.assertEqual(list(result), [True] * 3)
+        self.assertTrue(all(task.state == 3 for task in tasks))
+
+        # deleted tasks can't be acked
+        self.assertEqual(list(self.tube.ack_many(tasks)), [False, False])
+
+        # no tasks left in tube
+        self.assertIsNone(self.tube.take(timeout=0))
+
+
+class FallbackTestCase(StandInTestCase):
+    """
+    Tests for bulk operations with deque script without bulk commands.
+    """
+    def setUp(self):
+        super(FallbackTestCase, self).setUp()
+        server_tube = self.server.tube(self.tube_name)
+        server_tube.commands = tuple(
+            command for command in server_tube.commands
+            if not command.endswith('_many')
+        )
+        self.addCleanup(delattr, server_tube, 'commands')
+        self.deque._no_bulk.clear()
+
+    def test_put_many(self):
+        result = self.tube.put_many([
+            ('foo', 1, 1), ('bad', 1, 1, 0, 0, 'bad params'),
+            dict(data='bar', channel=2, msg_type=1),
+        ], ids_only=True)
+        self.assertIn(self.tube.cmd('put_many'), self.deque._no_bulk)
+
+        # tasks are put one by one, failed ones are reported
+        self.assertEqual(len(result), 3)
+        self.assertIsNone(result[1])
+        self.assertEqual([(error.offset, len(error.items))
+                          for error in result.errors], [(1, 1)])
+
+        tasks = self.tube.take_many(3, timeout=0)
+        self.assertEqual([task.task_id for task in tasks],
+                         [result[0], result[2]])
+        self.assertEqual([task.data for task in tasks], ['foo', 'bar'])
+        self.assertEqual(self.tube.ack_many(tasks).results, [True, True])
+
+    def test_tasks(self):
+        task_ids = self.tube.put_many([(i, 1, 1) for i in range(4)],
+                                      ids_only=True).results
+        tasks = self.tube.take_many(3, timeout=1)
+        self.assertEqual([task.data for task in tasks], [0, 1, 2])
+
+        self.assertEqual(self.tube.release_many(tasks[:1]).results, [True])
+        self.assertEqual(self.tube.ack_many(tasks).results,
+                         [False, True, True])
+        result = self.tube.delete_many([tasks[0], task_ids[3]])
+        self.assertEqual(result.results, [True, True])
+        self.assertEqual(self.tube.take_many(3, timeout=0), [])
+        self.assertEqual(len(self.server.tube(self.tube_name)), 0)
+
+    def test_iterator(self):
+        self.tube.put_many([(i, 1, 1) for i in range(5)])
+        with self.tube.iter_tasks(prefetch=2, timeout=0.2,
+                                  poll_interval=0.1) as tasks:
+            data = [task.data for task in tasks if task.ack()]
+        self.assertEqual(data, list(range(5)))
@@ -0,0 +1,116 @@
+"""
+Tests for task payload codecs.
+"""
+import unittest
+
+from tarantool_deque import codec
+from tarantool_deque.codec import Codec
+
+from . import StandInTestCase
+
+
+PAYLOAD = {'text': 'lorem ipsum ' * 200, 'items': list(range(10))}
+
+
+class CodecTestCase(unittest.TestCase):
+    """
+    Tests for `Codec` and `decode`.
+    """
+    def test_roundtrip(self):
+        for serializer in ('msgpack', 'json'):
+            for compression in (None, 'zlib'):
+                payload_codec = Codec(serializer, compression)
+                encoded = payload_codec.encode(PAYLOAD)
+                self.assertTrue(codec.is_encoded(encoded))
+                self.assertEqual(codec.decode(encoded), PAYLOAD)
+
+        encoded = Codec('raw').encode(b'foo')
+        self.assertEqual(codec.decode(encoded), b'foo')
+        with self.assertRaises(TypeError):
+            Codec('raw').encode('foo')
+
+    def test_threshold(self):
+        payload_codec = Codec('json', 'zlib', threshold=100)
+
+        small = payload_codec.encode({'foo': 'bar'})
+        self.assertEqual(small[len(codec.MAGIC) + 1:len(codec.MAGIC) + 2],
+                         b'\x00')
+
+        large = payload_codec.encode(PAYLOAD)
+        self.assertTrue(len(large) < len(Codec('json', None).encode(PAYLOAD)))
+
+    def test_not_encoded(self):
+        for value in ('foo', b'foo', [1, 2], None, 1):
+            self.assertEqual(codec.decode(value), value)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            Codec('pickle')
+        with self.assertRaises(ValueError):
+            Codec('json', 'bzip3')
+        with self.assertRaises(ValueError):
+            codec.decode(codec.HEADER.pack(codec.MAGIC, 250, 0) + b'foo')
+
+    def test_custom(self):
+        codec.register_serializer('upper', 200, lambda data: data.upper(),
+                                  lambda buf: buf.lower())
+        encoded = Codec('upper', None).encode(b'foo')
+        self.assertTrue(encoded.endswith(b'FOO'))
+        self.assertEqual(codec.decode(encoded), b'foo')
+
+
+class TubeCodecTestCase(StandInTestCase):
+    """
+    Tests for tube with codec.
+    """
+    def tearDown(self):
+        self.tube.codec = None
+
+    def test_put_take(self):
+        tube = self.deque.tube(self.tube_name, codec=Codec(threshold=10))
+        self.assertIs(tube, self.tube)
+
+        task = tube.put(PAYLOAD, channel=1, msg_type=1)
+        self.assertEqual(task.data, PAYLOAD)
+
+        # payload is stored encoded and compressed
+        row = self.deque.peek(tube, task.task_id)[0]
+        self.assertTrue(codec.is_encoded(row[10]))
+        self.assertTrue(len(row[10]) < len(str(PAYLOAD)))
+
+        task = tube.take(timeout=0)
+        self.assertEqual(task.data, PAYLOAD)
+        task.ack()
+
+    def test_mixed(self):
+        self.tube.put('old', channel=1, msg_type=1)
+        self.tube.codec = Codec('json')
+        self.tube.put_many([('new', 1, 1), {'data': [1], 'channel': 1,
+                                            'msg_type': 1}])
+
+        tasks = self.tube.take_many(3, timeout=0)
+        self.assertEqual([task.data for task in tasks], ['old', 'new', [1]])
+        self.tube.ack_many(tasks)
+
+    def test_lazy_decode(self):
+        calls = []
+
+        def loads(buf):
+            calls.append(buf)
+            return buf.decode('utf-8')
+
+        codec.register_serializer('counted', 201,
+                                  lambda data: data.encode('utf-8'), loads)
+        self.tube.codec = Codec('counted', None)
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        task = self.tube.take(timeout=0)
+        self.assertEqual(calls, [])
+        self.assertEqual(task.data, 'foo')
+        self.assertEqual(task.data, 'foo')
+        self.assertEqual(len(calls), 1)
+
+        # payload is decoded again after update
+        task.ack()
+        self.assertEqual(task.data, 'foo')
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,114 @@
+"""
+Tests for eager connect and warm-up.
+"""
+import unittest
+
+import tarantool
+
+from tarantool_deque import Deque
+from tarantool_deque.server import DequeServer
+
+from . import StandInTestCase
+
+
+class ConnectTestCase(StandInTestCase):
+    """
+    Tests for `Deque.connect`.
+    """
+    def new_deque(self, **options):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test', **options)
+        self.addCleanup(self.close, deque)
+        return deque
+
+    @staticmethod
+    def close(deque):
+        if deque.take_lane is not None:
+            deque.take_lane.close()
+        if deque.pool is not None:
+            deque.pool.close()
+        elif deque._tnt is not None:
+            deque._tnt.close()
+
+    def test_connect(self):
+        deque = self.new_deque()
+        tube = deque.tube(self.tube_name)
+        self.assertIsNone(deque._tnt)
+
+        report = deque.connect()
+        self.assertIsNotNone(deque._tnt)
+        self.assertEqual(report['connections'], 1)
+        self.assertEqual(report['lane_connections'], 1)
+        self.assertEqual(deque.take_lane.pool.stats()['idle'], 1)
+        self.assertEqual(report['tubes'], [self.tube_name])
+        self.assertTrue(0 <= report['connect'] <= report['total'])
+        self.assertTrue(0 <= report['warm'] <= report['total'])
+
+        # command names are resolved
+        self.assertEqual(set(tube._cmds), set(tube.commands))
+        self.assertEqual(tube.cmd('take'),
+                         'deque.tube.{0}:take'.format(self.tube_name))
+
+        # connections are reused
+        tnt = deque._tnt
+        report = deque.connect(warm=False)
+        self.assertEqual(report['tubes'], [])
+        self.assertEqual(report['lane_connections'], 1)
+        self.assertIs(deque._tnt, tnt)
+        tube.put('foo', channel=1, msg_type=1)
+        self.assertIs(deque._tnt, tnt)
+        tube.take(timeout=1).ack()
+        self.assertEqual(deque.take_lane.pool.stats()['created'], 1)
+
+    def test_no_lane(self):
+        deque = self.new_deque(take_lanes=0)
+        self.assertEqual(deque.connect()['lane_connections'], 0)
+
+    def test_pool(self):
+        deque = self.new_deque()
+        deque.configure_pool(min_size=3, max_size=5)
+        deque.tube(self.tube_name)
+
+        report = deque.connect()
+        self.assertEqual(report['connections'], 3)
+        stats = deque.pool.stats()
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(stats['idle'], 3)
+
+        deque = self.new_deque(pool_size=5)
+        self.assertEqual(deque.connect()['connections'], 1)
+        self.assertEqual(deque.pool.stats()['created'], 1)
+
+    def test_missing_tubes(self):
+        deque = self.new_deque()
+        deque.tube(self.tube_name)
+        deque.tube('missing_a')
+        deque.tube('missing_b')
+
+        with self.assertRaises(Deque.TubeNotFoundException) as context:
+            deque.connect()
+        self.assertEqual(str(context.exception),
+                         "Tubes not found: missing_a, missing_b")
+
+        # connection is usable after failed check
+        self.server.tube('missing_a')
+        self.server.tube('missing_b')
+        self.assertEqual(len(deque.connect()['tubes']), 3)
+
+    def test_access_denied(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='wrong')
+        self.assertRaises(tarantool.DatabaseError, deque.connect)
+
+
+class UnreachableTestCase(unittest.TestCase):
+    """
+    Tests for `Deque.connect` without server.
+    """
+    def test_unreachable(self):
+        server = DequeServer()
+        server.start()
+        server.stop()
+
+        deque = Deque(server.host, server.port)
+        self.assertRaises(tarantool.NetworkError, deque.connect)
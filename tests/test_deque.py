@@ -7,6 +7,17 @@ import unittest
 import tarantool
 from tarantool_deque import Deque
 
+from . import start_stand_in, stop_stand_in
+
+
+def setUpModule():
+    # use stand-in server if tarantool is not running
+    start_stand_in()
+
+
+def tearDownModule():
+    stop_stand_in()
+
 
 class YetAnotherTarantoolConnection(tarantool.Connection):
     """
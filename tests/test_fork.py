@@ -0,0 +1,100 @@
+"""
+Tests for using deque in forked processes.
+"""
+import multiprocessing
+import os
+
+from tarantool_deque import Deque
+
+from . import StandInTestCase
+
+
+# deque shared with forked pool processes
+_deque = None
+
+
+def consume(count):
+    """
+    Take and ack up to `count` tasks in child process.
+    """
+    tube = _deque.tube(StandInTestCase.tube_name)
+    data = []
+    for task in tube.take_many(count, timeout=1):
+        data.append(task.data)
+        task.ack()
+    return os.getpid(), data
+
+
+class ForkTestCase(StandInTestCase):
+    """
+    Tests for fork safety of `Deque`.
+    """
+    def setUp(self):
+        super(ForkTestCase, self).setUp()
+        self.context = multiprocessing.get_context('fork')
+
+    def tearDown(self):
+        global _deque
+        _deque = None
+
+    def run_children(self, deque):
+        global _deque
+        _deque = deque
+        tube = deque.tube(self.tube_name)
+
+        # connection is opened before fork
+        tube.put_many([(i, 1, 1) for i in range(20)])
+        pool = self.context.Pool(2)
+        try:
+            results = pool.map(consume, [5] * 4)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        pids = set(pid for pid, _ in results)
+        self.assertNotIn(os.getpid(), pids)
+        data = sorted(item for _, items in results for item in items)
+        self.assertEqual(data, list(range(20)))
+
+        # parent connection is not corrupted by children
+        tube.put('parent', channel=1, msg_type=1)
+        task = tube.take(timeout=0)
+        self.assertEqual(task.data, 'parent')
+        self.assertTrue(task.ack())
+
+    def test_connection(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test')
+        self.run_children(deque)
+
+    def test_pool(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test', pool_size=2)
+        self.run_children(deque)
+        deque.pool.close()
+
+    def test_prepare_for_fork(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test')
+        tube = deque.tube(self.tube_name)
+        tube.put('foo', channel=1, msg_type=1)
+        tnt = deque.tnt
+
+        deque.prepare_for_fork()
+        self.assertIsNone(deque._tnt)
+        self.assertIsNot(deque.tnt, tnt)
+        task = tube.take(timeout=0)
+        self.assertEqual(task.data, 'foo')
+        task.ack()
+
+    def test_after_fork(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test')
+        deque.tnt
+        deque._after_fork()
+        self.assertIsNotNone(deque._tnt)  # same process
+
+        deque._pid = -1
+        deque._after_fork()
+        self.assertIsNone(deque._tnt)
+        self.assertEqual(deque._pid, os.getpid())
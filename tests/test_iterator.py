@@ -0,0 +1,123 @@
+"""
+Tests for prefetching tube tasks iterator.
+"""
+import threading
+import time
+
+from tarantool_deque import Deque
+
+from . import StandInTestCase
+
+
+class TaskIteratorTestCase(StandInTestCase):
+    """
+    Tests for `Tube.iter_tasks`.
+    """
+    def test_iterate(self):
+        self.tube.put_many([(i, 1, 1) for i in range(10)])
+
+        # iterate over all tasks in tube, stop when tube is empty
+        data = []
+        with self.tube.iter_tasks(prefetch=3, timeout=0.2) as tasks:
+            for task in tasks:
+                self.assertEqual(task.state, 2)
+                data.append(task.data)
+                self.assertTrue(task.ack())
+
+            stats = tasks.stats()
+
+        self.assertEqual(data, list(range(10)))
+        self.assertEqual(stats['yielded'], 10)
+        self.assertEqual(stats['fetched'], 10)
+        self.assertEqual(stats['depth'], 0)
+        self.assertTrue(stats['max_depth'] <= 3)
+        self.assertTrue(stats['wait_time'] >= 0.2)
+
+    def test_prefetch(self):
+        self.tube.put_many([(i, 1, 1) for i in range(10)])
+
+        tasks = self.tube.iter_tasks(prefetch=4, timeout=1)
+        task = next(tasks)
+        self.assertTrue(task.ack())
+
+        # buffer is filled up to `prefetch` tasks in background
+        time.sleep(0.2)
+        self.assertEqual(tasks.depth, 4)
+        rest = self.tube.take_many(10, timeout=0)
+        self.assertEqual([task.data for task in rest], [5, 6, 7, 8, 9])
+        self.tube.ack_many(rest)
+
+        # buffered tasks are released on close
+        tasks.close()
+        self.assertEqual(tasks.stats()['released'], 4)
+        self.assertEqual(tasks.depth, 0)
+        with self.assertRaises(StopIteration):
+            next(tasks)
+
+        released = self.tube.take_many(10, timeout=0)
+        self.assertEqual([task.data for task in released], [1, 2, 3, 4])
+        self.tube.ack_many(released)
+
+    def test_wait(self):
+        # task appears while consumer is waiting
+        timer = threading.Timer(
+            0.2, self.tube.put, ('foo',), dict(channel=1, msg_type=1)
+        )
+        timer.start()
+
+        with self.tube.iter_tasks(prefetch=2, poll_interval=0.1) as tasks:
+            task = next(tasks)
+            self.assertEqual(task.data, 'foo')
+            self.assertTrue(task.ack())
+            self.assertEqual(tasks.stats()['waits'], 1)
+        timer.join()
+
+    def test_pool(self):
+        pooled = Deque(self.server.host, self.server.port,
+                       user='test', password='test', pool_size=2)
+        tube = pooled.tube(self.tube_name)
+        tube.put_many([(i, 1, 1) for i in range(5)])
+
+        # tasks taken by fetcher connection are acked via the same one
+        with tube.iter_tasks(prefetch=2, timeout=0.2) as tasks:
+            self.assertTrue(all(task.ack() for task in tasks))
+            self.assertEqual(tasks.stats()['yielded'], 5)
+        self.assertEqual(pooled._owners, {})
+        pooled.pool.close()
+
+    def test_ack_and_take(self):
+        self.tube.put_many([(i, 1, 1) for i in range(5)])
+
+        data = []
+        with self.tube.iter_tasks(prefetch=1, timeout=0.2,
+                                  poll_interval=0.1) as tasks:
+            for task in tasks:
+                data.append(task.data)
+                self.assertTrue(tasks.ack(task))
+            stats = tasks.stats()
+
+        self.assertEqual(data, list(range(5)))
+        self.assertEqual(stats['fetched'], 5)
+        self.assertEqual(stats['released'], 0)
+
+    def test_filter(self):
+        self.tube.put_many([(i, i % 3, 1) for i in range(9)])
+
+        data = []
+        with self.tube.iter_tasks(prefetch=2, timeout=0.2, poll_interval=0.1,
+                                  channel=1) as tasks:
+            for task in tasks:
+                data.append(task.data)
+                self.assertTrue(tasks.ack(task))
+
+        # tasks of other channels are not taken
+        self.assertEqual(data, [1, 4, 7])
+        tasks = self.tube.take_many(10, timeout=0)
+        self.assertEqual([task.data for task in tasks], [0, 2, 3, 5, 6, 8])
+        self.tube.ack_many(tasks)
+
+    def test_error(self):
+        tube = self.deque.tube('unknown_tube')
+        with tube.iter_tasks(timeout=1) as tasks:
+            with self.assertRaises(Deque.DatabaseError):
+                next(tasks)
@@ -0,0 +1,179 @@
+"""
+Tests for take lane of blocking takes.
+"""
+import threading
+import time
+
+from tarantool_deque import Deque
+
+from . import StandInTestCase
+
+
+class TakeLaneTestCase(StandInTestCase):
+    """
+    Tests for `Deque.configure_take_lane`.
+    """
+    def setUp(self):
+        super(TakeLaneTestCase, self).setUp()
+        self.laned = Deque(self.server.host, self.server.port,
+                           user='test', password='test', take_lanes=2)
+        self.laned_tube = self.laned.tube(self.tube_name)
+
+    def tearDown(self):
+        self.laned.take_lane.close()
+
+    def take_in_thread(self, timeout=2, **options):
+        result = []
+
+        def take():
+            try:
+                result.append(self.laned_tube.take(timeout=timeout,
+                                                   **options))
+            except Exception as e:
+                result.append(e)
+
+        thread = threading.Thread(target=take)
+        thread.start()
+        return thread, result
+
+    def wait_parked(self, count):
+        deadline = time.time() + 5
+        while self.laned.take_lane.stats()['parked'] < count:
+            self.assertTrue(time.time() < deadline, "Take is not parked")
+            time.sleep(0.01)
+
+    def test_blocking_take(self):
+        thread, result = self.take_in_thread()
+        self.wait_parked(1)
+
+        # single connection is not blocked by parked take
+        time_start = time.time()
+        self.laned_tube.put('foo', channel=1, msg_type=1)
+        self.assertTrue(time.time() - time_start < 0.5)
+        thread.join()
+
+        # task taken via lane is acked via the same connection
+        task = result[0]
+        self.assertEqual(task.data, 'foo')
+        self.assertIsNotNone(self.laned._owner(self.laned_tube,
+                                               task.task_id))
+        self.assertTrue(task.ack())
+        self.assertEqual(self.laned._owners, {})
+
+        stats = self.laned.take_lane.stats()
+        self.assertEqual(stats['takes'], 1)
+        self.assertEqual(stats['empty'], 0)
+        self.assertEqual(stats['parked'], 0)
+        self.assertEqual(stats['max_parked'], 1)
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['parked_time']['count'], 1)
+        self.assertTrue(stats['parked_time']['max'] > 0)
+
+    def test_taken_task_not_blocked(self):
+        # task is taken via lane connection
+        self.laned_tube.put('foo', channel=1, msg_type=1)
+        task = self.laned_tube.take(timeout=1)
+        self.assertTrue(self.laned.take_lane.owns(
+            self.laned._owner(self.laned_tube, task.task_id)
+        ))
+
+        # the next take does not park on connection holding the task
+        thread, result = self.take_in_thread()
+        self.wait_parked(1)
+        time_start = time.time()
+        self.assertTrue(task.ack())
+        self.assertTrue(time.time() - time_start < 0.5)
+        self.assertEqual(self.laned.take_lane.stats()['size'], 2)
+
+        self.laned_tube.put('bar', channel=1, msg_type=1)
+        thread.join()
+        self.assertTrue(result[0].ack())
+
+    def test_full_lane(self):
+        # every lane connection holds a taken task
+        self.laned_tube.put_many([(i, 1, 1) for i in range(3)])
+        tasks = [self.laned_tube.take(timeout=1) for _ in range(2)]
+        self.assertEqual(self.laned.take_lane.stats()['size'], 2)
+
+        # the next take waits for a connection without tasks
+        thread, result = self.take_in_thread()
+        time.sleep(0.1)
+        self.assertEqual(self.laned.take_lane.stats()['parked'], 0)
+        for task in tasks:
+            time_start = time.time()
+            self.assertTrue(task.ack())
+            self.assertTrue(time.time() - time_start < 0.5)
+        thread.join()
+        self.assertEqual(result[0].data, 2)
+        self.assertTrue(result[0].ack())
+
+        # lane timeout is applied to waiting for such connection
+        self.laned.configure_take_lane(max_size=1, timeout=0.1)
+        self.laned_tube.put('foo', channel=1, msg_type=1)
+        task = self.laned_tube.take(timeout=1)
+        with self.assertRaises(Deque.PoolTimeoutException):
+            self.laned_tube.take(timeout=1)
+        self.assertTrue(task.ack())
+
+    def test_slow_handler(self):
+        # handler is slower than poll interval of worker takes
+        self.laned_tube.put_many([(i, 1, 1) for i in range(3)])
+        time_start = time.time()
+        worker = self.laned_tube.consume(lambda task: time.sleep(0.2),
+                                         poll_interval=0.15)
+        deadline = time.time() + 5
+        while worker.stats()['acked'] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+
+        self.assertEqual(worker.stats()['acked'], 3)
+        self.assertTrue(time.time() - time_start < 2)
+        self.assertEqual(len(self.server.tube(self.tube_name)), 0)
+        self.assertEqual(self.laned._owners, {})
+
+    def test_non_blocking_take(self):
+        self.laned_tube.put('foo', channel=1, msg_type=1)
+        task = self.laned_tube.take(timeout=0)
+        self.assertIsNone(self.laned._owner(self.laned_tube, task.task_id))
+        self.assertTrue(task.release())
+
+        self.assertEqual(self.laned.take_lane.stats()['takes'], 0)
+        self.assertEqual(self.laned.take_lane.pool.stats()['created'], 0)
+
+        # lane tasks are routed in bulk and pipelined commands too
+        tasks = self.laned_tube.take_many(2, timeout=1)
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(self.laned.take_lane.stats()['takes'], 1)
+        self.laned_tube.put('bar', channel=1, msg_type=1)
+        task = tasks[0].ack_and_take(timeout=0)
+        self.assertEqual(task.data, 'bar')
+        self.assertEqual(self.laned_tube.release_many([task]).results,
+                         [True])
+        self.laned_tube.take(timeout=1).ack()
+
+    def test_bounded(self):
+        self.laned.configure_take_lane(max_size=1, timeout=0.1)
+        thread, result = self.take_in_thread(timeout=0.5)
+        self.wait_parked(1)
+
+        # the second long poll waits for a free lane connection
+        with self.assertRaises(Deque.PoolTimeoutException):
+            self.laned_tube.take(timeout=1)
+        thread.join()
+        self.assertIsNone(result[0])
+
+        stats = self.laned.take_lane.stats()
+        self.assertEqual(stats['takes'], 1)
+        self.assertEqual(stats['empty'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+
+    def test_disabled(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test', take_lanes=0)
+        self.assertIsNone(deque.take_lane)
+
+        self.laned.disable_take_lane()
+        self.assertIsNone(self.laned.take_lane)
+        self.laned_tube.put('foo', channel=1, msg_type=1)
+        self.laned_tube.take(timeout=1).ack()
+        self.laned.configure_take_lane()
@@ -0,0 +1,81 @@
+"""
+Tests for deque call metrics.
+"""
+import unittest
+
+from tarantool_deque import Deque
+from tarantool_deque.metrics import Histogram
+
+from . import StandInTestCase
+
+
+class HistogramTestCase(unittest.TestCase):
+    """
+    Tests for latency `Histogram`.
+    """
+    def test_histogram(self):
+        histogram = Histogram((1, 2, 5))
+        for value in (0.5, 1, 1.5, 3, 10):
+            histogram.add(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'],
+                         [(1, 2), (2, 1), (5, 1), (None, 1)])
+        self.assertEqual(snapshot['count'], 5)
+        self.assertEqual(snapshot['sum'], 16)
+        self.assertEqual(snapshot['min'], 0.5)
+        self.assertEqual(snapshot['max'], 10)
+        self.assertEqual(snapshot['p50'], 2)
+        self.assertEqual(snapshot['p99'], 10)
+
+    def test_empty(self):
+        snapshot = Histogram().snapshot()
+        self.assertEqual(snapshot['count'], 0)
+        self.assertEqual(snapshot['avg'], 0)
+        self.assertIsNone(snapshot['p50'])
+
+
+class DequeMetricsTestCase(StandInTestCase):
+    """
+    Tests for `Deque.enable_metrics`.
+    """
+    def tearDown(self):
+        self.deque.disable_metrics()
+
+    def test_disabled(self):
+        self.assertIsNone(self.deque.metrics)
+        self.tube.put('foo', channel=1, msg_type=1)
+        self.tube.take(timeout=0).ack()
+        self.assertIsNone(self.deque.metrics)
+
+    def test_metrics(self):
+        metrics = self.deque.enable_metrics()
+        self.assertIs(self.deque.enable_metrics(), metrics)
+
+        self.tube.put('foo', channel=1, msg_type=1)
+        self.tube.put('bar', channel=1, msg_type=1)
+        task = self.tube.take(timeout=0)
+        task.ack()
+        with self.assertRaises(Deque.DatabaseError):
+            task.ack()
+
+        snapshot = metrics.snapshot()
+        stats = snapshot[self.tube_name]
+        self.assertEqual(sorted(stats), ['ack', 'put', 'take'])
+        self.assertEqual(stats['put']['calls'], 2)
+        self.assertEqual(stats['put']['error_count'], 0)
+        self.assertTrue(stats['put']['bytes_out'] > 0)
+        self.assertTrue(stats['put']['bytes_in'] > 0)
+        self.assertEqual(stats['take']['latency']['count'], 1)
+        self.assertEqual(stats['ack']['calls'], 2)
+        self.assertEqual(stats['ack']['errors'], {'DatabaseError': 1})
+
+        # snapshot with reset
+        self.assertEqual(metrics.snapshot(reset=True), snapshot)
+        self.assertEqual(metrics.snapshot(), {})
+
+        self.tube.take(timeout=0).ack()
+        self.assertEqual(metrics.snapshot()[self.tube_name]['take']['calls'],
+                         1)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
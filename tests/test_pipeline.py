@@ -0,0 +1,267 @@
+"""
+Tests for pipelined deque commands.
+"""
+import threading
+import time
+
+import tarantool
+
+from tarantool_deque import Deque
+from tarantool_deque.pipeline import PipelineResult, call_pipelined
+
+from . import StandInTestCase
+
+
+class PipelineTestCase(StandInTestCase):
+    """
+    Tests for `Deque.pipeline`.
+    """
+    def setUp(self):
+        self.server.tube('other_tube')
+        super(PipelineTestCase, self).setUp()
+        self.other = self.deque.tube('other_tube')
+
+    def test_heterogeneous_commands(self):
+        self.tube.put_many([('ack', 1, 1), ('release', 1, 1)])
+        first, second = self.tube.take_many(2, timeout=0)
+
+        with self.deque.pipeline() as pipe:
+            put = pipe.put(self.other, [1, 2, 3], channel=1, msg_type=1)
+            ack = pipe.ack(first)
+            release = pipe.release(second, delay=60)
+            self.assertEqual(len(pipe), 3)
+
+        self.assertEqual(len(pipe), 0)
+        self.assertEqual(put.result().data, [1, 2, 3])
+        self.assertEqual(put.result().tube, self.other)
+        self.assertTrue(ack.result())
+        self.assertTrue(release.result())
+
+        # task objects are updated
+        self.assertEqual(first.state_name, 'done')
+        self.assertEqual(second.state_name, 'delayed')
+
+        task = self.other.take(timeout=0)
+        self.assertEqual(task.task_id, put.result().task_id)
+        task.ack()
+
+    def test_take(self):
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        pipe = self.deque.pipeline()
+        taken = pipe.take(self.tube)
+        empty = pipe.take(self.other)
+        tasks = pipe.execute()
+
+        self.assertEqual(tasks[1], None)
+        self.assertIsNone(empty.result())
+        self.assertEqual(taken.result().data, 'foo')
+        self.assertEqual(taken.result().state_name, 'taken')
+        tasks[0].ack()
+
+    def test_errors(self):
+        task = self.tube.put('foo', channel=1, msg_type=1)
+
+        pipe = self.deque.pipeline()
+        ack = pipe.ack(task)  # task is not taken
+        put = pipe.put(self.tube, 'bar', channel=1, msg_type=1)
+        self.assertRaises(RuntimeError, ack.result)
+
+        self.assertRaises(tarantool.DatabaseError, pipe.execute)
+        self.assertRaises(tarantool.DatabaseError, ack.result)
+        self.assertEqual(put.result().data, 'bar')
+
+        pipe.ack(task)
+        results = pipe.execute(raise_on_error=False)
+        self.assertEqual(results, [None])
+
+    def test_discarded_on_exception(self):
+        try:
+            with self.deque.pipeline() as pipe:
+                result = pipe.put(self.tube, 'foo', channel=1, msg_type=1)
+                raise KeyError()
+        except KeyError:
+            pass
+
+        self.assertFalse(result.done)
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_responses_matched_by_sync(self):
+        # blocking take is answered after the following commands
+        pipe = self.deque.pipeline()
+        taken = pipe.take(self.tube, timeout=0.2)
+        put = pipe.put(self.other, 'bar', channel=1, msg_type=1)
+        pipe.execute()
+
+        self.assertIsNone(taken.result())
+        self.assertEqual(put.result().data, 'bar')
+
+    def test_sequential_fallback(self):
+        class Connection(object):
+            def __init__(self):
+                self.calls = []
+
+            def call(self, name, args):
+                self.calls.append(name)
+                if name == 'fail':
+                    raise tarantool.DatabaseError(1, 'failed')
+                return [[name]]
+
+        connection = Connection()
+        results = call_pipelined(connection, [('ok', ()), ('fail', ()),
+                                              ('next', ())])
+        self.assertEqual(connection.calls, ['ok', 'fail', 'next'])
+        self.assertEqual(results[0], [['ok']])
+        self.assertIsInstance(results[1], tarantool.DatabaseError)
+        self.assertEqual(results[2], [['next']])
+
+    def test_metrics(self):
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test')
+        metrics = deque.enable_metrics()
+        tube = deque.tube(self.tube_name)
+
+        with deque.pipeline() as pipe:
+            pipe.put(tube, 'foo', channel=1, msg_type=1)
+            pipe.put(tube, 'bar', channel=1, msg_type=1)
+            pipe.take(tube)
+
+        snapshot = metrics.snapshot()[self.tube_name]
+        self.assertEqual(snapshot['put']['calls'], 2)
+        self.assertEqual(snapshot['take']['calls'], 1)
+        self.assertTrue(snapshot['take']['bytes_in'] > 0)
+
+
+class PipelinePoolTestCase(StandInTestCase):
+    """
+    Tests for `Deque.pipeline` with connection pool.
+    """
+    def setUp(self):
+        super(PipelinePoolTestCase, self).setUp()
+        self.pooled_deque = Deque(self.server.host, self.server.port,
+                                  user='test', password='test')
+        self.pooled_deque.configure_pool(max_size=3)
+        self.pooled_tube = self.pooled_deque.tube(self.tube_name)
+
+    def tearDown(self):
+        self.pooled_deque.pool.close()
+
+    def test_commands_sent_via_owner(self):
+        self.tube.put_many([('foo', 1, 1), ('bar', 1, 1)])
+
+        # take tasks via different connections
+        first = self.pooled_deque.pool.acquire()
+        tasks = [self.pooled_tube.take(timeout=0)]
+        self.pooled_deque.pool.release(first)
+        tasks.append(self.pooled_tube.take(timeout=0))
+        self.assertIsNot(
+            self.pooled_deque._owner(self.pooled_tube, tasks[0].task_id),
+            self.pooled_deque._owner(self.pooled_tube, tasks[1].task_id),
+        )
+
+        pipe = self.pooled_deque.pipeline()
+        results = [pipe.ack(task) for task in tasks]
+        put = pipe.put(self.pooled_tube, 'foo', channel=1, msg_type=1)
+        pipe.execute()
+
+        self.assertTrue(all(result.result() for result in results))
+        self.assertTrue(all(task.state_name == 'done' for task in tasks))
+        self.assertEqual(put.result().state_name, 'ready')
+        self.assertEqual(self.pooled_deque._owners, {})
+
+    def test_take_is_tracked(self):
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        with self.pooled_deque.pipeline() as pipe:
+            taken = pipe.take(self.pooled_tube)
+
+        task = taken.result()
+        self.assertIn((self.tube_name, task.task_id),
+                      self.pooled_deque._owners)
+        self.assertTrue(task.ack())
+        self.assertEqual(self.pooled_deque._owners, {})
+
+
+class PipelineResultTestCase(StandInTestCase):
+    """
+    Tests for `PipelineResult`.
+    """
+    def test_callback_error(self):
+        def callback(response):
+            raise ValueError()
+
+        result = PipelineResult(self.tube, 'cmd', (), callback=callback)
+        result.resolve([])
+        self.assertTrue(result.done)
+        self.assertRaises(ValueError, result.result)
+
+
+class AckAndTakeTestCase(StandInTestCase):
+    """
+    Tests for `Tube.ack_and_take`.
+    """
+    def test_ack_and_take(self):
+        self.tube.put_many([('first', 1, 1), ('second', 1, 1)])
+
+        task = self.tube.take(timeout=0)
+        next_task = task.ack_and_take(timeout=0)
+        self.assertEqual(task.state_name, 'done')
+        self.assertEqual(next_task.data, 'second')
+        self.assertEqual(next_task.state_name, 'taken')
+
+        self.assertIsNone(next_task.ack_and_take(timeout=0))
+        self.assertEqual(next_task.state_name, 'done')
+
+    def test_wait(self):
+        self.tube.put('first', channel=1, msg_type=1)
+        task = self.tube.take(timeout=0)
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(task.ack_and_take(timeout=2))
+        )
+        thread.start()
+        deadline = time.time() + 5
+        while self.deque.take_lane.stats()['parked'] < 1:
+            self.assertTrue(time.time() < deadline, "Take is not parked")
+            time.sleep(0.01)
+
+        # waiting take does not hold single connection
+        time_start = time.time()
+        self.tube.put('second', channel=1, msg_type=1)
+        self.assertTrue(time.time() - time_start < 0.5)
+        thread.join()
+
+        self.assertEqual(task.state_name, 'done')
+        self.assertEqual(result[0].data, 'second')
+        self.assertTrue(result[0].ack())
+
+    def test_raw(self):
+        self.tube.put_many([('first', 1, 1), ('second', 1, 1)])
+
+        row = self.tube.take(timeout=0, raw=True)
+        next_row = self.tube.ack_and_take(row.task_id, timeout=0, raw=True)
+        self.assertEqual(next_row.data, 'second')
+        self.assertTrue(self.tube.ack(next_row.task_id))
+
+    def test_ack_error(self):
+        task = self.tube.put('first', channel=1, msg_type=1)
+        self.tube.put('second', channel=1, msg_type=1)
+
+        # task is not taken: taken task is released
+        self.assertRaises(tarantool.DatabaseError, task.ack_and_take,
+                          timeout=0)
+        tasks = self.tube.take_many(2, timeout=0)
+        self.assertEqual(len(tasks), 2)
+        self.tube.ack_many(tasks)
+
+    def test_pool(self):
+        pooled = Deque(self.server.host, self.server.port,
+                       user='test', password='test', pool_size=2)
+        tube = pooled.tube(self.tube_name)
+        tube.put_many([(i, 1, 1) for i in range(3)])
+
+        task = tube.take(timeout=0)
+        while task is not None:
+            task = task.ack_and_take(timeout=0)
+        self.assertEqual(pooled._owners, {})
+        pooled.pool.close()
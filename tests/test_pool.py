@@ -0,0 +1,248 @@
+"""
+Tests for tarantool deque connection pool.
+"""
+import threading
+import time
+import unittest
+
+from tarantool_deque import Deque
+from tarantool_deque.pool import ConnectionPool, PoolTimeoutException
+
+from . import StandInTestCase
+
+
+class FakeConnection(object):
+    """
+    Fake tarantool connection object.
+    """
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+
+    def ping(self, notime=False):
+        if not self.alive:
+            raise Deque.NetworkError("Connection is dead")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    """
+    Tests for `ConnectionPool` itself.
+    """
+    def test_reuse(self):
+        pool = ConnectionPool(FakeConnection, max_size=2)
+
+        # connection is reused after release
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+
+        stats = pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 0)
+
+    def test_prefer_unpinned(self):
+        pool = ConnectionPool(FakeConnection, max_size=2)
+        first = pool.acquire()
+        second = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        # pinned connection is used only if there is no other one
+        pool.pin(second)
+        self.assertIs(pool.acquire(), first)
+        self.assertIs(pool.acquire(), second)
+
+    def test_unpinned(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, timeout=0.1)
+        first = pool.acquire()
+        pool.release(first)
+        pool.pin(first)
+
+        # new connection is opened instead of pinned one
+        second = pool.acquire(unpinned=True)
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.stats()['created'], 2)
+        pool.release(second)
+
+        # pinned connections are not used even if pool is full
+        pool.pin(second)
+        with self.assertRaises(PoolTimeoutException):
+            pool.acquire(unpinned=True)
+        self.assertIs(pool.acquire(), second)
+        pool.release(second)
+
+        # unpinned connection is checked out by waiting thread
+        timer = threading.Timer(0.05, pool.unpin, (first,))
+        timer.start()
+        self.assertIs(pool.acquire(unpinned=True, timeout=1), first)
+        timer.join()
+
+    def test_max_size_timeout(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, timeout=0.1)
+        pool.acquire()
+        pool.acquire()
+
+        # no more connections are available
+        time_start = time.time()
+        with self.assertRaises(PoolTimeoutException):
+            pool.acquire()
+        self.assertTrue(.1 <= time.time() - time_start < .5)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(pool.stats()['size'], 2)
+
+    def test_wait(self):
+        pool = ConnectionPool(FakeConnection, max_size=1)
+        connection = pool.acquire()
+
+        # release connection from another thread a bit later
+        timer = threading.Timer(0.1, pool.release, (connection,))
+        timer.start()
+        self.assertIs(pool.acquire(timeout=1), connection)
+        timer.join()
+
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertTrue(stats['wait_time'] >= 0.1)
+
+    def test_prefer(self):
+        pool = ConnectionPool(FakeConnection, max_size=3)
+        first = pool.acquire()
+        second = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        # preferred connection is returned even if it is not on top
+        self.assertIs(pool.acquire(prefer=first), first)
+
+        # preferred connection is busy - wait for it
+        with self.assertRaises(PoolTimeoutException):
+            pool.acquire(prefer=first, timeout=0.1)
+
+        # closed preferred connection is ignored
+        pool.release(first, broken=True)
+        self.assertTrue(first.closed)
+        self.assertIs(pool.acquire(prefer=first), second)
+
+    def test_idle_eviction(self):
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=3,
+                              idle_timeout=0.1)
+        connections = [pool.acquire() for _ in range(3)]
+        pool.pin(connections[0])
+        for connection in connections:
+            pool.release(connection)
+
+        time.sleep(0.15)
+        connection = pool.acquire()
+
+        # pinned connection is kept (and counted as `min_size` one)
+        stats = pool.stats()
+        self.assertEqual(stats['evicted'], 2)
+        self.assertEqual(stats['size'], 1)
+        self.assertIs(connection, connections[0])
+        self.assertFalse(connection.closed)
+
+    def test_health_check(self):
+        pool = ConnectionPool(
+            FakeConnection, max_size=2,
+            health_check=lambda connection: connection.alive,
+            health_check_interval=0
+        )
+        connection = pool.acquire()
+        connection.alive = False
+        pool.release(connection)
+
+        # dead connection is dropped, new one is opened
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['health_check_failures'], 1)
+
+    def test_bad_size(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(FakeConnection, max_size=0)
+        with self.assertRaises(ValueError):
+            ConnectionPool(FakeConnection, min_size=3, max_size=2)
+
+
+class DequePoolTestCase(StandInTestCase):
+    """
+    Tests for deque with connection pool.
+    """
+    def setUp(self):
+        super(DequePoolTestCase, self).setUp()
+        self.pooled = Deque(self.server.host, self.server.port,
+                            user='test', password='test', pool_size=4)
+        self.pooled_tube = self.pooled.tube(self.tube_name)
+
+    def tearDown(self):
+        self.pooled.pool.close()
+
+    def test_commands(self):
+        # all commands work via pool
+        task = self.pooled_tube.put('foo', channel=1, msg_type=1)
+        self.assertEqual(task.state, 1)
+
+        task = self.pooled_tube.take(timeout=0)
+        self.assertEqual(task.data, 'foo')
+        self.assertTrue(task.peek())
+        self.assertTrue(task.release())
+
+        task = self.pooled_tube.take(timeout=0)
+        self.assertTrue(task.ack())
+        self.assertIsNone(self.pooled_tube.take(timeout=0))
+
+        # single connection is not used at all
+        self.assertIsNone(self.pooled._tnt)
+        self.assertEqual(self.pooled.pool.stats()['created'], 1)
+
+    def test_blocking_take(self):
+        # consumer waits for task in another thread
+        result = []
+        consumer = threading.Thread(
+            target=lambda: result.append(self.pooled_tube.take(timeout=2))
+        )
+        consumer.start()
+        time.sleep(0.1)
+
+        # producer is not blocked by waiting consumer
+        time_start = time.time()
+        self.pooled_tube.put('foo', channel=1, msg_type=1)
+        self.assertTrue(time.time() - time_start < 0.5)
+
+        consumer.join()
+        self.assertEqual(result[0].data, 'foo')
+        self.assertTrue(result[0].ack())
+
+        # blocking take is sent via take lane
+        stats = self.pooled.pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['in_use'], 0)
+        self.assertEqual(self.pooled.take_lane.stats()['size'], 1)
+
+    def test_task_owner(self):
+        self.pooled_tube.put_many([('foo', 1, 1), ('bar', 1, 1)])
+
+        # take tasks via different connections
+        first = self.pooled.pool.acquire()
+        task1 = self.pooled_tube.take(timeout=0)
+        self.pooled.pool.release(first)
+        task2 = self.pooled_tube.take(timeout=0)
+
+        # connections holding taken tasks are pinned
+        self.assertEqual(self.pooled.pool.stats()['pinned'], 2)
+        owner1 = self.pooled._owner(self.pooled_tube, task1.task_id)
+        owner2 = self.pooled._owner(self.pooled_tube, task2.task_id)
+        self.assertIsNotNone(owner1)
+        self.assertIsNotNone(owner2)
+        self.assertIsNot(owner1, owner2)
+
+        # bulk ack is split by owners
+        self.assertEqual(list(self.pooled_tube.ack_many([task1, task2])),
+                         [True, True])
+        self.assertEqual(self.pooled.pool.stats()['pinned'], 0)
+        self.assertEqual(self.pooled._owners, {})
@@ -0,0 +1,160 @@
+"""
+Tests for write-behind producer.
+"""
+import tarantool
+
+from tarantool_deque.codec import Codec
+from tarantool_deque.producer import Producer, ProducerFullException
+
+from . import StandInTestCase
+
+
+class ProducerTestCase(StandInTestCase):
+    """
+    Tests for `Tube.producer`.
+    """
+    def test_batch_size(self):
+        with self.tube.producer(batch_size=10, interval=60) as producer:
+            futures = [producer.put(i, channel=1, msg_type=1)
+                       for i in range(10)]
+            task_ids = [future.result(timeout=5) for future in futures]
+
+            self.assertEqual(len(set(task_ids)), 10)
+            self.assertEqual(producer.stats()['batches'], 1)
+
+        tasks = self.tube.take_many(10, timeout=0)
+        self.assertEqual([task.task_id for task in tasks], task_ids)
+        self.assertEqual([task.data for task in tasks], list(range(10)))
+        self.tube.ack_many(tasks)
+
+    def test_interval(self):
+        producer = self.tube.producer(batch_size=100, interval=0.05)
+        future = producer.put('foo', channel=1, msg_type=1)
+        task_id = future.result(timeout=5)
+        producer.close()
+
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.task_id, task_id)
+        task.ack()
+
+    def test_flush_and_close(self):
+        producer = self.tube.producer(batch_size=100, interval=60)
+        futures = [producer.put(i, channel=1, msg_type=1) for i in range(5)]
+        self.assertEqual(producer.stats()['pending'], 5)
+        self.assertFalse(any(future.done() for future in futures))
+
+        self.assertTrue(producer.flush(timeout=5))
+        self.assertTrue(all(future.done() for future in futures))
+
+        future = producer.put(5, channel=1, msg_type=1)
+        self.assertTrue(producer.close(timeout=5))
+        self.assertTrue(future.done())
+        self.assertRaises(ProducerFullException, producer.put,
+                          6, channel=1, msg_type=1)
+
+        stats = producer.stats()
+        self.assertEqual(stats['put'], 6)
+        self.assertEqual(stats['sent'], 6)
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(len(self.server.tube(self.tube_name)), 6)
+
+    def test_overflow(self):
+        # producer thread is not started, so nothing is sent
+        producer = Producer(self.tube, batch_size=2, max_pending=2,
+                            overflow='raise')
+        producer.put(1, channel=1, msg_type=1)
+        producer.put(2, channel=1, msg_type=1)
+        self.assertRaises(ProducerFullException, producer.put,
+                          3, channel=1, msg_type=1)
+
+        producer.overflow = 'drop'
+        future = producer.put(3, channel=1, msg_type=1)
+        self.assertRaises(ProducerFullException, future.result)
+        self.assertEqual(producer.stats()['dropped'], 1)
+
+        producer.overflow = 'block'
+        producer.put_timeout = 0.05
+        self.assertRaises(ProducerFullException, producer.put,
+                          3, channel=1, msg_type=1)
+
+        self.assertTrue(producer.close())
+        self.assertEqual(producer.stats()['sent'], 2)
+
+        self.assertRaises(ValueError, Producer, self.tube, overflow='wait')
+
+    def test_failed_batch(self):
+        producer = self.deque.tube('missing_tube').producer(interval=60)
+        future = producer.put('foo', channel=1, msg_type=1)
+        producer.close()
+
+        self.assertRaises(tarantool.DatabaseError, future.result)
+        self.assertEqual(producer.stats()['failed'], 1)
+
+    def test_cancelled(self):
+        producer = self.tube.producer(interval=60)
+        cancelled = producer.put('foo', channel=1, msg_type=1)
+        future = producer.put('bar', channel=1, msg_type=1)
+        self.assertTrue(cancelled.cancel())
+        producer.close()
+
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.task_id, future.result())
+        self.assertEqual(task.data, 'bar')
+        task.ack()
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_codec(self):
+        tube = self.deque.tube('codec_tube', codec=Codec(threshold=0))
+        self.server.tube('codec_tube')
+        with tube.producer(interval=60) as producer:
+            future = producer.put({'foo': 'bar' * 100}, channel=1,
+                                  msg_type=1)
+
+        task = tube.take(timeout=0)
+        self.assertEqual(task.task_id, future.result())
+        self.assertEqual(task.data, {'foo': 'bar' * 100})
+        task.ack()
+
+    def test_coalesce(self):
+        producer = Producer(self.tube, interval=60, coalesce='last')
+        first = producer.put('first', channel=1, msg_type=1, obj_id=1)
+        other = producer.put('other', channel=1, msg_type=1, obj_id=2)
+        last = producer.put('last', channel=1, msg_type=1, obj_id=1)
+        self.assertIs(first, last)
+        producer.close()
+
+        stats = producer.stats()
+        self.assertEqual(stats['put'], 3)
+        self.assertEqual(stats['coalesced'], 1)
+        self.assertEqual(stats['sent'], 2)
+
+        tasks = self.tube.take_many(3, timeout=0)
+        self.assertEqual([task.task_id for task in tasks],
+                         [first.result(), other.result()])
+        self.assertEqual([task.data for task in tasks], ['last', 'other'])
+        self.tube.ack_many(tasks)
+
+    def test_coalesce_merge(self):
+        producer = Producer(self.tube, interval=60,
+                            coalesce=lambda old, new: old + new)
+        for i in range(3):
+            producer.put([i], channel=1, msg_type=1)
+        producer.flush()
+
+        # sent tasks are not coalesced
+        producer.put([3], channel=1, msg_type=1)
+        producer.close()
+
+        tasks = self.tube.take_many(3, timeout=0)
+        self.assertEqual([task.data for task in tasks], [[0, 1, 2], [3]])
+        self.tube.ack_many(tasks)
+
+        producer = Producer(self.tube, coalesce='first')
+        producer.put('first', channel=1, msg_type=1)
+        producer.put('last', channel=1, msg_type=1)
+        producer.close()
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.data, 'first')
+        task.ack()
+
+        self.assertRaises(ValueError, Producer, self.tube, coalesce='any')
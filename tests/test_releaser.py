@@ -0,0 +1,94 @@
+"""
+Tests for background releaser of abandoned tasks.
+"""
+import gc
+import time
+
+from tarantool_deque import Deque
+
+from . import StandInTestCase
+
+
+class ReleaserTestCase(StandInTestCase):
+    """
+    Tests for `Deque.configure_releaser`.
+    """
+    def setUp(self):
+        super(ReleaserTestCase, self).setUp()
+        self.released_deque = Deque(self.server.host, self.server.port,
+                                    user='test', password='test')
+        self.released_tube = self.released_deque.tube(self.tube_name)
+
+    def tearDown(self):
+        if self.released_deque.releaser is not None:
+            self.released_deque.releaser.close()
+
+    def test_release_in_background(self):
+        releaser = self.released_deque.configure_releaser(interval=60,
+                                                          batch_size=2)
+        self.tube.put_many([(i, 1, 1) for i in range(5)])
+
+        tasks = self.released_tube.take_many(5, timeout=0)
+        self.assertEqual(len(tasks), 5)
+        del tasks
+        gc.collect()
+
+        # nothing is released on garbage collection
+        self.assertEqual(releaser.stats()['pending'], 5)
+        self.assertIsNone(self.tube.take(timeout=0))
+
+        self.assertEqual(releaser.flush(), 5)
+        stats = releaser.stats()
+        self.assertEqual(stats['released'], 5)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['batches'], 3)
+        self.assertEqual(stats['pending'], 0)
+
+        tasks = self.tube.take_many(5, timeout=0)
+        self.assertEqual(len(tasks), 5)
+        self.tube.ack_many(tasks)
+
+    def test_releaser_thread(self):
+        releaser = self.released_deque.configure_releaser(interval=0.05)
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        self.released_tube.take(timeout=0)
+        gc.collect()
+
+        deadline = time.time() + 5
+        while releaser.stats()['released'] < 1:
+            self.assertTrue(time.time() < deadline, "Task is not released")
+            time.sleep(0.01)
+
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.data, 'foo')
+        task.ack()
+
+    def test_failed(self):
+        releaser = self.released_deque.configure_releaser(interval=60)
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        task = self.released_tube.take(timeout=0)
+        releaser.put(self.released_tube, task.task_id)
+        task.ack()
+
+        self.assertEqual(releaser.flush(), 0)
+        self.assertEqual(releaser.stats()['failed'], 1)
+
+    def test_close(self):
+        releaser = self.released_deque.configure_releaser(interval=60)
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        self.released_tube.take(timeout=0)
+        gc.collect()
+
+        # remaining tasks are released on close
+        releaser.close()
+        self.assertEqual(releaser.stats()['released'], 1)
+        self.tube.take(timeout=0).ack()
+
+    def test_bad_options(self):
+        with self.assertRaises(ValueError):
+            self.released_deque.configure_releaser(interval=0)
+        with self.assertRaises(ValueError):
+            self.released_deque.configure_releaser(batch_size=0)
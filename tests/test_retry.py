@@ -0,0 +1,154 @@
+"""
+Tests for retry policies of failed tasks.
+"""
+import time
+import unittest
+
+from tarantool_deque.retry import ExponentialBackoff, FixedBackoff, RetryPolicy
+
+from . import StandInTestCase
+
+
+class BackoffTestCase(unittest.TestCase):
+    """
+    Tests for backoff delays.
+    """
+    def test_exponential(self):
+        backoff = ExponentialBackoff(base=1, factor=2, max_delay=10,
+                                     jitter=0)
+        self.assertEqual([backoff.delay(attempt) for attempt in range(1, 6)],
+                         [1, 2, 4, 8, 10])
+        self.assertEqual(backoff.delay(100000), 10)
+
+    def test_jitter(self):
+        backoff = ExponentialBackoff(base=10, jitter=0.5)
+        delays = [backoff.delay(1) for _ in range(100)]
+        self.assertTrue(all(5 <= delay <= 15 for delay in delays))
+        self.assertTrue(len(set(delays)) > 1)
+
+        self.assertRaises(ValueError, ExponentialBackoff, jitter=1)
+        self.assertRaises(ValueError, ExponentialBackoff, base=0)
+
+    def test_fixed(self):
+        self.assertEqual(FixedBackoff(5).delay(10), 5)
+
+
+class RetryPolicyTestCase(StandInTestCase):
+    """
+    Tests for `Task.retry`.
+    """
+    def setUp(self):
+        self.server.tube('dead_letters')
+        super(RetryPolicyTestCase, self).setUp()
+        self.tube.retry_policies.clear()
+
+    def test_release_with_backoff(self):
+        self.tube.set_retry_policy(RetryPolicy(
+            ExponentialBackoff(base=10, factor=3, jitter=0), max_attempts=2
+        ))
+        task_id = self.tube.put('foo', channel=1, msg_type=1).task_id
+
+        server_task = self.server.tube(self.tube_name).tasks[task_id]
+        for delay in (10, 30):
+            task = self.tube.take(timeout=0)
+            started = time.time()
+            self.assertEqual(task.retry(), 'released')
+            self.assertEqual(task.state_name, 'delayed')
+            self.assertAlmostEqual(task.to_send_at - started, delay,
+                                   delta=1)
+            # make task ready again
+            server_task[7] = 0
+            server_task[1] = 1
+            self.server.tube(self.tube_name)._index(server_task)
+
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.retry(), 'deleted')
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_move(self):
+        dead_letters = self.deque.tube('dead_letters')
+        self.tube.set_retry_policy(RetryPolicy(max_attempts=0,
+                                               on_exhausted=dead_letters))
+        self.tube.put('foo', channel=2, msg_type=3, obj_type=4, obj_id=5)
+
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.retry(), 'moved')
+
+        moved = dead_letters.take(timeout=0)
+        self.assertEqual((moved.data, moved.channel, moved.msg_type,
+                          moved.obj_type, moved.obj_id),
+                         ('foo', 2, 3, 4, 5))
+        moved.ack()
+        self.assertIsNone(self.tube.take(timeout=0))
+
+        self.assertRaises(ValueError, RetryPolicy, on_exhausted='bury')
+
+    def test_max_age(self):
+        self.tube.set_retry_policy(RetryPolicy(max_age=60))
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        task = self.tube.take(timeout=0)
+        self.assertFalse(self.tube.retry_policy().exhausted(task, 1))
+        task._created_at -= 61 * 10000000
+        self.assertEqual(task.retry(), 'deleted')
+
+    def test_channel_override(self):
+        default = RetryPolicy(FixedBackoff(10))
+        fast = RetryPolicy(FixedBackoff(0))
+        self.tube.set_retry_policy(default)
+        self.tube.set_retry_policy(fast, channel=2)
+
+        self.assertIs(self.tube.retry_policy(1), default)
+        self.assertIs(self.tube.retry_policy(2), fast)
+
+        self.tube.put_many([('slow', 1, 1), ('fast', 2, 1)])
+        for task in self.tube.take_many(2, timeout=0):
+            task.retry()
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.data, 'fast')
+        task.ack()
+
+        # without policy task is released at once
+        self.tube.set_retry_policy(None)
+        self.tube.set_retry_policy(None, channel=2)
+        self.assertIsNone(self.tube.retry_policy(2))
+        self.tube.put('foo', channel=1, msg_type=1)
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.retry(), 'released')
+        self.assertEqual(task.state_name, 'ready')
+        self.tube.take(timeout=0).ack()
+
+    def test_attempts_tracked(self):
+        policy = RetryPolicy(max_tracked=2)
+        self.tube.put_many([(i, 1, 1) for i in range(3)])
+        tasks = self.tube.take_many(3, timeout=0)
+
+        self.assertEqual(policy.attempt(tasks[0]), 1)
+        self.assertEqual(policy.attempt(tasks[0]), 2)
+        policy.attempt(tasks[1])
+        policy.attempt(tasks[2])
+        # the oldest task is forgotten
+        self.assertEqual(policy.attempt(tasks[0]), 1)
+        policy.forget(tasks[0])
+        self.assertEqual(policy.attempt(tasks[0]), 1)
+        self.tube.ack_many(tasks)
+
+    def test_worker(self):
+        self.tube.set_retry_policy(RetryPolicy(max_attempts=0))
+        self.tube.put_many([(i, 1, 1) for i in range(4)])
+
+        def handler(task):
+            if task.data % 2:
+                raise ValueError("Odd task")
+
+        worker = self.tube.consume(handler, concurrency=2, poll_interval=0.1)
+        deadline = time.time() + 5
+        while worker.stats()['processed'] < 4:
+            self.assertTrue(time.time() < deadline, "Worker is too slow")
+            time.sleep(0.01)
+        worker.stop()
+
+        stats = worker.stats()
+        self.assertEqual(stats['acked'], 2)
+        self.assertEqual(stats['deleted'], 2)
+        self.assertEqual(stats['released'], 0)
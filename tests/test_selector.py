@@ -0,0 +1,119 @@
+"""
+Tests for taking tasks from several tubes.
+"""
+import threading
+import time
+
+from tarantool_deque.selector import TAKE_ANY, Priority, Weighted
+
+from . import StandInTestCase
+
+
+class TakeAnyTestCase(StandInTestCase):
+    """
+    Tests for `Deque.take_any`.
+    """
+    names = ('test_tube', 'tube_b', 'tube_c')
+
+    def setUp(self):
+        for name in self.names:
+            self.server.tube(name)
+        super(TakeAnyTestCase, self).setUp()
+        self.tubes = [self.deque.tube(name) for name in self.names]
+
+    def fill(self, count):
+        for tube in self.tubes:
+            tube.put_many([(tube.name, 1, 1)] * count)
+
+    def take_names(self, count, **options):
+        tasks = [self.deque.take_any(self.tubes, timeout=0, **options)
+                 for _ in range(count)]
+        for task in tasks:
+            task.ack()
+        return [task.data for task in tasks]
+
+    def test_empty(self):
+        started = time.time()
+        self.assertIsNone(self.deque.take_any(self.tubes, timeout=0.2,
+                                              poll_interval=0.05))
+        self.assertTrue(0.2 <= time.time() - started < 1)
+
+    def test_round_robin(self):
+        self.fill(2)
+        self.assertEqual(self.take_names(6), list(self.names) * 2)
+
+    def test_priority(self):
+        self.fill(1)
+        self.assertEqual(self.take_names(3, strategy='priority'),
+                         list(self.names))
+
+        # tasks taken along with the served one are released
+        self.tubes[1].put('b', channel=1, msg_type=1)
+        self.tubes[2].put('c', channel=1, msg_type=1)
+        task = self.deque.take_any(self.tubes, timeout=0, strategy='priority')
+        self.assertEqual(task.data, 'b')
+        task.ack()
+        task = self.tubes[2].take(timeout=0)
+        self.assertEqual(task.data, 'c')
+        task.ack()
+
+    def test_weighted(self):
+        self.fill(6)
+        weights = {'test_tube': 3, 'tube_b': 1, 'tube_c': 0.5}
+        names = self.take_names(9, strategy='weighted', weights=weights)
+        self.assertEqual(names.count('test_tube'), 6)
+        self.assertEqual(names.count('tube_b'), 2)
+        self.assertEqual(names.count('tube_c'), 1)
+        # served tubes are interleaved
+        self.assertNotEqual(names[:6], ['test_tube'] * 6)
+
+        self.assertRaises(ValueError, Weighted, self.tubes, {'tube_b': 0})
+
+    def test_wait(self):
+        def put():
+            time.sleep(0.1)
+            self.tubes[2].put('late', channel=1, msg_type=1)
+
+        thread = threading.Thread(target=put)
+        thread.start()
+        started = time.time()
+        task = self.deque.take_any(self.tubes, timeout=5,
+                                   strategy=Priority(self.tubes),
+                                   poll_interval=0.05)
+        thread.join()
+
+        self.assertEqual(task.data, 'late')
+        self.assertTrue(time.time() - started < 1)
+        task.ack()
+
+    def test_single_request(self):
+        names = ['idle_{0}'.format(i) for i in range(40)]
+        for name in names:
+            self.server.tube(name)
+        tubes = [self.deque.tube(name) for name in names]
+
+        metrics = self.deque.enable_metrics()
+        self.addCleanup(self.deque.disable_metrics)
+        started = time.time()
+        self.assertIsNone(self.deque.take_any(tubes, timeout=0.2,
+                                              poll_interval=0.01))
+        self.assertTrue(0.2 <= time.time() - started < 1)
+        # tubes are not polled one by one
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_fallback(self):
+        # deque script without `deque.take_any` procedure
+        self.server.procedures = {}
+        self.addCleanup(delattr, self.server, 'procedures')
+        self.addCleanup(self.deque._no_bulk.discard, TAKE_ANY)
+
+        self.fill(1)
+        self.assertEqual(self.take_names(3, strategy='priority'),
+                         list(self.names))
+        self.assertIn(TAKE_ANY, self.deque._no_bulk)
+        self.test_empty()
+
+    def test_bad_strategy(self):
+        self.assertRaises(ValueError, self.deque.take_any, self.tubes,
+                          strategy='random')
+        self.assertRaises(ValueError, Priority, [])
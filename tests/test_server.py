@@ -0,0 +1,192 @@
+"""
+Tests for stand-in deque server.
+"""
+import socket
+import threading
+import time
+
+from tarantool_deque import Deque, iproto
+
+from . import StandInTestCase
+
+
+class ServerTestCase(StandInTestCase):
+    """
+    Tests for stand-in deque server semantics.
+    """
+    def connect(self):
+        """
+        Returns tube of new deque connection.
+        """
+        deque = Deque(self.server.host, self.server.port,
+                      user='test', password='test')
+        return deque.tube(self.tube_name)
+
+    def test_ownership(self):
+        self.tube.put('foo', channel=1, msg_type=1)
+        other = self.connect()
+
+        task = self.tube.take(timeout=0)
+
+        # task may be acked only in the session which took it
+        with self.assertRaises(Deque.DatabaseError):
+            other.deque.ack(other, task.task_id)
+        with self.assertRaises(Deque.DatabaseError):
+            other.deque.release(other, task.task_id)
+        self.assertEqual(len(other.ack_many([task.task_id])), 1)
+        self.assertFalse(other.ack_many([task.task_id]).results[0])
+
+        self.assertTrue(task.ack())
+        other.deque.tnt.close()
+
+    def test_release_on_disconnect(self):
+        self.tube.put_many([(i, 1, 1) for i in range(3)])
+        other = self.connect()
+
+        tasks = other.take_many(3, timeout=0)
+        self.assertEqual(len(tasks), 3)
+        self.assertIsNone(self.tube.take(timeout=0))
+
+        # taken tasks are ready again when session is closed
+        other.deque.tnt.close()
+        tasks = self.tube.take_many(3, timeout=1)
+        deadline = time.time() + 5
+        while len(tasks) < 3 and time.time() < deadline:
+            tasks += self.tube.take_many(3, timeout=0.1)
+        self.assertEqual(sorted(task.data for task in tasks), [0, 1, 2])
+        self.tube.ack_many(tasks)
+
+    def test_cancel_wait_on_disconnect(self):
+        other = self.connect()
+        # wait on the single connection, not on take lane
+        other.deque.disable_take_lane()
+        result = []
+
+        def take():
+            try:
+                result.append(other.take(timeout=10))
+            except Exception as e:
+                # connection is closed under blocked request
+                result.append(e)
+
+        thread = threading.Thread(target=take)
+        thread.start()
+        time.sleep(0.1)
+        # interrupt blocked request: close() alone does not wake up recv()
+        other.deque.tnt._socket.shutdown(socket.SHUT_RDWR)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        other.deque.tnt.close()
+
+        # closed session does not steal new task
+        self.tube.put('foo', channel=1, msg_type=1)
+        task = self.tube.take(timeout=1)
+        self.assertEqual(task.data, 'foo')
+        task.ack()
+
+    def test_delayed_and_expired(self):
+        now = time.time()
+        self.tube.put('late', channel=1, msg_type=1, to_send_at=now + 0.2)
+        self.tube.put('expired', channel=1, msg_type=1,
+                      valid_until=now + 0.1)
+        self.tube.put('first', channel=1, msg_type=1)
+
+        time.sleep(0.15)
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.data, 'first')
+        task.ack()
+
+        # delayed task becomes ready, expired one is deleted
+        task = self.tube.take(timeout=1)
+        self.assertEqual(task.data, 'late')
+        task.ack()
+        self.assertIsNone(self.tube.take(timeout=0))
+        self.assertEqual(len(self.server.tube(self.tube_name)), 0)
+
+    def test_many_tasks(self):
+        tube = self.server.tube(self.tube_name)
+        count = 100000
+        started = time.time()
+        tube.put_many([(i, 1, 1) for i in range(count)])
+        rows = tube.take_many(count, 0)
+        tube.ack_many([row[0] for row in rows])
+        self.assertEqual(len(rows), count)
+        self.assertEqual(len(tube), 0)
+        self.assertTrue(time.time() - started < 30)
+
+    def test_filtered_take(self):
+        self.tube.put_many([
+            ('a', 1, 1), ('b', 2, 1), ('c', 2, 2), ('d', 3, 2), ('e', 2, 1),
+        ])
+
+        task = self.tube.take(timeout=0, channel=2)
+        self.assertEqual(task.data, 'b')
+        tasks = self.tube.take_many(10, timeout=0, channel=2, msg_type=1)
+        self.assertEqual([task.data for task in tasks], ['e'])
+        tasks += self.tube.take_many(10, timeout=0, msg_type=2)
+        self.assertEqual([task.data for task in tasks], ['e', 'c', 'd'])
+        self.assertIsNone(self.tube.take(timeout=0, channel=2))
+
+        # released task is taken with filter again, other ones are left
+        self.assertTrue(task.release())
+        self.assertEqual(self.tube.take(timeout=0, channel=2).data, 'b')
+        self.assertEqual(self.tube.take(timeout=0).data, 'a')
+
+        with self.assertRaises(Deque.DatabaseError):
+            self.deque.call(self.tube, self.tube.cmd('take_filtered'),
+                            (0, {'obj_id': 1}))
+
+    def test_filtered_take_unsupported(self):
+        # deque script without filtered takes
+        tube = self.server.tube(self.tube_name)
+        tube.commands = tuple(cmd for cmd in tube.commands
+                              if not cmd.endswith('_filtered'))
+        self.addCleanup(delattr, tube, 'commands')
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        # tasks of other channels are not taken
+        for take in (lambda: self.tube.take(timeout=0, channel=2),
+                     lambda: self.tube.take_many(10, timeout=0, channel=2)):
+            with self.assertRaises(Deque.DatabaseError) as context:
+                take()
+            self.assertEqual(context.exception.args[0],
+                             iproto.ER_NO_SUCH_PROC)
+        self.tube.take(timeout=0).ack()
+
+    def test_filtered_wait(self):
+        def put():
+            time.sleep(0.1)
+            self.tube.put('other', channel=1, msg_type=1)
+            time.sleep(0.1)
+            self.tube.put('match', channel=5, msg_type=1)
+
+        thread = threading.Thread(target=put)
+        thread.start()
+        task = self.tube.take(timeout=2, channel=5)
+        thread.join()
+
+        self.assertEqual(task.data, 'match')
+        task.ack()
+        self.tube.take(timeout=0).ack()
+
+    def test_filtered_index(self):
+        tube = self.server.tube(self.tube_name)
+        tube.put_many([(i, i % 2, 1) for i in range(10)])
+        self.assertEqual(
+            len(tube.take_many_filtered(10, 0, {'channel': 1})), 5
+        )
+        self.assertEqual(list(tube._filtered), [(1, None)])
+        self.assertEqual(len(tube.take_many(10, 0)), 5)
+
+        # stale entries of tasks taken without filter are dropped
+        for _ in range(100):
+            tube.put(0, 1, 1)
+            tube.ack(tube.take(0)[0][0])
+        self.assertTrue(len(tube._filtered[(1, None)]) <= 2 * len(tube) + 64)
+        self.assertEqual(tube.take_many_filtered(10, 0, {'channel': 1}), [])
+
+        # and entries of tasks taken with filter only
+        for _ in range(100):
+            tube.put(0, 1, 1)
+            tube.ack(tube.take_filtered(0, {'channel': 1})[0][0])
+        self.assertTrue(len(tube._ready) <= 2 * len(tube) + 64)
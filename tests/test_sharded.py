@@ -0,0 +1,211 @@
+"""
+Tests for sharded deque.
+"""
+import threading
+import time
+import unittest
+
+from tarantool_deque import Deque
+from tarantool_deque.server import DequeServer
+from tarantool_deque.sharded import HashRing, ShardedDeque
+
+
+class HashRingTestCase(unittest.TestCase):
+    """
+    Tests for consistent hash ring.
+    """
+    keys = ['key{0}'.format(i) for i in range(3000)]
+
+    def test_distribution(self):
+        ring = HashRing(['a', 'b', 'c'])
+        counts = {}
+        for key in self.keys:
+            node = ring.get(key)
+            counts[node] = counts.get(node, 0) + 1
+        self.assertEqual(sorted(counts), ['a', 'b', 'c'])
+        for count in counts.values():
+            self.assertTrue(count > len(self.keys) / 6, counts)
+
+    def test_add_node(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = dict((key, ring.get(key)) for key in self.keys)
+        ring.add('d')
+        after = dict((key, ring.get(key)) for key in self.keys)
+
+        # only keys moved to the new node are moved
+        moved = [key for key in self.keys if before[key] != after[key]]
+        self.assertTrue(all(after[key] == 'd' for key in moved))
+        self.assertTrue(len(self.keys) / 8 < len(moved) < len(self.keys) / 2)
+
+        ring.remove('d')
+        self.assertEqual(dict((key, ring.get(key)) for key in self.keys),
+                         before)
+
+    def test_empty(self):
+        with self.assertRaises(LookupError):
+            HashRing().get('foo')
+
+
+class ShardedDequeTestCase(unittest.TestCase):
+    """
+    Tests for `ShardedDeque` over three stand-in servers.
+    """
+    tube_name = 'test_tube'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servers = [
+            DequeServer(user='test', password='test', tubes=[cls.tube_name])
+            for _ in range(3)
+        ]
+        for server in cls.servers:
+            server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.stop()
+
+    def setUp(self):
+        for server in self.servers:
+            server.tube(self.tube_name).clear()
+        self.deque = ShardedDeque([
+            Deque(server.host, server.port, user='test', password='test')
+            for server in self.servers
+        ], poll_interval=0.05)
+        self.tube = self.deque.tube(self.tube_name)
+
+    def sizes(self):
+        """
+        Returns number of tasks on every server.
+        """
+        return [len(server.tube(self.tube_name)) for server in self.servers]
+
+    def test_put_routing(self):
+        for obj_id in range(30):
+            self.tube.put('foo', channel=1, msg_type=1, obj_type=1,
+                          obj_id=obj_id)
+        self.assertEqual(sum(self.sizes()), 30)
+        self.assertTrue(all(self.sizes()))
+
+        # same key goes to the same shard
+        tube = self.tube.shard('bar', 1, 1, 1, 5)
+        task = self.tube.put('bar', channel=1, msg_type=1, obj_type=1,
+                             obj_id=5)
+        self.assertIs(task.tube, tube)
+
+    def test_channel_key(self):
+        deque = ShardedDeque(self.deque.shards, key='channel')
+        tube = deque.tube(self.tube_name)
+        tube.put_many([(i, 7, 1, 1, i) for i in range(20)])
+        self.assertEqual(sorted(self.sizes()), [0, 0, 20])
+
+    def test_put_many(self):
+        tasks = [('foo{0}'.format(i), 1, 1, 1, i) for i in range(30)]
+        tasks.append(dict(data='bar', channel=1, msg_type=1, obj_id=100))
+        result = self.tube.put_many(tasks, chunk_size=4)
+
+        self.assertTrue(result.ok)
+        self.assertEqual([task.data for task in result],
+                         ['foo{0}'.format(i) for i in range(30)] + ['bar'])
+        self.assertEqual(sum(self.sizes()), 31)
+
+    def test_take_ack(self):
+        self.tube.put_many([(i, 1, 1, 1, i) for i in range(30)])
+
+        # take from all shards
+        tasks = self.tube.take_many(30, timeout=0)
+        self.assertEqual(sorted(task.data for task in tasks), list(range(30)))
+        self.assertEqual(len(set(task.deque for task in tasks)), 3)
+
+        # commands are sent to the shard which owns the task
+        self.assertTrue(tasks[0].release())
+        self.assertTrue(all(self.tube.ack_many(tasks[1:])))
+        task = self.tube.take(timeout=0)
+        self.assertEqual(task.task_id, tasks[0].task_id)
+        self.assertTrue(task.ack())
+        self.assertEqual(self.sizes(), [0, 0, 0])
+
+        with self.assertRaises(TypeError):
+            self.tube.ack_many([task.task_id])
+
+    def test_fair_take(self):
+        self.tube.put_many([(i, 1, 1, 1, i) for i in range(60)])
+
+        # single takes are spread across shards
+        tasks = [self.tube.take(timeout=0) for _ in range(6)]
+        self.assertEqual(len(set(task.deque for task in tasks)), 3)
+        self.tube.ack_many(tasks)
+
+    def test_blocking_take(self):
+        result = []
+        consumer = threading.Thread(
+            target=lambda: result.append(self.tube.take(timeout=2))
+        )
+        consumer.start()
+        time.sleep(0.1)
+        self.tube.put('foo', channel=1, msg_type=1, obj_id=3)
+        consumer.join()
+        self.assertEqual(result[0].data, 'foo')
+        result[0].ack()
+
+        time_start = time.time()
+        self.assertIsNone(self.tube.take(timeout=0.2))
+        self.assertTrue(0.2 <= time.time() - time_start < 0.5)
+
+    def test_add_shard(self):
+        server = DequeServer(user='test', password='test',
+                             tubes=[self.tube_name])
+        server.start()
+        try:
+            keys = [(1, obj_id) for obj_id in range(200)]
+            before = [self.tube.shard('x', 1, 1, *key).deque for key in keys]
+            self.deque.add_shard(Deque(server.host, server.port,
+                                       user='test', password='test'))
+            after = [self.tube.shard('x', 1, 1, *key).deque for key in keys]
+
+            moved = [new for old, new in zip(before, after) if old is not new]
+            self.assertTrue(moved)
+            self.assertTrue(all(deque.port == server.port
+                                for deque in moved))
+        finally:
+            server.stop()
+
+    def test_remove_shard(self):
+        self.tube.put_many([(i, 1, 1, 1, i) for i in range(30)])
+        removed = self.deque.shards[0]
+        self.deque.remove_shard(removed)
+        self.assertEqual(self.deque.draining, [removed])
+
+        # no new tasks go to removed shard
+        for obj_id in range(30, 60):
+            self.assertIsNot(self.tube.put('foo', 1, 1, 1, obj_id).deque,
+                             removed)
+
+        # but its tasks are still taken
+        tasks = self.tube.take_many(60, timeout=0)
+        self.assertEqual(len(tasks), 60)
+        self.assertTrue(any(task.deque is removed for task in tasks))
+        self.assertTrue(all(self.tube.ack_many(tasks)))
+        self.assertEqual(self.sizes(), [0, 0, 0])
+
+        self.deque.forget_shard(removed)
+        self.assertEqual(self.deque.draining, [])
+        self.assertEqual(len(self.tube.shards()), 2)
+
+        # shard added back is not draining anymore
+        self.deque.remove_shard(self.deque.shards[0])
+        self.deque.add_shard(removed)
+        self.assertEqual(len(self.deque.draining), 1)
+        self.assertEqual(len(self.tube.shards()), 3)
+
+    def test_consume(self):
+        self.tube.put_many([(i, 1, 1, 1, i) for i in range(12)])
+        worker = self.tube.consume(lambda task: None, concurrency=2,
+                                   poll_interval=0.05)
+        deadline = time.time() + 5
+        while worker.stats()['acked'] < 12 and time.time() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+        self.assertEqual(worker.stats()['acked'], 12)
+        self.assertEqual(self.sizes(), [0, 0, 0])
@@ -0,0 +1,156 @@
+"""
+Tests for task wrapper.
+"""
+import gc
+import sys
+import unittest
+
+from tarantool_deque import Deque
+from tarantool_deque.codec import Codec
+from tarantool_deque.tarantool_deque import Task, TaskRow, task_row
+
+from . import StandInTestCase
+
+
+class FakeTube(object):
+    """
+    Tube stub: tasks only need `deque` reference.
+    """
+    deque = Deque
+
+
+class TaskTestCase(unittest.TestCase):
+    """
+    Tests for slotted `Task`.
+    """
+    row = [1, 1, 10000000, 2, 3, 4, 5, 20000000, 30000000, 40000000, 'foo']
+
+    def test_create_from_row(self):
+        tube = FakeTube()
+        task = Task.create_from_row(tube, self.row)
+
+        self.assertIs(task.tube, tube)
+        self.assertIs(task.deque, Deque)
+        self.assertEqual(task.task_id, 1)
+        self.assertEqual(task.state, 1)
+        self.assertEqual(task.state_name, 'ready')
+        self.assertEqual(task.next_event, 10000000)
+        self.assertEqual(task.msg_type, 2)
+        self.assertEqual(task.obj_type, 3)
+        self.assertEqual(task.obj_id, 4)
+        self.assertEqual(task.channel, 5)
+        self.assertEqual(task.to_send_at, 2.0)
+        self.assertEqual(task.valid_until, 3.0)
+        self.assertEqual(task.created_at, 4.0)
+        self.assertEqual(task.data, 'foo')
+
+    def test_init(self):
+        task = Task(FakeTube(), *self.row)
+        self.assertEqual(task.task_id, 1)
+        self.assertEqual(task.created_at, 4.0)
+        self.assertEqual(task.data, 'foo')
+
+    def test_extra_fields(self):
+        task = Task.create_from_row(FakeTube(), self.row + ['extra'])
+        self.assertEqual(task.data, 'foo')
+        task.update_from_row(self.row + ['extra'])
+        self.assertEqual(task.created_at, 4.0)
+
+    def test_short_row(self):
+        errors = []
+        hook = sys.unraisablehook
+        sys.unraisablehook = errors.append
+        try:
+            with self.assertRaises(IndexError):
+                Task.create_from_row(FakeTube(), [1, 2, 0, 1])
+            gc.collect()
+        finally:
+            sys.unraisablehook = hook
+        # half-built taken task is collected silently
+        self.assertEqual(errors, [])
+
+    def test_slots(self):
+        task = Task.create_from_row(FakeTube(), self.row)
+        self.assertFalse(hasattr(task, '__dict__'))
+        with self.assertRaises(AttributeError):
+            task.foo = 'bar'
+
+    def test_writable(self):
+        task = Task.create_from_row(FakeTube(), self.row)
+        task.state = 3
+        task.channel = 7
+        task.data = {'foo': 'bar'}
+        self.assertEqual(task.state_name, 'done')
+        self.assertEqual(task.channel, 7)
+        self.assertEqual(task.data, {'foo': 'bar'})
+
+    def test_update_from_row(self):
+        task = Task.create_from_row(FakeTube(), self.row)
+
+        row = list(self.row)
+        row[1] = 3
+        row[10] = 'bar'
+        task.update_from_row(row)
+        self.assertEqual(task.state, 3)
+        self.assertEqual(task.data, 'bar')
+
+        row = list(self.row)
+        row[0] = 2
+        with self.assertRaises(Deque.BadTupleException):
+            task.update_from_row(row)
+
+    def test_task_row(self):
+        row = task_row(self.row)
+        self.assertIsInstance(row, TaskRow)
+        self.assertEqual(row.task_id, 1)
+        self.assertEqual(row.state, 1)
+        self.assertEqual(row.channel, 5)
+        self.assertEqual(row.to_send_at, 2.0)
+        self.assertEqual(row.valid_until, 3.0)
+        self.assertEqual(row.created_at, 4.0)
+        self.assertEqual(row.data, 'foo')
+
+        encoded = list(self.row)
+        encoded[10] = Codec().encode({'foo': 'bar'})
+        self.assertEqual(task_row(encoded).data, {'foo': 'bar'})
+
+
+class RawModeTestCase(StandInTestCase):
+    """
+    Tests for tube commands returning `TaskRow` records.
+    """
+    def test_put_take_ack(self):
+        put = self.tube.put('foo', channel=1, msg_type=2, raw=True)
+        self.assertIsInstance(put, TaskRow)
+        self.assertEqual(put.state, 1)
+        self.assertEqual(put.msg_type, 2)
+
+        taken = self.tube.take(timeout=0, raw=True)
+        self.assertEqual(taken.task_id, put.task_id)
+        self.assertEqual(taken.state, 2)
+        self.assertEqual(taken.data, 'foo')
+        self.assertIsNone(self.tube.take(timeout=0, raw=True))
+
+        self.assertEqual(self.tube.peek(put.task_id).state, 2)
+        self.assertTrue(self.tube.ack(taken.task_id))
+
+    def test_release(self):
+        task_id = self.tube.put('foo', channel=1, msg_type=1).task_id
+
+        taken = self.tube.take(timeout=0, raw=True)
+        del taken  # raw rows are not released on garbage collection
+        self.assertIsNone(self.tube.take(timeout=0))
+
+        self.assertTrue(self.tube.release(task_id))
+        self.tube.take(timeout=0, raw=True)
+        self.assertTrue(self.tube.release(task_id, delay=60))
+        self.assertEqual(self.tube.peek(task_id).state, 0)
+
+    def test_bulk(self):
+        result = self.tube.put_many([(i, 1, 1) for i in range(3)], raw=True)
+        self.assertTrue(all(isinstance(row, TaskRow) for row in result))
+        self.assertEqual([row.data for row in result], [0, 1, 2])
+
+        rows = self.tube.take_many(3, timeout=0, raw=True)
+        self.assertEqual([row.state for row in rows], [2, 2, 2])
+        self.assertEqual(list(self.tube.ack_many(rows)), [True] * 3)
@@ -0,0 +1,163 @@
+"""
+Tests for concurrent tube consumer.
+"""
+import threading
+import time
+
+from tarantool_deque import Deque
+from tarantool_deque.worker import TaskData
+
+from . import StandInTestCase
+
+
+def process_handler(task):
+    """
+    Handler for process pool: fails on odd data.
+    """
+    assert isinstance(task, TaskData)
+    if task.data % 2:
+        raise ValueError("Odd task")
+
+
+class WorkerTestCase(StandInTestCase):
+    """
+    Tests for `Tube.consume`.
+    """
+    def wait_for(self, worker, processed, timeout=5):
+        """
+        Wait until worker processes `processed` tasks.
+        """
+        deadline = time.time() + timeout
+        while worker.stats()['processed'] < processed:
+            self.assertTrue(time.time() < deadline, "Worker is too slow")
+            time.sleep(0.01)
+
+    def test_consume(self):
+        self.tube.put_many([(i, 1, 1) for i in range(20)])
+
+        handled = []
+        failed = []
+        lock = threading.Lock()
+
+        def handler(task):
+            with lock:
+                handled.append(task.data)
+            if task.data % 5 == 0:
+                failed.append(task.task_id)
+                raise ValueError("Bad task")
+
+        worker = self.tube.consume(handler, concurrency=4,
+                                   release_delay=10, poll_interval=0.1)
+        self.wait_for(worker, 20)
+        self.assertTrue(worker.stop(timeout=5))
+        self.assertFalse(worker.running)
+
+        self.assertEqual(sorted(handled), list(range(20)))
+
+        stats = worker.stats()
+        self.assertEqual(stats['processed'], 20)
+        self.assertEqual(stats['succeeded'], 16)
+        self.assertEqual(stats['failed'], 4)
+        self.assertEqual(stats['acked'], 16)
+        self.assertEqual(stats['released'], 4)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertTrue(stats['throughput'] > 0)
+        self.assertTrue(stats['latency_max'] >= stats['latency_avg'] >= 0)
+
+        # failed tasks are released with delay
+        self.assertIsNone(self.tube.take(timeout=0))
+        for task_id in failed:
+            self.assertEqual(self.deque.peek(self.tube, task_id)[0][1], 0)
+
+    def test_graceful_stop(self):
+        self.tube.put_many([(i, 1, 1) for i in range(10)])
+
+        def handler(task):
+            time.sleep(0.3)
+
+        worker = self.tube.consume(handler, concurrency=2, prefetch=4,
+                                   poll_interval=0.1)
+        deadline = time.time() + 5
+        while worker.stats()['in_flight'] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+        # in-flight tasks are finished and acked, buffered are released
+        self.assertTrue(worker.stop())
+        stats = worker.stats()
+        self.assertEqual(stats['acked'], 2)
+        self.assertEqual(stats['prefetch']['released'],
+                         stats['prefetch']['fetched'] - 2)
+
+        # not handled tasks are ready again
+        tasks = self.tube.take_many(20, timeout=0)
+        self.assertEqual(len(tasks), 8)
+        self.tube.ack_many(tasks)
+
+    def test_handler_acks(self):
+        self.tube.put('foo', channel=1, msg_type=1)
+
+        # handler may ack task itself
+        worker = self.tube.consume(lambda task: task.ack(),
+                                   poll_interval=0.1)
+        self.wait_for(worker, 1)
+        worker.stop()
+        self.assertEqual(worker.stats()['acked'], 0)
+        self.assertEqual(worker.stats()['errors'], 0)
+        self.assertIsNone(self.tube.take(timeout=0))
+
+    def test_process_executor(self):
+        self.tube.put_many([(i, 1, 1) for i in range(6)])
+
+        worker = self.tube.consume(process_handler, concurrency=2,
+                                   executor='process', release_delay=0.5,
+                                   poll_interval=0.1)
+        self.wait_for(worker, 6, timeout=30)
+        worker.stop()
+
+        stats = worker.stats()
+        self.assertEqual(stats['acked'], 3)
+        self.assertEqual(stats['released'], 3)
+
+        # released tasks are ready again after delay
+        time.sleep(0.6)
+        tasks = self.tube.take_many(10, timeout=0)
+        self.assertEqual(sorted(task.data for task in tasks), [1, 3, 5])
+        self.tube.ack_many(tasks)
+
+    def test_fetch_error(self):
+        # unknown tube: all worker threads stop
+        worker = self.deque.tube('unknown_tube').consume(
+            lambda task: None, concurrency=3
+        )
+        worker.wait(5)
+        self.assertTrue(worker.stop(timeout=1))
+        self.assertEqual(worker.stats()['errors'], 1)
+
+    def test_bad_options(self):
+        with self.assertRaises(ValueError):
+            self.tube.consume(lambda task: None, concurrency=0)
+        with self.assertRaises(ValueError):
+            self.tube.consume(lambda task: None, executor='fiber')
+
+    def test_pool(self):
+        pooled = Deque(self.server.host, self.server.port,
+                       user='test', password='test', pool_size=4)
+        tube = pooled.tube(self.tube_name)
+        tube.put_many([(i, 1, 1) for i in range(10)])
+
+        worker = tube.consume(lambda task: None, concurrency=3,
+                              poll_interval=0.1)
+        self.wait_for(worker, 10)
+        worker.stop()
+        self.assertEqual(worker.stats()['acked'], 10)
+        pooled.pool.close()
+
+    def test_ack_and_take(self):
+        self.tube.put_many([(i, 1, 1) for i in range(10)])
+
+        worker = self.tube.consume(lambda task: None, concurrency=2,
+                                   poll_interval=0.1, ack_and_take=True)
+        self.wait_for(worker, 10)
+        self.assertTrue(worker.stop(timeout=5))
+        self.assertEqual(worker.stats()['acked'], 10)
+        self.assertIsNone(self.tube.take(timeout=0))